@@ -5,8 +5,12 @@ Handles duplicate detection and source tracking across multiple sites
 """
 
 import json
+import os
 import uuid
 from datetime import datetime
+from contact_index import ContactIndex, normalize_phone_digits
+from split_master_database import add_to_category_views
+from entity_resolution import ENTITY_FILE, EntityResolver, records_from_contacts
 
 def add_to_master_log(new_contacts_file, master_log_file="master_contact_database.json", 
                      site_name="unknown", category="unknown"):
@@ -43,17 +47,13 @@ def add_to_master_log(new_contacts_file, master_log_file="master_contact_databas
     current_date = datetime.now().strftime('%Y-%m-%d')
     current_timestamp = datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%f')
     
-    # Create phone number lookup for existing contacts
-    existing_phones = {}
-    for contact_id, contact in master_log['contacts'].items():
-        phone = contact['primary_phone'].strip()
-        if phone:
-            clean_phone = ''.join(filter(str.isdigit, phone))
-            if clean_phone:  # Only add if not empty after cleaning
-                existing_phones[clean_phone] = contact_id
+    # Phone number lookup for existing contacts (persisted, rebuilt only when stale)
+    contact_index = ContactIndex.load(master_log_file, master_log)
     
     new_added = 0
     duplicates_updated = 0
+    sources_added = 0
+    gained_category = []  # contact IDs that now appear in this category
     
     print(f"📊 Processing {len(new_contacts)} new contacts...")
     
@@ -65,11 +65,11 @@ def add_to_master_log(new_contacts_file, master_log_file="master_contact_databas
         phone = str(phone).strip()  # Ensure phone is string and stripped
         
         if phone:
-            clean_phone = ''.join(filter(str.isdigit, phone))
+            clean_phone = normalize_phone_digits(phone)
+            existing_id = contact_index.find_by_phone(clean_phone) if clean_phone else None
             
-            if clean_phone and clean_phone in existing_phones:
+            if existing_id:
                 # Update existing contact
-                existing_id = existing_phones[clean_phone]
                 existing_contact = master_log['contacts'][existing_id]
                 
                 # Check if this site/category combo already exists
@@ -91,6 +91,8 @@ def add_to_master_log(new_contacts_file, master_log_file="master_contact_databas
                     existing_contact['total_listings'] += 1
                     existing_contact['last_updated'] = current_timestamp
                     duplicates_updated += 1
+                    sources_added += 1
+                    gained_category.append(existing_id)
                 # If source exists, we could increment listing count but for now just skip
                 
             else:
@@ -123,10 +125,11 @@ def add_to_master_log(new_contacts_file, master_log_file="master_contact_databas
                 master_log['contacts'][contact_id] = new_master_contact
                 
                 # Add to lookup for future duplicates in this batch
-                if clean_phone:
-                    existing_phones[clean_phone] = contact_id
+                contact_index.add(contact_id, new_master_contact)
                 
                 new_added += 1
+                sources_added += 1
+                gained_category.append(contact_id)
         else:
             # Handle contacts without phone numbers (always add as new)
             contact_id = uuid.uuid4().hex[:12]
@@ -155,17 +158,37 @@ def add_to_master_log(new_contacts_file, master_log_file="master_contact_databas
                 "notes": "No phone number available"
             }
             master_log['contacts'][contact_id] = new_master_contact
+            contact_index.add(contact_id, new_master_contact)
             new_added += 1
+            sources_added += 1
+            gained_category.append(contact_id)
     
     # Update metadata
     master_log['metadata']['last_updated'] = current_timestamp
     master_log['metadata']['total_unique_contacts'] = len(master_log['contacts'])
-    master_log['metadata']['total_sources'] = sum(len(contact['sources']) for contact in master_log['contacts'].values())
+    if 'total_sources' in master_log['metadata']:
+        master_log['metadata']['total_sources'] += sources_added
+    else:
+        master_log['metadata']['total_sources'] = sum(len(contact['sources']) for contact in master_log['contacts'].values())
     
     # Save updated master log
     with open(master_log_file, 'w', encoding='utf-8') as f:
         json.dump(master_log, f, indent=2, ensure_ascii=False)
     
+    # Keep the lookup index in step with the saved master log
+    contact_index.save(master_log)
+    
+    # Only the views for this category change - no full re-split needed
+    add_to_category_views({category: gained_category}, master_log)
+    
+    # Resolve new contacts against the persisted entity clusters (if they've been built)
+    if os.path.exists(ENTITY_FILE):
+        resolver = EntityResolver.load()
+        resolver.update(records_from_contacts({
+            contact_id: master_log['contacts'][contact_id] for contact_id in set(gained_category)
+        }))
+        resolver.save()
+    
     print(f"✅ Master log updated!")
     print(f"📊 Summary:")
     print(f"  - New contacts added: {new_added}")
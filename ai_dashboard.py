@@ -14,6 +14,7 @@ import re
 from datetime import datetime
 import os
 import requests
+from lead_scoring import priority_levels, score_frame
 
 # Check for AI capabilities
 try:
@@ -141,63 +142,16 @@ class DashboardAnalyzer:
                         categories.append(category)
                 record['categories'] = ', '.join(categories) if categories else 'construction'
                 
-                record['priority_score'] = self._calculate_priority_score(record)
-                record['priority_level'] = self._get_priority_level(record['priority_score'])
-                
                 records.append(record)
             
             self.df = pd.DataFrame(records)
+            if not self.df.empty:
+                self.df['priority_score'] = score_frame(self.df, 'dashboard')
+                self.df['priority_level'] = priority_levels(self.df['priority_score'])
             
         except FileNotFoundError:
             st.error(f"Master database file not found: {self.master_log_file}")
             self.df = pd.DataFrame()
-    
-    def _calculate_priority_score(self, record):
-        """Calculate priority score"""
-        score = 0
-        
-        listings = record['total_listings']
-        if listings >= 50:
-            score += 100
-        elif listings >= 25:
-            score += 80
-        elif listings >= 15:
-            score += 60
-        elif listings >= 8:
-            score += 40
-        elif listings >= 3:
-            score += 20
-        
-        company = str(record['seller_company']).lower()
-        
-        major_brands = ['wheeler machinery', 'holt cat', 'caterpillar', 'john deere', 'komatsu', 
-                       'empire southwest', 'ring power', 'altorfer', 'fabick cat']
-        if any(brand in company for brand in major_brands):
-            score += 25
-        
-        if any(word in company for word in ['equipment', 'machinery', 'rental']):
-            score += 15
-        
-        if record['primary_phone'] and len(str(record['primary_phone'])) >= 10:
-            score += 10
-        
-        if record['email']:
-            score += 10
-        
-        return score
-    
-    def _get_priority_level(self, score):
-        """Convert score to priority level"""
-        if score >= 120:
-            return 'Premium'
-        elif score >= 80:
-            return 'High'
-        elif score >= 50:
-            return 'Medium'
-        elif score >= 25:
-            return 'Low'
-        else:
-            return 'Minimal'
 
 def main():
     if not check_password():
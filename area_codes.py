@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Area Code Timezones
+NANP area code (NPA) -> state/province and IANA timezone lookup, used to tag
+dialer numbers with the dealer's local time so reps only see numbers that
+are inside business hours right now
+
+The table ships with the project (STATE_AREA_CODES below). Numbers are
+bucketed with vectorized string ops for DataFrames, or set-based in D1 via
+the area_codes table (see push_area_codes). "Callable now" is evaluated once
+per timezone, so filtering a list is a constant-time set lookup per row.
+
+Usage:
+    python area_codes.py push      # Load the lookup table into D1 and tag unique_phones
+    python area_codes.py now       # Show which timezones are callable right now
+"""
+
+import sys
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+# Local business hours reps may dial in (start inclusive, end exclusive), weekdays only
+CALL_WINDOW = (9, 17)
+CALL_DAYS = (0, 1, 2, 3, 4)
+
+UNKNOWN_TIMEZONE = 'Unknown'
+
+STATE_TIMEZONES = {
+    'AL': 'America/Chicago', 'AK': 'America/Anchorage', 'AZ': 'America/Phoenix', 'AR': 'America/Chicago',
+    'CA': 'America/Los_Angeles', 'CO': 'America/Denver', 'CT': 'America/New_York', 'DE': 'America/New_York',
+    'DC': 'America/New_York', 'FL': 'America/New_York', 'GA': 'America/New_York', 'HI': 'Pacific/Honolulu',
+    'ID': 'America/Boise', 'IL': 'America/Chicago', 'IN': 'America/Indiana/Indianapolis', 'IA': 'America/Chicago',
+    'KS': 'America/Chicago', 'KY': 'America/New_York', 'LA': 'America/Chicago', 'ME': 'America/New_York',
+    'MD': 'America/New_York', 'MA': 'America/New_York', 'MI': 'America/Detroit', 'MN': 'America/Chicago',
+    'MS': 'America/Chicago', 'MO': 'America/Chicago', 'MT': 'America/Denver', 'NE': 'America/Chicago',
+    'NV': 'America/Los_Angeles', 'NH': 'America/New_York', 'NJ': 'America/New_York', 'NM': 'America/Denver',
+    'NY': 'America/New_York', 'NC': 'America/New_York', 'ND': 'America/Chicago', 'OH': 'America/New_York',
+    'OK': 'America/Chicago', 'OR': 'America/Los_Angeles', 'PA': 'America/New_York', 'RI': 'America/New_York',
+    'SC': 'America/New_York', 'SD': 'America/Chicago', 'TN': 'America/Chicago', 'TX': 'America/Chicago',
+    'UT': 'America/Denver', 'VT': 'America/New_York', 'VA': 'America/New_York', 'WA': 'America/Los_Angeles',
+    'WV': 'America/New_York', 'WI': 'America/Chicago', 'WY': 'America/Denver', 'PR': 'America/Puerto_Rico',
+    'AB': 'America/Edmonton', 'BC': 'America/Vancouver', 'MB': 'America/Winnipeg', 'NB': 'America/Moncton',
+    'NL': 'America/St_Johns', 'NS': 'America/Halifax', 'ON': 'America/Toronto', 'QC': 'America/Toronto',
+    'SK': 'America/Regina',
+}
+
+STATE_AREA_CODES = {
+    'AL': [205, 251, 256, 334, 659, 938],
+    'AK': [907],
+    'AZ': [480, 520, 602, 623, 928],
+    'AR': [479, 501, 870],
+    'CA': [209, 213, 279, 310, 323, 341, 350, 408, 415, 424, 442, 510, 530, 559, 562, 619, 626, 628,
+           650, 657, 661, 669, 707, 714, 747, 760, 805, 818, 820, 831, 840, 858, 909, 916, 925, 949, 951],
+    'CO': [303, 719, 720, 970, 983],
+    'CT': [203, 475, 860, 959],
+    'DE': [302],
+    'DC': [202, 771],
+    'FL': [239, 305, 321, 352, 386, 407, 448, 561, 656, 689, 727, 754, 772, 786, 813, 850, 863, 904, 941, 954],
+    'GA': [229, 404, 470, 478, 678, 706, 762, 770, 912, 943],
+    'HI': [808],
+    'ID': [208, 986],
+    'IL': [217, 224, 309, 312, 331, 447, 464, 618, 630, 708, 773, 779, 815, 847, 872],
+    'IN': [219, 260, 317, 463, 574, 765, 812, 930],
+    'IA': [319, 515, 563, 641, 712],
+    'KS': [316, 620, 785, 913],
+    'KY': [270, 364, 502, 606, 859],
+    'LA': [225, 318, 337, 504, 985],
+    'ME': [207],
+    'MD': [227, 240, 301, 410, 443, 667],
+    'MA': [339, 351, 413, 508, 617, 774, 781, 857, 978],
+    'MI': [231, 248, 269, 313, 517, 586, 616, 679, 734, 810, 906, 947, 989],
+    'MN': [218, 320, 507, 612, 651, 763, 952],
+    'MS': [228, 601, 662, 769],
+    'MO': [314, 417, 557, 573, 636, 660, 816],
+    'MT': [406],
+    'NE': [308, 402, 531],
+    'NV': [702, 725, 775],
+    'NH': [603],
+    'NJ': [201, 551, 609, 640, 732, 848, 856, 862, 908, 973],
+    'NM': [505, 575],
+    'NY': [212, 315, 329, 332, 347, 363, 516, 518, 585, 607, 631, 646, 680, 716, 718, 838, 845, 914, 917, 929, 934],
+    'NC': [252, 336, 472, 704, 743, 828, 910, 919, 980, 984],
+    'ND': [701],
+    'OH': [216, 220, 234, 283, 326, 330, 380, 419, 436, 440, 513, 567, 614, 740, 937],
+    'OK': [405, 539, 572, 580, 918],
+    'OR': [458, 503, 541, 971],
+    'PA': [215, 223, 267, 272, 412, 445, 484, 570, 582, 610, 717, 724, 814, 835, 878],
+    'RI': [401],
+    'SC': [803, 821, 839, 843, 854, 864],
+    'SD': [605],
+    'TN': [423, 615, 629, 731, 865, 901, 931],
+    'TX': [210, 214, 254, 281, 325, 346, 361, 409, 430, 432, 469, 512, 682, 713, 726, 737, 806, 817,
+           830, 832, 903, 915, 936, 940, 945, 956, 972, 979],
+    'UT': [385, 435, 801],
+    'VT': [802],
+    'VA': [276, 434, 540, 571, 686, 703, 757, 804, 826, 948],
+    'WA': [206, 253, 360, 425, 509, 564],
+    'WV': [304, 681],
+    'WI': [262, 274, 414, 534, 608, 715, 920],
+    'WY': [307],
+    'PR': [787, 939],
+    'AB': [368, 403, 587, 780, 825],
+    'BC': [236, 250, 604, 672, 778],
+    'MB': [204, 431],
+    'NB': [506],
+    'NL': [709],
+    'NS': [782, 902],
+    'ON': [226, 249, 289, 343, 365, 382, 416, 437, 519, 548, 613, 647, 683, 705, 742, 807, 905],
+    'QC': [263, 354, 367, 418, 438, 450, 468, 514, 579, 581, 819, 873],
+    'SK': [306, 639],
+}
+
+# Area codes in a different zone than the rest of their state
+TIMEZONE_OVERRIDES = {
+    915: 'America/Denver',        # El Paso
+    423: 'America/New_York',      # East Tennessee
+    865: 'America/New_York',      # Knoxville
+    270: 'America/Chicago',       # Western Kentucky
+    364: 'America/Chicago',
+    219: 'America/Chicago',       # Northwest Indiana
+    541: 'America/Los_Angeles',
+    807: 'America/Winnipeg',      # Northwestern Ontario (mostly Central)
+}
+
+def _build_lookup():
+    lookup = {}
+    for state, codes in STATE_AREA_CODES.items():
+        for code in codes:
+            lookup[str(code)] = (state, TIMEZONE_OVERRIDES.get(code, STATE_TIMEZONES[state]))
+    return lookup
+
+AREA_CODES = _build_lookup()
+
+def area_code(phone):
+    """3-digit NPA of a phone number ('' if it isn't a 10/11-digit NANP number)"""
+    digits = ''.join(ch for ch in str(phone or '') if ch.isdigit())
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits[:3] if len(digits) == 10 else ''
+
+def timezone_for(phone):
+    return AREA_CODES.get(area_code(phone), (None, UNKNOWN_TIMEZONE))[1]
+
+def area_code_series(phones):
+    """Vectorized area_code over a pandas Series"""
+    digits = phones.fillna('').astype(str).str.replace(r'\D', '', regex=True)
+    digits = digits.where(~((digits.str.len() == 11) & digits.str.startswith('1')), digits.str[1:])
+    return digits.str[:3].where(digits.str.len() == 10, '')
+
+def timezone_series(phones):
+    """Vectorized phone -> IANA timezone ('Unknown' when the area code isn't in the table)"""
+    timezones = {code: timezone for code, (_, timezone) in AREA_CODES.items()}
+    return area_code_series(phones).map(timezones).fillna(UNKNOWN_TIMEZONE)
+
+def callable_timezones(now=None, window=CALL_WINDOW, days=CALL_DAYS):
+    """Timezones whose local time is inside the call window at `now` (a UTC-aware datetime)"""
+    now = now or datetime.now(ZoneInfo('UTC'))
+    callable_now = set()
+    for timezone in set(STATE_TIMEZONES.values()) | set(TIMEZONE_OVERRIDES.values()):
+        local = now.astimezone(ZoneInfo(timezone))
+        if local.weekday() in days and window[0] <= local.hour < window[1]:
+            callable_now.add(timezone)
+    return callable_now
+
+def local_time(timezone, now=None):
+    """Current local time in a timezone ('' for unknown zones)"""
+    if not timezone or timezone == UNKNOWN_TIMEZONE:
+        return ''
+    now = now or datetime.now(ZoneInfo('UTC'))
+    return now.astimezone(ZoneInfo(timezone)).strftime('%a %H:%M')
+
+def push_area_codes(d1):
+    """(Re)load the area_codes table in D1"""
+    rows = [{'npa': code, 'state': state, 'timezone': timezone} for code, (state, timezone) in sorted(AREA_CODES.items())]
+    result = d1.execute_query("""
+    CREATE TABLE IF NOT EXISTS area_codes (
+        npa TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        timezone TEXT NOT NULL
+    )
+    """)
+    if not result or not result.get('success'):
+        print("❌ Failed to create area_codes table")
+        return False
+    
+    values = ", ".join("('{npa}', '{state}', '{timezone}')".format(**row) for row in rows)
+    result = d1.execute_batch_query(f"DELETE FROM area_codes;\nINSERT INTO area_codes (npa, state, timezone) VALUES {values};")
+    if not result or not result.get('success'):
+        print("❌ Failed to load area codes")
+        return False
+    print(f"   ✅ Loaded {len(rows):,} area codes")
+    return True
+
+def show_callable_now():
+    """Print every timezone with its local time and whether it's callable"""
+    callable_now = callable_timezones()
+    print(f"🕘 CALL WINDOW: {CALL_WINDOW[0]}:00-{CALL_WINDOW[1]}:00 local, weekdays")
+    print("=" * 60)
+    for timezone in sorted(set(STATE_TIMEZONES.values()) | set(TIMEZONE_OVERRIDES.values())):
+        status = "✅ callable" if timezone in callable_now else "⏸️  outside hours"
+        print(f"   • {timezone}: {local_time(timezone)} {status}")
+
+def main():
+    """Main function"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    
+    command = sys.argv[1].lower()
+    
+    if command == 'push':
+        from d1_replica import get_d1_connection
+        from d1_dialer_setup import tag_phone_timezones
+        d1 = get_d1_connection()
+        if not d1 or not push_area_codes(d1) or not tag_phone_timezones(d1):
+            sys.exit(1)
+    elif command == 'now':
+        show_callable_now()
+    else:
+        print(f"❌ Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
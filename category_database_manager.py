@@ -2,18 +2,38 @@
 """
 Category Database Manager for Streamlit Dashboard
 Efficiently loads and manages split category databases
+
+Categories are stored as ID-list views over the shared master database
+(see split_master_database.py); contacts are resolved lazily on first use.
+Legacy per-category files (index key 'category_files') are still supported.
+
+Everything the manager loads lives in one LRU cache bounded by a memory
+budget, and DataFrames are built from the parquet column store with only
+the columns the caller asks for.
 """
 
 import json
 import os
+from collections import OrderedDict
 import pandas as pd
 from typing import Dict, List, Optional
 
+try:
+    import pyarrow  # noqa: F401 - parquet engine for the columnar contact store
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Fields returned by get_combined_dataframe when no projection is given
+DEFAULT_COLUMNS = ['contact_id', 'seller_company', 'primary_phone', 'primary_location', 'total_listings']
+
 class CategoryDatabaseManager:
-    def __init__(self, index_file="master_database_index.json"):
+    def __init__(self, index_file="master_database_index.json", memory_budget_mb=256):
         self.index_file = index_file
         self.index_data = None
-        self.loaded_categories = {}
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self._cache = OrderedDict()  # key -> (value, approx bytes), least recently used first
+        self._cache_bytes = 0
         self._load_index()
     
     def _load_index(self):
@@ -25,6 +45,39 @@ class CategoryDatabaseManager:
             print("❌ Master database index not found. Please run split_master_database.py first.")
             self.index_data = None
     
+    def _cache_get(self, key):
+        """Return a cached value and mark it most recently used"""
+        if key not in self._cache:
+            return None
+        self._cache.move_to_end(key)
+        return self._cache[key][0]
+    
+    def _cache_put(self, key, value, nbytes):
+        """Cache a value, evicting least recently used entries to stay within budget"""
+        if key in self._cache:
+            self._cache_bytes -= self._cache.pop(key)[1]
+        self._cache[key] = (value, nbytes)
+        self._cache_bytes += nbytes
+        
+        while self._cache_bytes > self.memory_budget and len(self._cache) > 1:
+            _, (_, evicted_bytes) = self._cache.popitem(last=False)
+            self._cache_bytes -= evicted_bytes
+        return value
+    
+    @property
+    def loaded_categories(self) -> List[str]:
+        """Categories currently held in memory"""
+        return [key[1] for key in self._cache if key[0] == 'category']
+    
+    def get_memory_usage(self) -> int:
+        """Approximate bytes held by the cache"""
+        return self._cache_bytes
+    
+    def clear_cache(self):
+        """Drop everything the manager has loaded"""
+        self._cache.clear()
+        self._cache_bytes = 0
+    
     def get_available_categories(self) -> List[str]:
         """Get list of available categories"""
         if not self.index_data:
@@ -37,16 +90,76 @@ class CategoryDatabaseManager:
             return {}
         return self.index_data.get('categories', {})
     
+    def _get_shared_contacts(self) -> Dict:
+        """Load the shared contact store, the first time a view needs it"""
+        store_file = self.index_data.get('shared_store', 'master_contact_database.json')
+        shared_contacts = self._cache_get(('store', store_file))
+        if shared_contacts is None:
+            try:
+                with open(store_file, 'r') as f:
+                    shared_contacts = json.load(f).get('contacts', {})
+            except FileNotFoundError:
+                print(f"❌ Shared contact store not found: {store_file}")
+                return {}
+            self._cache_put(('store', store_file), shared_contacts, os.path.getsize(store_file))
+        return shared_contacts
+    
+    def get_category_ids(self, category: str) -> pd.Index:
+        """Contact IDs in a category (views only need their ID list, not the contacts)"""
+        ids = self._cache_get(('ids', category))
+        if ids is not None:
+            return ids
+        
+        view_file = self.index_data.get('category_views', {}).get(category) if self.index_data else None
+        if view_file:
+            try:
+                with open(view_file, 'r') as f:
+                    ids = pd.Index(json.load(f).get('contact_ids', []), dtype=object)
+            except FileNotFoundError:
+                print(f"❌ Category view not found: {view_file}")
+                ids = pd.Index([], dtype=object)
+        else:
+            category_data = self.load_category(category)
+            ids = pd.Index(list(category_data.get('contacts', {}).keys()) if category_data else [], dtype=object)
+        
+        return self._cache_put(('ids', category), ids, int(ids.memory_usage(deep=True)))
+    
+    def _load_category_view(self, category: str, file_path: str) -> Optional[Dict]:
+        """Resolve a category view's contact IDs against the shared store"""
+        if not os.path.exists(file_path):
+            print(f"❌ Category view not found: {file_path}")
+            return None
+        
+        shared_contacts = self._get_shared_contacts()
+        contacts = {
+            contact_id: shared_contacts[contact_id]
+            for contact_id in self.get_category_ids(category)
+            if contact_id in shared_contacts
+        }
+        with open(file_path, 'r') as f:
+            metadata = json.load(f).get('metadata', {})
+        return {"metadata": metadata, "contacts": contacts}
+    
     def load_category(self, category: str) -> Optional[Dict]:
         """Load a specific category database"""
         if not self.index_data:
             return None
         
         # Check if already loaded
-        if category in self.loaded_categories:
-            return self.loaded_categories[category]
+        category_data = self._cache_get(('category', category))
+        if category_data is not None:
+            return category_data
         
-        # Get file path
+        # Views over the shared store (contacts are shared, only the dict of references is new)
+        category_views = self.index_data.get('category_views', {})
+        if category in category_views:
+            category_data = self._load_category_view(category, category_views[category])
+            if category_data:
+                self._cache_put(('category', category), category_data, 64 * len(category_data['contacts']))
+                print(f"✅ Loaded {category}: {len(category_data['contacts'])} contacts")
+            return category_data
+        
+        # Legacy full per-category files
         category_files = self.index_data.get('category_files', {})
         if category not in category_files:
             print(f"❌ Category '{category}' not found")
@@ -57,7 +170,7 @@ class CategoryDatabaseManager:
         try:
             with open(file_path, 'r') as f:
                 category_data = json.load(f)
-                self.loaded_categories[category] = category_data
+                self._cache_put(('category', category), category_data, os.path.getsize(file_path))
                 print(f"✅ Loaded {category}: {len(category_data.get('contacts', {}))} contacts")
                 return category_data
         except FileNotFoundError:
@@ -77,33 +190,67 @@ class CategoryDatabaseManager:
         """Load all available categories"""
         return self.load_categories(self.get_available_categories())
     
-    def get_combined_dataframe(self, categories: Optional[List[str]] = None) -> pd.DataFrame:
-        """Get a combined pandas DataFrame for specified categories"""
+    def _load_columns(self, columns: List[str]) -> Optional[pd.DataFrame]:
+        """Load contact columns from the parquet store, reading only columns not already cached"""
+        column_store = self.index_data.get('column_store')
+        if not (PARQUET_AVAILABLE and column_store and os.path.exists(column_store)):
+            return None
+        
+        contact_ids = self._cache_get(('column_index', column_store))
+        cached = {column: self._cache_get(('column', column)) for column in columns}
+        missing = [column for column, series in cached.items() if series is None]
+        
+        if missing or contact_ids is None:
+            loaded = pd.read_parquet(column_store, columns=['contact_id'] + missing).set_index('contact_id')
+            if contact_ids is None:
+                contact_ids = self._cache_put(('column_index', column_store), loaded.index,
+                                              int(loaded.index.memory_usage(deep=True)))
+            for column in missing:
+                series = loaded[column]
+                cached[column] = self._cache_put(('column', column), series, int(series.memory_usage(deep=True)))
+        
+        # Always carry the contact_id index, even when no value columns are requested
+        return pd.DataFrame(cached, index=contact_ids)
+    
+    def _contacts_to_frame(self, contacts: Dict, columns: List[str]) -> pd.DataFrame:
+        """Build a projected DataFrame straight from contact dicts (JSON fallback)"""
+        df = pd.DataFrame.from_dict(contacts, orient='index')
+        return df.reindex(columns=[c for c in columns if c != 'contact_id'])
+    
+    def get_combined_dataframe(self, categories: Optional[List[str]] = None,
+                               columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Get a combined pandas DataFrame for specified categories and columns"""
         if categories is None:
             categories = self.get_available_categories()
+        columns = list(columns or DEFAULT_COLUMNS)
+        value_columns = [c for c in columns if c != 'contact_id']
         
-        all_contacts = {}
+        if not self.index_data or not categories:
+            return pd.DataFrame(columns=columns)
         
-        for category in categories:
-            category_data = self.load_category(category)
-            if category_data:
-                contacts = category_data.get('contacts', {})
-                all_contacts.update(contacts)
-        
-        # Convert to DataFrame (reuse your existing logic from DashboardAnalyzer)
-        records = []
-        for contact_id, contact in all_contacts.items():
-            record = {
-                'contact_id': contact_id,
-                'seller_company': contact.get('seller_company', ''),
-                'primary_phone': contact.get('primary_phone', ''),
-                'primary_location': contact.get('primary_location', ''),
-                'total_listings': contact.get('total_listings', 1),
-                # Add all other fields...
-            }
-            records.append(record)
-        
-        return pd.DataFrame(records)
+        # Union of category memberships, deduplicated without touching contact data
+        contact_ids = self.get_category_ids(categories[0])
+        for category in categories[1:]:
+            contact_ids = contact_ids.union(self.get_category_ids(category), sort=False)
+        
+        df = self._load_columns(value_columns)
+        if df is None:
+            if self.index_data.get('category_views'):
+                df = self._contacts_to_frame(self._get_shared_contacts(), value_columns)
+            else:
+                combined = {}
+                for category in categories:
+                    category_data = self.load_category(category)
+                    if category_data:
+                        combined.update(category_data.get('contacts', {}))
+                df = self._contacts_to_frame(combined, value_columns)
+        
+        df = df[df.index.isin(contact_ids)]
+        if 'total_listings' in df.columns:
+            df['total_listings'] = df['total_listings'].fillna(1)
+        
+        df = df.rename_axis('contact_id').reset_index()
+        return df[columns]
     
     def get_total_contacts(self) -> int:
         """Get total number of contacts across all categories"""
@@ -114,6 +261,8 @@ class CategoryDatabaseManager:
 # Usage in your dashboard:
 def get_category_manager():
     """Get the category database manager (cached)"""
+    import streamlit as st
+    
     if 'category_manager' not in st.session_state:
         st.session_state.category_manager = CategoryDatabaseManager()
     return st.session_state.category_manager
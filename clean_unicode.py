@@ -5,33 +5,56 @@ Replaces problematic Unicode characters with standard ASCII
 """
 
 import json
-import re
+from master_log_transforms import register_transform, run_transforms
+
+# Single translation table - one C-level pass per string instead of a replace() per character
+UNICODE_REPLACEMENTS = str.maketrans({
+    '\u2018': "'",  # Left single quote
+    '\u2019': "'",  # Right single quote  
+    '\u201c': '"',  # Left double quote
+    '\u201d': '"',  # Right double quote
+    '\u2013': '-',  # En dash
+    '\u2014': '--', # Em dash
+    '\u00a0': ' ',  # Non-breaking space
+})
 
 def clean_unicode_text(text):
     """Clean Unicode characters from text"""
     if not isinstance(text, str):
         return text
     
-    # Replace common Unicode characters
-    replacements = {
-        '\u2018': "'",  # Left single quote
-        '\u2019': "'",  # Right single quote  
-        '\u201c': '"',  # Left double quote
-        '\u201d': '"',  # Right double quote
-        '\u2013': '-',  # En dash
-        '\u2014': '--', # Em dash
-        '\u00a0': ' ',  # Non-breaking space
-        '\u003e': '>',  # Greater than
-        '\u003c': '<',  # Less than
-    }
-    
-    for unicode_char, replacement in replacements.items():
-        text = text.replace(unicode_char, replacement)
-    
-    return text
+    return text.translate(UNICODE_REPLACEMENTS)
+
+def clean_dict_or_list(obj):
+    """Clean every string inside nested dicts/lists"""
+    if isinstance(obj, dict):
+        return {key: clean_dict_or_list(value) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [clean_dict_or_list(item) for item in obj]
+    elif isinstance(obj, str):
+        return clean_unicode_text(obj)
+    else:
+        return obj
+
+def clean_unicode_document(data):
+    """Clean Unicode in everything outside the contacts (category and site names in the metadata)"""
+    for key, value in data.items():
+        if key != 'contacts':
+            data[key] = clean_dict_or_list(value)
+
+@register_transform('clean_unicode', document_func=clean_unicode_document)
+def clean_unicode_contact(contact_id, contact):
+    """Per-contact transform: clean Unicode in every field, in place"""
+    changed = False
+    for key, value in contact.items():
+        cleaned = clean_dict_or_list(value)
+        if cleaned != value:
+            contact[key] = cleaned
+            changed = True
+    return changed
 
 def clean_json_file(input_file, output_file=None):
-    """Clean Unicode characters from JSON file"""
+    """Clean Unicode characters from any JSON file"""
     if output_file is None:
         output_file = input_file
     
@@ -41,17 +64,6 @@ def clean_json_file(input_file, output_file=None):
     with open(input_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
     
-    # Clean recursively
-    def clean_dict_or_list(obj):
-        if isinstance(obj, dict):
-            return {key: clean_dict_or_list(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [clean_dict_or_list(item) for item in obj]
-        elif isinstance(obj, str):
-            return clean_unicode_text(obj)
-        else:
-            return obj
-    
     cleaned_data = clean_dict_or_list(data)
     
     # Save cleaned JSON
@@ -61,6 +73,6 @@ def clean_json_file(input_file, output_file=None):
     print(f"Cleaned file saved to: {output_file}")
 
 if __name__ == "__main__":
-    # Clean the master database
-    clean_json_file("master_contact_database.json")
+    # Clean the master database (combine with other fixes via master_log_transforms.py)
+    run_transforms(['clean_unicode'])
     print("Unicode cleanup complete!")
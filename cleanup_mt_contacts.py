@@ -14,42 +14,113 @@ import os
 import json
 import glob
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from collections import defaultdict
 import hashlib
 
+try:
+    import xxhash  # optional - much faster content hashing
+    HASH_ALGORITHM = 'xxh3_128'
+except ImportError:
+    HASH_ALGORITHM = 'blake2b'
+
+CACHE_FILE = os.path.join("mt_contacts", ".file_cache.json")
+READ_BUFFER_SIZE = 1024 * 1024
+HASH_WORKERS = 8
+
 def get_file_hash(filepath):
-    """Calculate MD5 hash of file content"""
-    hash_md5 = hashlib.md5()
-    with open(filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+    """Hash file content with large buffered reads"""
+    hasher = xxhash.xxh3_128() if HASH_ALGORITHM == 'xxh3_128' else hashlib.blake2b()
+    with open(filepath, "rb", buffering=0) as f:
+        for chunk in iter(lambda: f.read(READ_BUFFER_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def load_file_cache():
+    """Load cached hashes/validation results keyed by path, valid while (size, mtime) match"""
+    try:
+        with open(CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'hash_algorithm': HASH_ALGORITHM, 'files': {}}
+    
+    if cache.get('hash_algorithm') != HASH_ALGORITHM:
+        # Hashes from another algorithm can't be compared - keep only validation results
+        for entry in cache.get('files', {}).values():
+            entry.pop('hash', None)
+        cache['hash_algorithm'] = HASH_ALGORITHM
+    return cache
+
+def save_file_cache(cache):
+    """Persist the cache, dropping entries for files that no longer exist"""
+    cache['files'] = {path: entry for path, entry in cache['files'].items() if os.path.exists(path)}
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    temp_file = f"{CACHE_FILE}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(cache, f)
+    os.replace(temp_file, CACHE_FILE)
+
+def cache_entry(cache, filepath, stat):
+    """Cache entry for a file, reset if the file changed since it was cached"""
+    entry = cache['files'].get(filepath)
+    if not entry or entry.get('size') != stat.st_size or entry.get('mtime') != stat.st_mtime:
+        entry = {'size': stat.st_size, 'mtime': stat.st_mtime}
+        cache['files'][filepath] = entry
+    return entry
 
-def find_duplicate_files():
+def scan_files(patterns=("json/*.json", "csv/*.csv")):
+    """(path, stat) for every scraped export, stat'ed once"""
+    files = []
+    for pattern in patterns:
+        for filepath in glob.glob(os.path.join("mt_contacts", pattern)):
+            try:
+                files.append((filepath, os.stat(filepath)))
+            except OSError as e:
+                print(f"❌ Error processing {filepath}: {e}")
+    return files
+
+def find_duplicate_files(cache=None):
     """Find duplicate files based on content hash"""
-    json_dir = os.path.join("mt_contacts", "json")
-    csv_dir = os.path.join("mt_contacts", "csv")
-    
     print("🔍 Scanning for duplicate files...")
     
+    owns_cache = cache is None
+    if owns_cache:
+        cache = load_file_cache()
+    
+    # Only files sharing a size can be duplicates - everything else is never read
+    size_groups = defaultdict(list)
+    for filepath, stat in scan_files():
+        size_groups[stat.st_size].append((filepath, stat))
+    candidates = [item for group in size_groups.values() if len(group) > 1 for item in group]
+    
+    entries = {filepath: cache_entry(cache, filepath, stat) for filepath, stat in candidates}
+    to_hash = [filepath for filepath, entry in entries.items() if 'hash' not in entry]
+    
+    # Hash new/changed files in parallel (hashlib releases the GIL on large buffers)
+    if to_hash:
+        print(f"   #️⃣  Hashing {len(to_hash)} new or changed files ({len(entries) - len(to_hash)} cached)...")
+        
+        def hash_file(filepath):
+            try:
+                return filepath, get_file_hash(filepath), None
+            except Exception as e:
+                return filepath, None, e
+        
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+            for filepath, file_hash, error in executor.map(hash_file, to_hash):
+                if error:
+                    print(f"❌ Error processing {filepath}: {error}")
+                else:
+                    entries[filepath]['hash'] = file_hash
+    
     hash_map = defaultdict(list)
+    for filepath, entry in entries.items():
+        if 'hash' in entry:
+            hash_map[entry['hash']].append(filepath)
     
-    # Check JSON files
-    for filepath in glob.glob(os.path.join(json_dir, "*.json")):
-        try:
-            file_hash = get_file_hash(filepath)
-            hash_map[file_hash].append(filepath)
-        except Exception as e:
-            print(f"❌ Error processing {filepath}: {e}")
-    
-    # Check CSV files  
-    for filepath in glob.glob(os.path.join(csv_dir, "*.csv")):
-        try:
-            file_hash = get_file_hash(filepath)
-            hash_map[file_hash].append(filepath)
-        except Exception as e:
-            print(f"❌ Error processing {filepath}: {e}")
+    if owns_cache:
+        save_file_cache(cache)
     
     duplicates = {h: files for h, files in hash_map.items() if len(files) > 1}
     
@@ -64,46 +135,59 @@ def find_duplicate_files():
     
     return duplicates
 
-def find_invalid_files():
+def check_json_file(filepath):
+    """Return why a scraped JSON file is invalid, or '' if it looks fine"""
+    try:
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+        
+        # Check for required fields
+        if not data.get('contacts'):
+            return f"⚠️  No contacts found in {os.path.basename(filepath)}"
+        
+        # Check contact quality
+        contacts = data['contacts']
+        valid_contacts = 0
+        
+        for contact in contacts:
+            # Count contacts with actual data (not just URLs)
+            if any(field in contact for field in ['phone', 'seller_company', 'location', 'serial_number']):
+                valid_contacts += 1
+        
+        # If less than 10% of contacts have real data, flag as invalid
+        if valid_contacts < len(contacts) * 0.1:
+            return f"⚠️  Low quality data in {os.path.basename(filepath)} ({valid_contacts}/{len(contacts)} valid contacts)"
+        return ''
+    
+    except json.JSONDecodeError:
+        return f"❌ Invalid JSON in {os.path.basename(filepath)}"
+    except Exception as e:
+        # Unreadable or oddly shaped files (not UTF-8, top-level list, ...) are invalid too
+        return f"❌ Error processing {filepath}: {e}"
+
+def find_invalid_files(cache=None):
     """Find files with invalid/corrupted data"""
-    json_dir = os.path.join("mt_contacts", "json")
-    
     print("\\n🔍 Scanning for invalid JSON files...")
     
+    owns_cache = cache is None
+    if owns_cache:
+        cache = load_file_cache()
+    
     invalid_files = []
     
-    for filepath in glob.glob(os.path.join(json_dir, "*.json")):
-        try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-            
-            # Check for required fields
-            if not data.get('contacts'):
-                print(f"⚠️  No contacts found in {os.path.basename(filepath)}")
-                invalid_files.append(filepath)
-                continue
-                
-            # Check contact quality
-            contacts = data['contacts']
-            valid_contacts = 0
-            
-            for contact in contacts:
-                # Count contacts with actual data (not just URLs)
-                if any(field in contact for field in ['phone', 'seller_company', 'location', 'serial_number']):
-                    valid_contacts += 1
-            
-            # If less than 10% of contacts have real data, flag as invalid
-            if valid_contacts < len(contacts) * 0.1:
-                print(f"⚠️  Low quality data in {os.path.basename(filepath)} ({valid_contacts}/{len(contacts)} valid contacts)")
-                invalid_files.append(filepath)
-                
-        except json.JSONDecodeError:
-            print(f"❌ Invalid JSON in {os.path.basename(filepath)}")
-            invalid_files.append(filepath)
-        except Exception as e:
-            print(f"❌ Error processing {filepath}: {e}")
+    # Unchanged files reuse their cached verdict instead of being re-parsed
+    for filepath, stat in scan_files(("json/*.json",)):
+        entry = cache_entry(cache, filepath, stat)
+        if 'invalid' not in entry:
+            entry['invalid'] = check_json_file(filepath)
+        
+        if entry['invalid']:
+            print(entry['invalid'])
             invalid_files.append(filepath)
     
+    if owns_cache:
+        save_file_cache(cache)
+    
     return invalid_files
 
 def archive_old_files(days_old=30):
@@ -122,7 +206,7 @@ def archive_old_files(days_old=30):
     for directory in [json_dir, csv_dir]:
         if not os.path.exists(directory):
             continue
-            
+        
         for filepath in glob.glob(os.path.join(directory, "*")):
             if os.path.getmtime(filepath) < cutoff_time:
                 filename = os.path.basename(filepath)
@@ -226,24 +310,21 @@ def remove_invalid_files():
 
 def generate_cleanup_report():
     """Generate detailed cleanup report"""
-    json_dir = os.path.join("mt_contacts", "json")
-    csv_dir = os.path.join("mt_contacts", "csv")
-    
     print("\\n📊 Generating cleanup report...")
     
-    # Count files
-    json_files = glob.glob(os.path.join(json_dir, "*.json"))
-    csv_files = glob.glob(os.path.join(csv_dir, "*.csv"))
+    # Stat every file once
+    files = scan_files()
+    json_files = [filepath for filepath, _ in files if filepath.endswith('.json')]
+    csv_files = [filepath for filepath, _ in files if filepath.endswith('.csv')]
     
     # Calculate sizes
-    total_size = 0
-    for files in [json_files, csv_files]:
-        for filepath in files:
-            total_size += os.path.getsize(filepath)
+    total_size = sum(stat.st_size for _, stat in files)
     
-    # Find duplicates and invalid files
-    duplicates = find_duplicate_files()
-    invalid_files = find_invalid_files()
+    # Find duplicates and invalid files (sharing one cache load/save)
+    cache = load_file_cache()
+    duplicates = find_duplicate_files(cache)
+    invalid_files = find_invalid_files(cache)
+    save_file_cache(cache)
     
     # Generate report
     report = f"""
@@ -275,11 +356,7 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
     
     # Count old files
     cutoff_time = datetime.now().timestamp() - (30 * 24 * 60 * 60)
-    old_files = []
-    for files in [json_files, csv_files]:
-        for filepath in files:
-            if os.path.getmtime(filepath) < cutoff_time:
-                old_files.append(filepath)
+    old_files = [filepath for filepath, stat in files if stat.st_mtime < cutoff_time]
     
     if old_files:
         report += f"   • Archive {len(old_files)} old files (30+ days)\\n"
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Fuzzy Company Matcher
+Groups spelling variants of the same dealer ("Wheeler Machinery Co",
+"Wheeler Mach. Company") without comparing every pair of names
+
+Names are normalized (abbreviations expanded, legal/generic words dropped),
+blocked on their rarest character trigrams (prefix filtering), and only the
+candidate pairs that share a block are scored. Accepted pairs are merged with
+union-find into clusters that carry a confidence score.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+NON_WORD = re.compile(r'[^\w\s]')
+
+# Common abbreviations in dealer names -> canonical token
+ABBREVIATIONS = {
+    'mach': 'machinery', 'mchy': 'machinery', 'equip': 'equipment', 'eqpt': 'equipment',
+    'eq': 'equipment', 'co': 'company', 'corp': 'corporation', 'intl': 'international',
+    'svc': 'services', 'svcs': 'services', 'service': 'services', 'bros': 'brothers',
+    'mfg': 'manufacturing', 'trk': 'truck', 'trks': 'trucks', 'sls': 'sales',
+    'tractors': 'tractor', 'trucks': 'truck', 'ent': 'enterprises', '&': 'and',
+}
+
+# Words that say nothing about which dealer it is (same idea as find_dealer_networks' suffix regex)
+GENERIC_TOKENS = {
+    'inc', 'llc', 'company', 'corporation', 'ltd', 'equipment', 'machinery',
+    'and', 'the', 'of', 'sales', 'services', 'enterprises',
+}
+
+def normalize_company(name):
+    """Canonical core of a company name used for fuzzy matching"""
+    if not name:
+        return ""
+    text = str(name).lower().replace('&', ' and ')
+    text = NON_WORD.sub(' ', text)
+    tokens = [ABBREVIATIONS.get(token, token) for token in text.split()]
+    core = [token for token in tokens if token not in GENERIC_TOKENS]
+    return ' '.join(core or tokens)
+
+def company_shingles(key, size=3):
+    """Character n-grams of a normalized name (padded so short words still shingle)"""
+    padded = f" {key} "
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+def name_similarity(a, b, shingles_a=None, shingles_b=None, threshold=0.0):
+    """Blend of trigram Jaccard and edit-based ratio, in [0, 1]
+    
+    Pairs whose Jaccard alone can't reach threshold skip the (much slower)
+    edit-distance pass and score 0.
+    """
+    if a == b:
+        return 1.0
+    shingles_a = shingles_a or company_shingles(a)
+    shingles_b = shingles_b or company_shingles(b)
+    jaccard = len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+    if (jaccard + 1) / 2 < threshold:
+        return 0.0
+    matcher = SequenceMatcher(None, a, b)
+    if (jaccard + matcher.quick_ratio()) / 2 < threshold:
+        return 0.0
+    return (jaccard + matcher.ratio()) / 2
+
+class UnionFind:
+    """Disjoint sets with path compression and union by size"""
+    
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+    
+    def add(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+    
+    def find(self, item):
+        self.add(item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+    
+    def union(self, a, b):
+        """Merge the sets holding a and b; returns the surviving root"""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+    
+    def groups(self):
+        """Map root -> list of members"""
+        groups = defaultdict(list)
+        for item in self.parent:
+            groups[self.find(item)].append(item)
+        return groups
+
+def candidate_pairs(shingles, min_jaccard):
+    """Pairs of keys whose shingle sets could have Jaccard >= min_jaccard
+    
+    Prefix-filtered trigram blocking (PPJoin): every set is ordered rarest
+    shingle first and only its first |x| - ceil(t*|x|) + 1 shingles are
+    indexed. Two sets reaching the threshold always share one of those
+    prefix shingles, so common trigrams (" tr", "tor", ...) never generate
+    candidates and no qualifying pair is missed. Length and positional
+    bounds drop pairs that can no longer reach the required overlap.
+    """
+    frequency = Counter(shingle for key_shingles in shingles.values() for shingle in key_shingles)
+    sizes = {key: len(key_shingles) for key, key_shingles in shingles.items()}
+    index = defaultdict(list)  # shingle -> [(key, size, position in key's ordered set)]
+    overlap_factor = min_jaccard / (1 + min_jaccard)
+    pairs = []
+    
+    # Smallest sets first, so the length filter only has to look one way
+    for key in sorted(shingles, key=sizes.get):
+        size = sizes[key]
+        min_size = min_jaccard * size
+        ordered = sorted(shingles[key], key=lambda shingle: (frequency[shingle], shingle))
+        prefix_length = size - math.ceil(min_jaccard * size) + 1
+        
+        overlap = {}
+        for position, shingle in enumerate(ordered[:prefix_length]):
+            postings = index[shingle]
+            for other, other_size, other_position in postings:
+                if other_size < min_size:
+                    continue
+                count = overlap.get(other, 0)
+                if count < 0:
+                    continue
+                required = math.ceil(overlap_factor * (size + other_size))
+                if count + min(size - position, other_size - other_position) >= required:
+                    overlap[other] = count + 1
+                else:
+                    overlap[other] = -1  # can't reach the threshold any more
+            postings.append((key, size, position))
+        
+        pairs.extend((other, key) for other, count in overlap.items() if count > 0)
+    
+    return pairs
+
+def match_companies(names, threshold=0.8, min_length=4):
+    """Cluster company names that refer to the same business
+    
+    names is any iterable of raw company names. Returns a list of clusters,
+    each {'key', 'names', 'keys', 'confidence'}, where confidence is the
+    weakest accepted link in the cluster (1.0 for exact normalized matches).
+    """
+    # Exact normalized matches collapse before any fuzzy work
+    names_by_key = defaultdict(set)
+    for name in names:
+        key = normalize_company(name)
+        if len(key) >= min_length:
+            names_by_key[key].add(name)
+    
+    shingles = {key: company_shingles(key) for key in names_by_key}
+    
+    # Score candidate pairs only - the edit ratio is at most 1, so a pair
+    # needs Jaccard >= 2 * threshold - 1 to reach the threshold at all
+    union_find = UnionFind()
+    weakest = {}
+    for key in names_by_key:
+        union_find.add(key)
+    for a, b in candidate_pairs(shingles, max(0.0, 2 * threshold - 1)):
+        score = name_similarity(a, b, shingles[a], shingles[b], threshold)
+        if score < threshold:
+            continue
+        root_a, root_b = union_find.find(a), union_find.find(b)
+        if root_a != root_b:
+            link = min(score, weakest.get(root_a, 1.0), weakest.get(root_b, 1.0))
+            weakest[union_find.union(a, b)] = link
+    
+    clusters = []
+    for root, keys in union_find.groups().items():
+        keys.sort(key=lambda k: len(names_by_key[k]), reverse=True)
+        clusters.append({
+            'key': keys[0],
+            'keys': keys,
+            'names': sorted(set().union(*(names_by_key[k] for k in keys))),
+            'confidence': round(weakest.get(root, 1.0), 3)
+        })
+    return clusters
+
+def company_clusters(contacts, threshold=0.8):
+    """Map contact_id -> cluster dict for a master-log style contacts mapping"""
+    clusters = match_companies(
+        (contact.get('seller_company', '') for contact in contacts.values()),
+        threshold=threshold
+    )
+    by_key = {key: cluster for cluster in clusters for key in cluster['keys']}
+    
+    assignments = {}
+    for contact_id, contact in contacts.items():
+        cluster = by_key.get(normalize_company(contact.get('seller_company', '')))
+        if cluster:
+            assignments[contact_id] = cluster
+    return assignments
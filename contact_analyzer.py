@@ -11,6 +11,8 @@ import re
 from datetime import datetime
 import matplotlib.pyplot as plt
 import seaborn as sns
+from d1_replica import use_replica, load_replica_master_log
+from lead_scoring import priority_levels, score_frame
 
 class ContactAnalyzer:
     def __init__(self, master_log_file="master_contact_database.json"):
@@ -23,8 +25,11 @@ class ContactAnalyzer:
     def load_data(self):
         """Load and parse the master contact database"""
         try:
-            with open(self.master_log_file, 'r', encoding='utf-8') as f:
-                self.master_log = json.load(f)
+            if use_replica():
+                self.master_log = load_replica_master_log()
+            else:
+                with open(self.master_log_file, 'r', encoding='utf-8') as f:
+                    self.master_log = json.load(f)
             print(f"✅ Loaded master database with {len(self.master_log['contacts'])} contacts")
             self._create_dataframe()
         except FileNotFoundError:
@@ -70,71 +75,6 @@ class ContactAnalyzer:
         self.df = pd.DataFrame(records)
         print(f"📊 Created analysis DataFrame with {len(self.df)} contacts")
     
-    def _calculate_priority_score(self, row):
-        """Calculate priority score for a contact based on multiple factors"""
-        score = 0
-        
-        # Listing volume scoring (most important factor)
-        listings = row['total_listings']
-        if listings >= 50:
-            score += 100  # Major dealer/distributor
-        elif listings >= 25:
-            score += 80   # Large regional dealer
-        elif listings >= 15:
-            score += 60   # Active dealer
-        elif listings >= 8:
-            score += 40   # Regular seller
-        elif listings >= 3:
-            score += 20   # Occasional seller
-        
-        # Company type and brand recognition
-        company = str(row['seller_company']).lower()
-        
-        # Major brand dealers (Cat, John Deere, etc.)
-        major_brands = ['wheeler machinery', 'holt cat', 'caterpillar', 'cat used', 'cat financial',
-                       'john deere', 'komatsu', 'volvo', 'case', 'new holland', 'kubota',
-                       'empire southwest', 'ring power', 'altorfer', 'fabick cat', 'thompson tractor',
-                       'boyd cat', 'milton cat', 'warren cat', 'peterson cat']
-        
-        for brand in major_brands:
-            if brand in company:
-                score += 25
-                break
-        
-        # Equipment-focused companies
-        equipment_keywords = ['equipment', 'machinery', 'tractor', 'construction', 'rental', 'rentals']
-        if any(keyword in company for keyword in equipment_keywords):
-            score += 15
-        
-        # Contact quality bonuses
-        if row['primary_phone'] and len(str(row['primary_phone'])) >= 10:
-            score += 10
-        
-        if row['email']:
-            score += 10
-        
-        if row['primary_location'] and ',' in str(row['primary_location']):
-            score += 5  # Complete location (city, state)
-        
-        # Multi-site bonus (future feature)
-        if row.get('is_multi_site', False):
-            score += 20
-        
-        return score
-    
-    def _get_priority_level(self, score):
-        """Convert score to priority level"""
-        if score >= 120:
-            return 'premium'    # Major dealers, multi-brand, high volume
-        elif score >= 80:
-            return 'high'       # Regional dealers, good volume
-        elif score >= 50:
-            return 'medium'     # Active sellers, some equipment focus
-        elif score >= 25:
-            return 'low'        # Occasional sellers
-        else:
-            return 'minimal'    # Very low activity
-    
     def multi_site_analysis(self):
         """Analyze sellers active on multiple sites"""
         print("\n" + "="*80)
@@ -217,8 +157,8 @@ class ContactAnalyzer:
             print(f"\n⚠️  Non-standard phone examples: {', '.join(invalid_phones[:5])}")
         
         # Calculate priority scores for each contact
-        self.df['priority_score'] = self.df.apply(self._calculate_priority_score, axis=1)
-        self.df['priority_level'] = self.df['priority_score'].apply(self._get_priority_level)
+        self.df['priority_score'] = score_frame(self.df, 'contact')
+        self.df['priority_level'] = priority_levels(self.df['priority_score']).str.lower()
         
         # High-value contacts (improved scoring system)
         high_value = self.df[self.df['priority_level'].isin(['high', 'premium'])]
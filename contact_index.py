@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Contact Index for the Master Contact Database
+Persisted phone -> contact_id and company -> contact_id lookups, kept in sync
+with master_contact_database.json so merges don't rescan every contact
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+
+COMPANY_SUFFIXES = re.compile(r'\b(Inc|LLC|Corp|Co\.|Ltd|Equipment|Machinery)\b', re.IGNORECASE)
+NON_DIGITS = re.compile(r'\D')
+NON_WORD = re.compile(r'[^\w\s]')
+
+def normalize_phone_digits(phone):
+    """Strip a phone number down to its digits"""
+    if not phone:
+        return ""
+    return NON_DIGITS.sub('', str(phone))
+
+def company_key(company):
+    """Normalize a company name for grouping (same rules as find_dealer_networks)"""
+    if not company:
+        return ""
+    normalized = COMPANY_SUFFIXES.sub('', str(company).strip()).strip()
+    return NON_WORD.sub('', normalized).strip().lower()
+
+def default_index_file(master_log_file):
+    """Index file that lives next to the master log"""
+    root, ext = os.path.splitext(master_log_file)
+    return f"{root}_lookup{ext or '.json'}"
+
+class ContactIndex:
+    """Normalized-phone and company-key index over the master log contacts"""
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self.phones = {}
+        self.companies = {}
+        self.master_last_updated = None
+        self.total_contacts = 0
+
+    @classmethod
+    def load(cls, master_log_file, master_log):
+        """Load the persisted index, rebuilding it if it is missing or stale"""
+        index = cls(default_index_file(master_log_file))
+
+        try:
+            with open(index.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = None
+
+        metadata = master_log.get('metadata', {})
+        if (data
+                and data['metadata'].get('master_last_updated') == metadata.get('last_updated')
+                and data['metadata'].get('total_contacts') == len(master_log['contacts'])):
+            index.phones = data.get('phones', {})
+            index.companies = data.get('companies', {})
+            index.master_last_updated = data['metadata'].get('master_last_updated')
+            index.total_contacts = data['metadata'].get('total_contacts', 0)
+        else:
+            print(f"🔄 Rebuilding contact index: {index.index_file}")
+            index.rebuild(master_log)
+            index.save(master_log)
+
+        return index
+
+    def rebuild(self, master_log):
+        """Rebuild both lookups from scratch with one pass over the contacts"""
+        self.phones = {}
+        self.companies = {}
+        for contact_id, contact in master_log['contacts'].items():
+            self.add(contact_id, contact)
+        self.master_last_updated = master_log.get('metadata', {}).get('last_updated')
+        self.total_contacts = len(master_log['contacts'])
+
+    def add(self, contact_id, contact):
+        """Register a new (or newly merged) contact in both lookups"""
+        clean_phone = normalize_phone_digits(contact.get('primary_phone', ''))
+        if clean_phone:
+            ids = self.phones.setdefault(clean_phone, [])
+            if contact_id not in ids:
+                ids.append(contact_id)
+
+        key = company_key(contact.get('seller_company', ''))
+        if key:
+            ids = self.companies.setdefault(key, [])
+            if contact_id not in ids:
+                ids.append(contact_id)
+
+    def find_by_phone(self, phone):
+        """Return the contact_id last registered for this phone, or None"""
+        ids = self.phones.get(normalize_phone_digits(phone))
+        return ids[-1] if ids else None
+
+    def find_by_company(self, company):
+        """Return every contact_id sharing this company key"""
+        return list(self.companies.get(company_key(company), []))
+
+    def phone_groups(self, min_size=2):
+        """Yield (clean_phone, contact_ids) for phones shared by several contacts"""
+        for clean_phone, ids in self.phones.items():
+            if len(ids) >= min_size:
+                yield clean_phone, ids
+
+    def save(self, master_log):
+        """Persist the index, stamped with the master log version it matches"""
+        self.master_last_updated = master_log.get('metadata', {}).get('last_updated')
+        self.total_contacts = len(master_log['contacts'])
+
+        data = {
+            "metadata": {
+                "created_date": datetime.now().isoformat(),
+                "master_last_updated": self.master_last_updated,
+                "total_contacts": self.total_contacts,
+                "total_phones": len(self.phones),
+                "total_companies": len(self.companies),
+                "description": "Normalized phone and company lookups for the master contact log"
+            },
+            "phones": self.phones,
+            "companies": self.companies
+        }
+
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+if __name__ == "__main__":
+    import sys
+
+    master_file = sys.argv[1] if len(sys.argv) > 1 else "master_contact_database.json"
+
+    with open(master_file, 'r', encoding='utf-8') as f:
+        master_log = json.load(f)
+
+    index = ContactIndex(default_index_file(master_file))
+    index.rebuild(master_log)
+    index.save(master_log)
+
+    print(f"✅ Contact index written: {index.index_file}")
+    print(f"   📞 Unique phones: {len(index.phones):,}")
+    print(f"   🏢 Company keys: {len(index.companies):,}")
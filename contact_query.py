@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Contact Query Builder
+Turns dashboard filter selections into parameterized SQL over unique_phones,
+so large databases are filtered, aggregated and paged in D1 instead of being
+loaded into every dashboard session
+
+Each filter maps onto an indexed predicate where one exists:
+
+    priority level   priority_score range       idx_unique_phones_priority
+    category         equipment_category = ?     idx_unique_phones_category
+    state            location-derived state     idx_unique_phones_state (expression index)
+    call status      call_status = ?            idx_unique_phones_status
+
+Pages are ordered by priority_score so the priority index also serves the
+ORDER BY ... LIMIT. Free-text search is a LIKE over company, location and
+category and is applied after the indexed predicates narrow the rows.
+
+Usage:
+    python contact_query.py index                    # Create the filter indexes in D1
+    python contact_query.py explain [state] [level]  # Show the query plan for a filter
+"""
+
+import sys
+from dialer_stats import STATE_SQL
+
+STATE_EXPRESSION = STATE_SQL.format(row='')
+
+# Same levels as the dashboard's unique_phones load query
+PRIORITY_LEVEL_SQL = """(CASE WHEN priority_score >= 90 THEN 'Premium' WHEN priority_score >= 75 THEN 'High' WHEN priority_score >= 60 THEN 'Medium' WHEN priority_score >= 50 THEN 'Standard' ELSE 'Low' END)"""
+
+# level -> (min score inclusive, max score exclusive)
+PRIORITY_SCORE_RANGES = {
+    'Premium': (90, None),
+    'High': (75, 90),
+    'Medium': (60, 75),
+    'Standard': (50, 60),
+    'Low': (None, 50),
+}
+HIGH_VALUE_SCORE = 75
+
+FILTER_INDEX_SQL = f"""
+CREATE INDEX IF NOT EXISTS idx_unique_phones_state ON unique_phones({STATE_EXPRESSION});
+CREATE INDEX IF NOT EXISTS idx_unique_phones_status ON unique_phones(call_status);
+CREATE INDEX IF NOT EXISTS idx_unique_phones_priority ON unique_phones(priority_score DESC);
+CREATE INDEX IF NOT EXISTS idx_unique_phones_category ON unique_phones(equipment_category);
+"""
+
+# Columns in the shape DashboardAnalyzer.load_data produces
+PAGE_COLUMNS = f"""
+    phone_number AS primary_phone,
+    company_name AS seller_company,
+    location AS primary_location,
+    {STATE_EXPRESSION} AS state,
+    equipment_category AS categories,
+    total_listings,
+    priority_score,
+    {PRIORITY_LEVEL_SQL} AS priority_level,
+    call_status,
+    call_attempts,
+    last_updated"""
+
+def like_pattern(term):
+    """%term% with LIKE wildcards in the term escaped (use with ESCAPE '\\')"""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+class ContactQuery:
+    """Filter state for unique_phones; None / 'All' means no filter"""
+    
+    def __init__(self, category=None, state=None, priority_level=None, call_status=None,
+                 min_listings=0, search=None):
+        self.category = category
+        self.state = state
+        self.priority_level = priority_level
+        self.call_status = call_status
+        self.min_listings = min_listings or 0
+        self.search = (search or '').strip()
+    
+    def key(self):
+        """Hashable identity of the filter (for caching results)"""
+        return (self.category, self.state, self.priority_level, self.call_status, self.min_listings, self.search)
+    
+    def where(self):
+        """(WHERE clause, params); the clause is '' when nothing is filtered"""
+        clauses, params = [], []
+        if self.priority_level not in (None, 'All'):
+            minimum, maximum = PRIORITY_SCORE_RANGES[self.priority_level]
+            if minimum is not None:
+                clauses.append("priority_score >= ?")
+                params.append(minimum)
+            if maximum is not None:
+                clauses.append("priority_score < ?")
+                params.append(maximum)
+        if self.category not in (None, 'All'):
+            clauses.append("equipment_category = ?")
+            params.append(self.category)
+        if self.state not in (None, 'All'):
+            clauses.append(f"{STATE_EXPRESSION} = ?")
+            params.append(self.state)
+        if self.call_status not in (None, 'All'):
+            clauses.append("call_status = ?")
+            params.append(self.call_status)
+        if self.min_listings > 0:
+            clauses.append("total_listings >= ?")
+            params.append(int(self.min_listings))
+        if self.search:
+            pattern = like_pattern(self.search)
+            clauses.append("(company_name LIKE ? ESCAPE '\\' OR location LIKE ? ESCAPE '\\' "
+                           "OR equipment_category LIKE ? ESCAPE '\\')")
+            params.extend([pattern] * 3)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+    
+    def page_sql(self, page=0, page_size=100):
+        """(SQL, params) for one page of matching rows, highest priority first"""
+        where, params = self.where()
+        sql = f"""
+        SELECT {PAGE_COLUMNS}
+        FROM unique_phones {where}
+        ORDER BY priority_score DESC, total_listings DESC, id
+        LIMIT ? OFFSET ?
+        """
+        return sql, params + [int(page_size), int(page) * int(page_size)]
+    
+    def summary_sql(self):
+        """(SQL, params) for totals plus state / category / priority breakdowns in one statement
+        
+        Rows are (facet, value, contacts, listings, high_value); the 'total'
+        facet has a single row with value NULL.
+        """
+        where, params = self.where()
+        measures = (f"COUNT(*) AS contacts, TOTAL(total_listings) AS listings, "
+                    f"IFNULL(SUM(priority_score >= {HIGH_VALUE_SCORE}), 0) AS high_value")
+        sql = f"""
+        SELECT 'total' AS facet, NULL AS value, {measures} FROM unique_phones {where}
+        UNION ALL SELECT 'state', {STATE_EXPRESSION}, {measures} FROM unique_phones {where} GROUP BY 2
+        UNION ALL SELECT 'category', equipment_category, {measures} FROM unique_phones {where} GROUP BY 2
+        UNION ALL SELECT 'priority', {PRIORITY_LEVEL_SQL}, {measures} FROM unique_phones {where} GROUP BY 2
+        """
+        return sql, params * 4
+
+def parse_summary(rows):
+    """{'total': {...}, 'state': [...], 'category': [...], 'priority': [...]} from summary rows"""
+    summary = {'total': {'contacts': 0, 'listings': 0, 'high_value': 0}, 'state': [], 'category': [], 'priority': []}
+    for row in rows:
+        measures = {'contacts': row['contacts'] or 0, 'listings': int(row['listings'] or 0),
+                    'high_value': row['high_value'] or 0}
+        if row['facet'] == 'total':
+            summary['total'] = measures
+        else:
+            summary[row['facet']].append({'value': row['value'], **measures})
+    for facet in ('state', 'category', 'priority'):
+        summary[facet].sort(key=lambda item: item['contacts'], reverse=True)
+    return summary
+
+def fetch_summary(run, query):
+    """Totals and breakdowns for a filter; `run(sql, params)` returns result rows"""
+    return parse_summary(run(*query.summary_sql()))
+
+def fetch_page(run, query, page=0, page_size=100):
+    """One page of matching rows as dicts"""
+    return run(*query.page_sql(page, page_size))
+
+def ensure_filter_indexes(d1):
+    """Create the indexes the filter predicates rely on"""
+    result = d1.execute_batch_query(FILTER_INDEX_SQL)
+    if not result or not result.get('success'):
+        print(f"❌ Failed to create filter indexes: {(result or {}).get('errors', 'Unknown error')}")
+        return False
+    return True
+
+def explain(d1, query):
+    """Print SQLite's plan for a filter's page query"""
+    from d1_replica import d1_rows
+    sql, params = query.page_sql()
+    for row in d1_rows(d1, f"EXPLAIN QUERY PLAN {sql}", params):
+        print(f"   • {row.get('detail')}")
+
+def main():
+    """Main function"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    
+    command = sys.argv[1].lower()
+    
+    from d1_replica import get_d1_connection
+    d1 = get_d1_connection()
+    if not d1:
+        sys.exit(1)
+    
+    if command == 'index':
+        if not ensure_filter_indexes(d1):
+            sys.exit(1)
+        print("✅ Filter indexes ready")
+    elif command == 'explain':
+        query = ContactQuery(
+            state=sys.argv[2] if len(sys.argv) > 2 else None,
+            priority_level=sys.argv[3] if len(sys.argv) > 3 else None
+        )
+        print("🔍 QUERY PLAN")
+        explain(d1, query)
+    else:
+        print(f"❌ Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
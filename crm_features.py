@@ -12,6 +12,8 @@ import sendgrid
 from sendgrid.helpers.mail import Mail
 import os
 from typing import Dict, List, Optional
+from entity_resolution import phone_key
+from lead_scheduler import LeadScheduler, is_lead_id
 
 class CRMManager:
     def __init__(self):
@@ -46,18 +48,79 @@ class CRMManager:
             json.dump(activities, f, indent=2)
     
     def load_assignments(self) -> Dict:
-        """Load lead assignments"""
+        """Load lead assignments (lead ID -> rep)"""
         try:
             with open(self.assignments_file, 'r') as f:
-                return json.load(f)
+                assignments = json.load(f)
         except:
             return {}
+        
+        # Assignments used to be keyed by DataFrame row position, which points
+        # at a different phone after every reload - those can't be recovered
+        legacy = [lead_id for lead_id in assignments if not is_lead_id(lead_id)]
+        if legacy:
+            for lead_id in legacy:
+                del assignments[lead_id]
+            self.save_assignments(assignments)
+            print(f"♻️ Dropped {len(legacy)} lead assignments keyed by row position")
+        return assignments
     
     def save_assignments(self, assignments: Dict):
         """Save lead assignments"""
         with open(self.assignments_file, 'w') as f:
             json.dump(assignments, f, indent=2)
 
+@st.cache_resource
+def get_lead_scheduler() -> LeadScheduler:
+    """One lead scheduler per server process, shared by every rep's session"""
+    # Call outcomes are written back to unique_phones through this connection
+    from d1_dialer_setup import get_d1_connection
+    return LeadScheduler.load(d1=get_d1_connection())
+
+def lead_keys(df: pd.DataFrame) -> pd.Series:
+    """Lead ID per row: the normalized phone number, stable across reloads and rescoring"""
+    phone_column = 'phone_number' if 'phone_number' in df.columns else 'primary_phone'
+    if phone_column not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[phone_column].map(phone_key)
+
+def assigned_leads(df: pd.DataFrame, assignments: Dict, rep: str) -> pd.DataFrame:
+    """Rows of df whose lead is assigned to rep"""
+    my_leads = {lead_id for lead_id, owner in assignments.items() if owner == rep}
+    return df[lead_keys(df).isin(my_leads)]
+
+def sync_lead_scheduler(scheduler: LeadScheduler, df: pd.DataFrame, assignments: Dict):
+    """Feed the dashboard's leads to the scheduler (only when the data changed)"""
+    updated_column = 'updated_at' if 'updated_at' in df.columns else 'last_updated'
+    signature = (len(df), str(df[updated_column].max()) if updated_column in df.columns else None)
+    if scheduler.source_signature == signature:
+        return
+    
+    priority = df['priority_score'] if 'priority_score' in df.columns else df.get('total_listings', pd.Series(0, index=df.index))
+    phone_column = 'phone_number' if 'phone_number' in df.columns else 'primary_phone'
+    columns = {
+        'id': lead_keys(df),
+        'phone': df[phone_column] if phone_column in df.columns else None,
+        'territory': df['state'] if 'state' in df.columns else 'Unknown',
+        'priority': pd.to_numeric(priority, errors='coerce').fillna(0),
+        'call_status': df['call_status'] if 'call_status' in df.columns else 'not_called',
+        'call_attempts': df['call_attempts'] if 'call_attempts' in df.columns else 0,
+        'last_call_date': df['last_call_date'] if 'last_call_date' in df.columns else None,
+    }
+    leads = pd.DataFrame(columns, index=df.index)
+    # One lead per phone (contacts frames can repeat a number); rows without a full number can't be dialed
+    leads = leads[leads['id'].map(is_lead_id)].drop_duplicates('id').to_dict('records')
+    
+    # Leads assigned before (or retired by) the scheduler stay with their rep
+    scheduler.sync(leads, signature=signature, exclude=set(assignments))
+
+def drop_expired_assignments(scheduler: LeadScheduler, assignments: Dict) -> bool:
+    """Take leads whose lease ran out (in expire() or inside claim()) off their rep's list"""
+    expired = [lead_id for lead_id in scheduler.drain_expired() if lead_id in assignments]
+    for lead_id in expired:
+        del assignments[lead_id]
+    return bool(expired)
+
 def render_sales_rep_selector():
     """Multi-user system for sales reps"""
     st.sidebar.markdown("### 👥 Sales Rep Login")
@@ -85,6 +148,7 @@ def render_territory_assignment(df: pd.DataFrame):
     crm = CRMManager()
     assignments = crm.load_assignments()
     current_rep = st.session_state.get('selected_rep', 'rep1')
+    scheduler = get_lead_scheduler()
     
     col1, col2 = st.columns([2, 1])
     
@@ -102,28 +166,28 @@ def render_territory_assignment(df: pd.DataFrame):
             default=states[:3] if len(states) > 3 else states
         )
         
-        # Filter unassigned leads in territory
-        if 'state' in df.columns:
-            territory_df = df[df['state'].isin(selected_states)]
-        else:
-            territory_df = df
+        # Expired leases go back in the queue and off the rep's list
+        scheduler.expire()
+        if drop_expired_assignments(scheduler, assignments):
+            crm.save_assignments(assignments)
         
-        unassigned_df = territory_df[~territory_df.index.isin(assignments.keys())]
+        sync_lead_scheduler(scheduler, df, assignments)
         
         # Handle both dialer and contacts data structures
         company_column = 'company_name' if 'company_name' in df.columns else 'seller_company'
         phone_column = 'phone_number' if 'phone_number' in df.columns else 'primary_phone'
         
-        st.metric("Available Leads in Territory", len(unassigned_df))
+        st.metric("Available Leads in Territory", scheduler.available(selected_states))
         st.metric("Your Assigned Leads", sum(1 for rep in assignments.values() if rep == current_rep))
     
     with col2:
         st.markdown("### Quick Actions")
         if st.button("📋 Claim Next 10 Leads", type="primary"):
-            # Assign next 10 leads to current rep
-            next_leads = unassigned_df.head(10)
-            for idx in next_leads.index:
-                assignments[str(idx)] = current_rep
+            # Lease the next 10 callable leads (highest priority, callbacks first)
+            next_leads = scheduler.claim(current_rep, selected_states, count=10)
+            drop_expired_assignments(scheduler, assignments)
+            for lead_id in next_leads:
+                assignments[lead_id] = current_rep
             crm.save_assignments(assignments)
             st.success(f"Claimed {len(next_leads)} new leads!")
             st.rerun()
@@ -133,8 +197,7 @@ def render_territory_assignment(df: pd.DataFrame):
     st.subheader("📋 Your Assigned Leads")
     
     # Get assigned leads for current rep
-    my_leads = [int(lead_id) for lead_id, rep in assignments.items() if rep == current_rep]
-    my_leads_df = df[df.index.isin(my_leads)]
+    my_leads_df = assigned_leads(df, assignments, current_rep)
     
     if my_leads_df.empty:
         st.info("No leads assigned yet. Use the 'Claim Next 10 Leads' button above to get started!")
@@ -362,8 +425,7 @@ def render_call_campaign_manager(df: pd.DataFrame):
     current_rep = st.session_state.get('selected_rep', 'rep1')
     
     # Get assigned leads for current rep
-    my_leads = [int(lead_id) for lead_id, rep in assignments.items() if rep == current_rep]
-    my_leads_df = df[df.index.isin(my_leads)]
+    my_leads_df = assigned_leads(df, assignments, current_rep)
     
     if my_leads_df.empty:
         st.warning("No assigned leads. Please claim some leads from the Territory section.")
@@ -455,6 +517,14 @@ def render_call_campaign_manager(df: pd.DataFrame):
                     
                     # Update button
                     if st.button("💾 Update Contact", key=f"update_{idx}"):
+                        # Hand the lead back to the scheduler: retired, requeued for retry, or a callback
+                        if new_status != "Not Called":
+                            callback_at = datetime.combine(follow_up_date, datetime.min.time()).timestamp()
+                            lead_id = lead_keys(my_leads_df.loc[[idx]]).iloc[0]
+                            if get_lead_scheduler().release(lead_id, current_rep, new_status, callback_at=callback_at):
+                                if new_status in ("Callback Scheduled", "Voicemail Left"):
+                                    assignments.pop(lead_id, None)
+                                    crm.save_assignments(assignments)
                         activities[contact_key] = {
                             'status': new_status,
                             'notes': notes,
@@ -11,18 +11,50 @@ Usage:
     python d1_dialer_setup.py populate    # Populate with unique numbers
     python d1_dialer_setup.py status      # Check table status
     python d1_dialer_setup.py export      # Export unique numbers for dialer
+    python d1_dialer_setup.py export --since [--ndjson] [--gzip]
+                                          # Only rows changed since the last export
+    python d1_dialer_setup.py export --callable-now
+                                          # Only dealers inside local business hours now
+    python d1_dialer_setup.py import <file>  # Bulk-load call dispositions (CSV/JSON/NDJSON)
 """
 
 import os
 import json
 import csv
+import gzip
 from datetime import datetime
 from dotenv import load_dotenv
 from d1_integration import D1ScraperIntegration
+from d1_snapshot import insert_statements
+from dialer_stats import PRIORITY_LEVELS, drop_phone_triggers, install_stats, load_stats
+from entity_resolution import phone_key, phone_key_sql
+from lead_scoring import get_scorer
+from area_codes import UNKNOWN_TIMEZONE, callable_timezones, push_area_codes
+from contact_query import STATE_EXPRESSION
 
 # Load environment variables
 load_dotenv()
 
+DIALER_EXPORT_DIR = "dialer_exports"
+EXPORT_STATE_FILE = os.path.join(DIALER_EXPORT_DIR, "export_state.json")
+EXPORT_FIELDS = [
+    'phone_number', 'company_name', 'contact_name', 'location',
+    'equipment_category', 'total_listings', 'priority_score',
+    'call_status', 'call_attempts', 'last_call_date', 'timezone'
+]
+
+# Disposition file column -> accepted header names
+DISPOSITION_COLUMNS = {
+    'phone': ('phone', 'phone_number', 'number'),
+    'call_status': ('status', 'call_status', 'disposition'),
+    'call_result': ('result', 'call_result'),
+    'sales_notes': ('notes', 'sales_notes'),
+    'call_date': ('call_date', 'date', 'called_at'),
+}
+
+# unique_phones.phone_number -> 10-digit key, in SQL (same rules as entity_resolution.phone_key)
+PHONE_KEY_SQL = phone_key_sql('phone_number')
+
 def get_d1_connection():
     """Get D1 database connection"""
     if not all([os.getenv('CLOUDFLARE_ACCOUNT_ID'), 
@@ -64,17 +96,21 @@ def create_unique_phones_table():
         call_result TEXT,
         sales_notes TEXT,
         priority_score INTEGER DEFAULT 50,
+        entity_id TEXT,
+        timezone TEXT,
         created_at TEXT DEFAULT (datetime('now')),
         updated_at TEXT DEFAULT (datetime('now'))
     )
     """
     
     # Create index for fast lookups
-    create_index_sql = """
+    create_index_sql = f"""
     CREATE INDEX IF NOT EXISTS idx_unique_phones_number ON unique_phones(phone_number);
     CREATE INDEX IF NOT EXISTS idx_unique_phones_status ON unique_phones(call_status);
     CREATE INDEX IF NOT EXISTS idx_unique_phones_priority ON unique_phones(priority_score DESC);
     CREATE INDEX IF NOT EXISTS idx_unique_phones_category ON unique_phones(equipment_category);
+    CREATE INDEX IF NOT EXISTS idx_unique_phones_timezone ON unique_phones(timezone);
+    CREATE INDEX IF NOT EXISTS idx_unique_phones_state ON unique_phones({STATE_EXPRESSION});
     """
     
     try:
@@ -94,6 +130,9 @@ def create_unique_phones_table():
                     print(f"⚠️ Warning: Failed to create index: {result.get('errors', 'Unknown error')}")
         
         print("✅ Created database indexes")
+        
+        if install_stats(d1):
+            print("✅ Created materialized dialer stats")
         return True
         
     except Exception as e:
@@ -109,7 +148,12 @@ def populate_unique_phones():
     if not d1:
         return False
     
+    stats_installed = False
     try:
+        # Per-row stats upkeep would double the cost of a full rewrite -
+        # the stats are rebuilt in one pass once the table is repopulated
+        drop_phone_triggers(d1)
+        
         # Clear existing data
         print("🧹 Clearing existing unique phones data...")
         result = d1.execute_query("DELETE FROM unique_phones")
@@ -119,8 +163,70 @@ def populate_unique_phones():
         
         print("🔄 Extracting unique phone numbers with proper aggregation...")
         
-        # Use a subquery to get unique phones with aggregated data
-        populate_sql = """
+        # Same dialer rules as lead_scoring.py, evaluated set-based in D1
+        priority_score_sql = get_scorer('dialer').case_sql('phone_data.listing_count')
+        
+        # Group by the shared entity clusters when they've been pushed
+        # (python entity_resolution.py d1): numbers are matched on their
+        # normalized digits and tagged with the business they belong to.
+        # Contacts added since the last push have no entity row yet and
+        # fall back to their own phone key, so they still reach the dialer
+        result = d1.execute_query("SELECT name FROM sqlite_master WHERE type='table' AND name='contact_entities'")
+        use_entities = bool(result and result.get('success') and result['result'][0]['results'])
+        
+        if use_entities:
+            # Tables created before entity resolution lack the column
+            columns = d1.execute_query("PRAGMA table_info(unique_phones)")
+            if columns and columns.get('success'):
+                if 'entity_id' not in [c['name'] for c in columns['result'][0]['results']]:
+                    d1.execute_query("ALTER TABLE unique_phones ADD COLUMN entity_id TEXT")
+            
+            entity_phone_key = f"COALESCE(ce.phone_key, {phone_key_sql('c.primary_phone')})"
+            populate_sql = f"""
+        INSERT INTO unique_phones (
+            phone_number, 
+            company_name, 
+            contact_name, 
+            location, 
+            equipment_category,
+            first_seen_date,
+            last_updated,
+            total_listings,
+            priority_score,
+            entity_id
+        )
+        SELECT 
+            phone_data.primary_phone,
+            phone_data.best_company,
+            '' as contact_name,
+            phone_data.best_location,
+            phone_data.best_category,
+            phone_data.first_seen,
+            phone_data.last_seen,
+            phone_data.listing_count,
+            {priority_score_sql} as priority_score,
+            phone_data.entity_id
+        FROM (
+            SELECT 
+                MAX(c.primary_phone) as primary_phone,
+                MAX(c.seller_company) as best_company,
+                MAX(c.primary_location) as best_location,
+                MAX(COALESCE(cs.category, 'unknown')) as best_category,
+                MIN(c.last_updated) as first_seen,
+                MAX(c.last_updated) as last_seen,
+                COUNT(*) as listing_count,
+                MAX(ce.entity_id) as entity_id
+            FROM contacts c
+            LEFT JOIN contact_entities ce ON ce.contact_id = c.id
+            LEFT JOIN contact_sources cs ON c.id = cs.contact_id
+            WHERE LENGTH({entity_phone_key}) >= 10
+            GROUP BY {entity_phone_key}
+        ) AS phone_data
+        ORDER BY phone_data.listing_count DESC
+        """
+        else:
+            # Use a subquery to get unique phones with aggregated data
+            populate_sql = f"""
         INSERT INTO unique_phones (
             phone_number, 
             company_name, 
@@ -141,12 +247,7 @@ def populate_unique_phones():
             phone_data.first_seen,
             phone_data.last_seen,
             phone_data.listing_count,
-            CASE 
-                WHEN phone_data.listing_count >= 10 THEN 90
-                WHEN phone_data.listing_count >= 5 THEN 75
-                WHEN phone_data.listing_count >= 3 THEN 60
-                ELSE 50
-            END as priority_score
+            {priority_score_sql} as priority_score
         FROM (
             SELECT 
                 c.primary_phone,
@@ -188,11 +289,64 @@ def populate_unique_phones():
         else:
             print("✅ Table populated (count check failed)")
         
-        return True
+        print("🕘 Tagging local timezones...")
+        if not push_area_codes(d1) or not tag_phone_timezones(d1):
+            return False
+        
+        print("📊 Rebuilding dialer stats...")
+        stats_installed = install_stats(d1)
+        return stats_installed
         
     except Exception as e:
         print(f"❌ Error populating table: {e}")
         return False
+    finally:
+        # A failed or aborted rewrite still needs the triggers back, or
+        # every later change to unique_phones leaves the stats behind
+        if not stats_installed:
+            print("📊 Reinstalling dialer stats after incomplete populate...")
+            install_stats(d1)
+
+def ensure_timezone_column(d1):
+    """Add unique_phones.timezone to tables created before timezone tagging; returns the column names"""
+    columns = d1.execute_query("PRAGMA table_info(unique_phones)")
+    if not columns or not columns.get('success'):
+        return set()
+    names = {c['name'] for c in columns['result'][0]['results']}
+    if 'timezone' not in names:
+        d1.execute_query("ALTER TABLE unique_phones ADD COLUMN timezone TEXT")
+        d1.execute_query("CREATE INDEX IF NOT EXISTS idx_unique_phones_timezone ON unique_phones(timezone)")
+        names.add('timezone')
+    return names
+
+def tag_phone_timezones(d1):
+    """Set unique_phones.timezone from the area_codes table in one set-based UPDATE
+    
+    Only rows whose timezone changes are written, and they get a fresh
+    updated_at so export --since deltas resend them.
+    """
+    columns = ensure_timezone_column(d1)
+    stamp = ", updated_at = datetime('now')" if 'updated_at' in columns else ""
+    
+    result = d1.execute_query(f"""
+        WITH tz AS (
+            SELECT id, IFNULL(
+                (SELECT timezone FROM area_codes
+                 WHERE LENGTH({PHONE_KEY_SQL}) = 10 AND npa = SUBSTR({PHONE_KEY_SQL}, 1, 3)),
+                '{UNKNOWN_TIMEZONE}'
+            ) AS timezone
+            FROM unique_phones
+        )
+        UPDATE unique_phones
+        SET timezone = tz.timezone{stamp}
+        FROM tz
+        WHERE tz.id = unique_phones.id AND unique_phones.timezone IS NOT tz.timezone
+    """)
+    if not result or not result.get('success'):
+        print(f"❌ Failed to tag timezones: {result.get('errors', 'Unknown error') if result else 'no response'}")
+        return False
+    print(f"   ✅ Tagged {result['result'][0].get('meta', {}).get('changes', 0):,} numbers with local timezones")
+    return True
 
 def show_dialer_status():
     """Show dialer table status and statistics"""
@@ -215,6 +369,11 @@ def show_dialer_status():
             print("💡 Run: python d1_dialer_setup.py create")
             return
         
+        stats = load_stats(d1)
+        if stats:
+            print_materialized_status(stats)
+            return
+        
         # Get basic stats
         stats_queries = {
             "Total Unique Numbers": "SELECT COUNT(*) as count FROM unique_phones",
@@ -294,8 +453,84 @@ def show_dialer_status():
     except Exception as e:
         print(f"❌ Error getting status: {e}")
 
-def export_dialer_list():
-    """Export unique phone numbers for dialer system"""
+def print_materialized_status(stats):
+    """Dialer status report from the materialized stats tables"""
+    dialer = stats['dialer']
+    total = dialer.get('total_numbers', 0)
+    
+    print("📊 DIALER STATISTICS:")
+    print(f"   • Total Unique Numbers: {total:,}")
+    print(f"   • Not Called: {dialer.get('not_called', 0):,}")
+    print(f"   • Called: {total - dialer.get('not_called', 0):,}")
+    print(f"   • High Priority (>= 75): {dialer.get('high_priority', 0):,}")
+    print(f"   • Multiple Listings (3+): {dialer.get('multi_listing', 0):,}")
+    
+    print("\n📂 TOP EQUIPMENT CATEGORIES:")
+    for row in stats['categories'][:10]:
+        print(f"   • {row['equipment_category']}: {row['phone_count']:,} numbers")
+    
+    print("\n🎯 PRIORITY DISTRIBUTION:")
+    labels = {'Very High': 'Very High (90+)', 'High': 'High (75-89)', 'Medium': 'Medium (60-74)', 'Standard': 'Standard (50-59)'}
+    for level in PRIORITY_LEVELS:
+        count = dialer.get(f'priority:{level}', 0)
+        if count:
+            print(f"   • {labels[level]}: {count:,} numbers")
+
+def load_export_state():
+    """Watermark (max updated_at) of the previous dialer export"""
+    try:
+        with open(EXPORT_STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_export_state(state):
+    temp_file = f"{EXPORT_STATE_FILE}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_file, EXPORT_STATE_FILE)
+
+def iter_dialer_rows(d1, where="", params=None, page_size=1000):
+    """Page unique_phones in priority order, keyset-paginated so no page is re-sorted from the start"""
+    columns = ', '.join(EXPORT_FIELDS)
+    base_params = list(params or [])
+    cursor = None
+    while True:
+        conditions = [where] if where else []
+        page_params = list(base_params)
+        if cursor:
+            conditions.append("""(priority_score < ? OR (priority_score = ? AND total_listings < ?)
+                 OR (priority_score = ? AND total_listings = ? AND id > ?))""")
+            score, listings, last_id = cursor
+            page_params += [score, score, listings, score, listings, last_id]
+        result = d1.execute_query(f"""
+            SELECT id, {columns}
+            FROM unique_phones
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ORDER BY priority_score DESC, total_listings DESC, id
+            LIMIT ?
+        """, page_params + [page_size])
+        
+        if not result or not result.get('success'):
+            raise RuntimeError(f"Failed to export data: {result.get('errors', 'Unknown error') if result else 'no response'}")
+        
+        rows = result['result'][0]['results']
+        if rows:
+            cursor = (rows[-1]['priority_score'], rows[-1]['total_listings'], rows[-1]['id'])
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+
+def export_dialer_list(since=False, output_format='csv', compress=False, page_size=1000, callable_now=False):
+    """Export unique phone numbers for dialer system
+    
+    Rows are streamed page by page into a CSV or NDJSON file (optionally
+    gzipped). With since=True only rows updated since the previous export's
+    watermark are written. With callable_now=True only numbers whose local
+    time is inside the call window are written; those partial exports leave
+    the delta watermark alone.
+    """
     print("📤 EXPORTING DIALER LIST")
     print("=" * 60)
     
@@ -304,77 +539,82 @@ def export_dialer_list():
         return False
     
     try:
-        # Get all unique phones sorted by priority
-        result = d1.execute_query("""
-            SELECT 
-                phone_number,
-                company_name,
-                contact_name,
-                location,
-                equipment_category,
-                total_listings,
-                priority_score,
-                call_status,
-                call_attempts,
-                last_call_date
-            FROM unique_phones 
-            ORDER BY priority_score DESC, total_listings DESC
-        """)
+        os.makedirs(DIALER_EXPORT_DIR, exist_ok=True)
+        state = load_export_state()
+        
+        # EXPORT_FIELDS selects timezone; untagged tables export it empty
+        ensure_timezone_column(d1)
         
+        # Each delta covers [previous cutoff, this cutoff) in D1's own clock, so rows
+        # changed mid-export (or within the cutoff second) land in the next delta
+        result = d1.execute_query("SELECT datetime('now') as cutoff")
         if not result or not result.get('success'):
-            print(f"❌ Failed to export data: {result.get('errors', 'Unknown error')}")
+            print(f"❌ Failed to export data: {result.get('errors', 'Unknown error') if result else 'no response'}")
             return False
+        cutoff = result['result'][0]['results'][0]['cutoff']
         
-        # Handle D1's nested result structure
-        result_data = result['result']
-        if isinstance(result_data, list) and len(result_data) > 0:
-            if 'results' in result_data[0]:
-                contacts = result_data[0]['results']
-            else:
-                contacts = result_data
-        else:
-            contacts = []
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        where, params = "", []
+        if since and state.get('watermark'):
+            where, params = "updated_at >= ? AND updated_at < ?", [state['watermark'], cutoff]
+            print(f"🔄 Delta since {state['watermark']}")
+        elif since:
+            print("💡 No previous export found - writing a full list")
         
-        # Export CSV for dialer
-        csv_filename = f"dialer_list_{timestamp}.csv"
-        with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = [
-                'phone_number', 'company_name', 'contact_name', 'location',
-                'equipment_category', 'total_listings', 'priority_score',
-                'call_status', 'call_attempts', 'last_call_date'
-            ]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(contacts)
-        
-        # Export JSON for API integration
-        json_filename = f"dialer_list_{timestamp}.json"
-        with open(json_filename, 'w', encoding='utf-8') as jsonfile:
-            json.dump({
-                'exported_at': datetime.now().isoformat(),
-                'total_numbers': len(contacts),
-                'contacts': contacts
-            }, jsonfile, indent=2)
+        if callable_now:
+            zones = sorted(callable_timezones())
+            if not zones:
+                print("⏸️  No timezones are inside the call window right now")
+                return False
+            zone_filter = f"timezone IN ({', '.join('?' for _ in zones)})"
+            where = f"{where} AND {zone_filter}" if where else zone_filter
+            params = params + zones
+            print(f"🕘 Callable now: {', '.join(zones)}")
         
-        print(f"✅ Exported {len(contacts):,} unique numbers:")
-        print(f"   • CSV: {csv_filename}")
-        print(f"   • JSON: {json_filename}")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        kind = "delta" if since and state.get('watermark') else "list"
+        if callable_now:
+            kind = f"callable_{kind}"
+        extension = 'ndjson' if output_format == 'ndjson' else 'csv'
+        filename = os.path.join(DIALER_EXPORT_DIR, f"dialer_{kind}_{timestamp}.{extension}" + (".gz" if compress else ""))
+        opener = gzip.open if compress else open
         
-        # Show priority breakdown
+        exported = 0
         priority_counts = {}
-        for contact in contacts:
-            score = contact['priority_score']
-            if score >= 90:
-                group = 'Very High (90+)'
-            elif score >= 75:
-                group = 'High (75-89)'
-            elif score >= 60:
-                group = 'Medium (60-74)'
+        with opener(filename, 'wt', newline='', encoding='utf-8') as f:
+            if output_format == 'ndjson':
+                write_row = lambda row: f.write(json.dumps(row, ensure_ascii=False) + "\n")
             else:
-                group = 'Standard (50-59)'
+                writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                write_row = writer.writerow
             
-            priority_counts[group] = priority_counts.get(group, 0) + 1
+            for contact in iter_dialer_rows(d1, where, params, page_size):
+                contact.pop('id', None)
+                write_row(contact)
+                exported += 1
+                
+                score = contact['priority_score'] or 0
+                if score >= 90:
+                    group = 'Very High (90+)'
+                elif score >= 75:
+                    group = 'High (75-89)'
+                elif score >= 60:
+                    group = 'Medium (60-74)'
+                else:
+                    group = 'Standard (50-59)'
+                
+                priority_counts[group] = priority_counts.get(group, 0) + 1
+        
+        if not callable_now:
+            save_export_state({
+                'watermark': cutoff,
+                'exported_at': datetime.now().isoformat(),
+                'file': filename,
+                'rows': exported
+            })
+        
+        print(f"✅ Exported {exported:,} unique numbers:")
+        print(f"   • {extension.upper()}: {filename}")
         
         print("\n🎯 EXPORT PRIORITY BREAKDOWN:")
         for group, count in priority_counts.items():
@@ -412,15 +652,136 @@ def update_call_result(phone_number, call_status, call_result=None, sales_notes=
         print(f"❌ Error updating call result: {e}")
         return False
 
+def read_dispositions(input_file):
+    """Yield disposition dicts from a CSV, JSON array ({"results": [...]} too) or NDJSON file"""
+    with open(input_file, 'r', encoding='utf-8-sig', newline='') as f:
+        if input_file.lower().endswith('.csv'):
+            rows = csv.DictReader(f)
+        elif input_file.lower().endswith(('.ndjson', '.jsonl')):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            data = json.load(f)
+            rows = data.get('results', data.get('contacts', [])) if isinstance(data, dict) else data
+        
+        for row in rows:
+            lowered = {str(k).strip().lower(): v for k, v in row.items()}
+            yield {
+                field: next((lowered[name] for name in names if lowered.get(name) not in (None, '')), None)
+                for field, names in DISPOSITION_COLUMNS.items()
+            }
+
+def import_call_results(input_file, d1=None):
+    """Apply a dialer's disposition file to unique_phones in a few batched requests
+    
+    Dispositions are matched on normalized phone digits. Several outcomes
+    for one number count as several attempts; the last one sets the status.
+    Results and notes the file leaves blank keep their current values.
+    Returns the phone numbers that were invalid or matched nothing (None on failure).
+    """
+    print(f"📥 IMPORTING CALL DISPOSITIONS: {input_file}")
+    print("=" * 60)
+    
+    d1 = d1 or get_d1_connection()
+    if not d1:
+        return None
+    
+    # Collapse the file to one row per number before anything goes over the wire
+    dispositions = {}
+    invalid = []
+    total = 0
+    for row in read_dispositions(input_file):
+        total += 1
+        key = phone_key(row['phone'])
+        if len(key) != 10 or not row['call_status']:
+            invalid.append(row['phone'])
+            continue
+        previous = dispositions.get(key)
+        dispositions[key] = {
+            'phone_key': key,
+            'phone': str(row['phone']),
+            'call_status': row['call_status'],
+            'call_result': row['call_result'] or (previous['call_result'] if previous else None),
+            'sales_notes': row['sales_notes'] or (previous['sales_notes'] if previous else None),
+            'call_date': row['call_date'],
+            'attempts': previous['attempts'] + 1 if previous else 1
+        }
+    
+    print(f"📊 {total:,} dispositions for {len(dispositions):,} numbers ({len(invalid):,} invalid rows skipped)")
+    if not dispositions:
+        return invalid
+    
+    try:
+        # Stage the batch, then apply it with one set-based UPDATE
+        result = d1.execute_batch_query("""
+        CREATE TABLE IF NOT EXISTS call_result_import (
+            phone_key TEXT PRIMARY KEY,
+            phone TEXT,
+            call_status TEXT,
+            call_result TEXT,
+            sales_notes TEXT,
+            call_date TEXT,
+            attempts INTEGER,
+            matched INTEGER DEFAULT 0
+        );
+        DELETE FROM call_result_import;
+        """)
+        if not result or not result.get('success'):
+            print("❌ Failed to create staging table")
+            return None
+        
+        for statement in insert_statements('call_result_import', list(dispositions.values())):
+            result = d1.execute_query(statement)
+            if not result or not result.get('success'):
+                print("❌ Failed to stage dispositions")
+                return None
+        
+        result = d1.execute_batch_query(f"""
+        UPDATE call_result_import SET matched = 1
+        WHERE phone_key IN (SELECT {PHONE_KEY_SQL} FROM unique_phones);
+        UPDATE unique_phones
+        SET
+            call_status = s.call_status,
+            call_attempts = call_attempts + s.attempts,
+            last_call_date = COALESCE(s.call_date, datetime('now')),
+            call_result = COALESCE(s.call_result, unique_phones.call_result),
+            sales_notes = COALESCE(s.sales_notes, unique_phones.sales_notes),
+            updated_at = datetime('now')
+        FROM call_result_import s
+        WHERE s.phone_key = {PHONE_KEY_SQL};
+        SELECT phone FROM call_result_import WHERE matched = 0 ORDER BY phone;
+        DROP TABLE call_result_import;
+        """)
+        if not result or not result.get('success'):
+            print("❌ Failed to apply dispositions")
+            return None
+        
+        updated = result['result'][1].get('meta', {}).get('changes', 0)
+        unmatched = [row['phone'] for row in result['result'][2]['results']]
+        
+    except Exception as e:
+        print(f"❌ Error importing call results: {e}")
+        return None
+    
+    print(f"✅ Updated {updated:,} dialer numbers")
+    if unmatched:
+        print(f"⚠️  {len(unmatched):,} numbers not found in unique_phones:")
+        for phone in unmatched[:10]:
+            print(f"   • {phone}")
+        if len(unmatched) > 10:
+            print(f"   ... and {len(unmatched) - 10:,} more")
+    
+    return unmatched + invalid
+
 def main():
     """Main function"""
     import sys
     
-    if len(sys.argv) != 2:
+    if len(sys.argv) < 2:
         print(__doc__)
         sys.exit(1)
     
     command = sys.argv[1].lower()
+    options = sys.argv[2:]
     
     if command == 'create':
         success = create_unique_phones_table()
@@ -435,8 +796,20 @@ def main():
     elif command == 'status':
         show_dialer_status()
     
+    elif command == 'import':
+        if not options:
+            print("❌ Usage: python d1_dialer_setup.py import <file>")
+            sys.exit(1)
+        if import_call_results(options[0]) is None:
+            sys.exit(1)
+    
     elif command == 'export':
-        success = export_dialer_list()
+        success = export_dialer_list(
+            since='--since' in options,
+            output_format='ndjson' if '--ndjson' in options else 'csv',
+            compress='--gzip' in options,
+            callable_now='--callable-now' in options
+        )
         if success:
             print("\n💡 Files ready for dialer system integration")
     
@@ -5,9 +5,9 @@ Safely removes duplicate contacts from Cloudflare D1 database
 
 Usage:
     python d1_duplicate_cleaner.py analyze     # Analyze duplicates (safe)
-    python d1_duplicate_cleaner.py backup      # Create backup table
+    python d1_duplicate_cleaner.py backup      # Snapshot all tables locally (d1_snapshot.py)
     python d1_duplicate_cleaner.py clean       # Remove duplicates (keep newest)
-    python d1_duplicate_cleaner.py restore     # Restore from backup
+    python d1_duplicate_cleaner.py restore     # Restore the latest snapshot
     python d1_duplicate_cleaner.py status      # Check database status
 """
 
@@ -16,6 +16,8 @@ import json
 from datetime import datetime
 from dotenv import load_dotenv
 from d1_integration import D1ScraperIntegration
+from d1_snapshot import create_snapshot, list_snapshots, load_manifest, restore_snapshot
+from entity_resolution import phone_key_sql
 
 # Load environment variables
 load_dotenv()
@@ -149,41 +151,18 @@ def analyze_duplicates():
         print(f"   • Check if recent uploads created duplicates")
 
 def create_backup():
-    """Create backup table before cleanup"""
-    print("💾 CREATING BACKUP TABLE")
+    """Snapshot every table to local compressed files before cleanup"""
+    print("💾 CREATING LOCAL SNAPSHOT")
     print("=" * 40)
     
     d1 = get_d1_connection()
     if not d1:
         return
     
-    # Check if backup already exists
-    result = d1.execute_query("SELECT name FROM sqlite_master WHERE type='table' AND name='contacts_backup'")
-    if result and result.get('success') and result['result'][0]['results']:
-        print("⚠️  Backup table already exists!")
-        response = input("Do you want to replace it? (y/N): ").lower().strip()
-        if response != 'y':
-            print("❌ Backup cancelled")
-            return
-        
-        # Drop existing backup
-        print("🗑️  Dropping existing backup...")
-        d1.execute_query("DROP TABLE contacts_backup")
-    
-    # Create backup
-    print("💾 Creating backup table...")
-    result = d1.execute_query("CREATE TABLE contacts_backup AS SELECT * FROM contacts")
-    
-    if result and result.get('success'):
-        # Verify backup
-        result = d1.execute_query("SELECT COUNT(*) as backup_count FROM contacts_backup")
-        if result and result.get('success'):
-            backup_count = result['result'][0]['results'][0]['backup_count']
-            print(f"✅ Backup created successfully!")
-            print(f"📊 Backed up {backup_count:,} contacts")
-            print(f"💡 If something goes wrong, run 'python d1_duplicate_cleaner.py restore'")
-        else:
-            print("❌ Failed to verify backup")
+    snapshot_dir = create_snapshot(d1)
+    if snapshot_dir:
+        print(f"✅ Backup created successfully!")
+        print(f"💡 If something goes wrong, run 'python d1_duplicate_cleaner.py restore'")
     else:
         print("❌ Failed to create backup")
 
@@ -197,9 +176,8 @@ def clean_duplicates():
         return
     
     # Check if backup exists
-    result = d1.execute_query("SELECT name FROM sqlite_master WHERE type='table' AND name='contacts_backup'")
-    if not (result and result.get('success') and result['result'][0]['results']):
-        print("⚠️  No backup table found!")
+    if not list_snapshots():
+        print("⚠️  No backup snapshot found!")
         print("💡 Run 'python d1_duplicate_cleaner.py backup' first")
         response = input("Continue without backup? This is RISKY! (y/N): ").lower().strip()
         if response != 'y':
@@ -215,12 +193,44 @@ def clean_duplicates():
     before_count = result['result'][0]['results'][0]['total']
     print(f"📊 Contacts before cleanup: {before_count:,}")
     
-    # Method 1: Remove exact duplicates (same phone + company), keep newest
-    print("\\n🔄 Removing exact duplicates (same phone + company)...")
-    
-    # First, get the IDs of duplicate records to delete
-    print("   📋 Finding duplicate records...")
-    find_duplicates_sql = """
+    # Prefer the shared entity clusters (python entity_resolution.py d1) over exact matching
+    result = d1.execute_query("SELECT name FROM sqlite_master WHERE type='table' AND name='contact_entities'")
+    use_entities = bool(result and result.get('success') and result['result'][0]['results'])
+    
+    if use_entities:
+        # Same business entity + same normalized phone, keep newest. Records
+        # sharing a phone key always resolve to one entity, so phone keys
+        # group on their own; contacts added since the last entity push fall
+        # back to their own phone key, and phoneless ones group by entity
+        print("\\n🔄 Removing entity duplicates (same business + phone)...")
+        print("   📋 Finding duplicate records...")
+        contact_key = f"COALESCE(ce.phone_key, {phone_key_sql('c.primary_phone')})"
+        find_duplicates_sql = f"""
+    SELECT id FROM (
+        SELECT id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY dedupe_key
+                   ORDER BY last_updated DESC, row_order DESC
+               ) as rn
+        FROM (
+            SELECT c.id, c.last_updated, c.rowid AS row_order,
+                   CASE WHEN LENGTH({contact_key}) >= 7 THEN 'phone:' || {contact_key}
+                        ELSE 'entity:' || ce.entity_id END AS dedupe_key
+            FROM contacts c
+            LEFT JOIN contact_entities ce ON ce.contact_id = c.id
+        ) keyed
+        WHERE dedupe_key IS NOT NULL
+    ) ranked
+    WHERE rn > 1
+    """
+    else:
+        # Method 1: Remove exact duplicates (same phone + company), keep newest
+        print("\\n🔄 Removing exact duplicates (same phone + company)...")
+        print("   💡 Run 'python entity_resolution.py d1' to clean by business entity instead")
+        
+        # Rank duplicates server-side
+        print("   📋 Finding duplicate records...")
+        find_duplicates_sql = """
     SELECT id FROM (
         SELECT id,
                ROW_NUMBER() OVER (
@@ -236,111 +246,92 @@ def clean_duplicates():
     WHERE rn > 1
     """
     
-    result = d1.execute_query(find_duplicates_sql)
+    # Count on the server - duplicate IDs never leave D1
+    result = d1.execute_query(f"SELECT COUNT(*) as total FROM ({find_duplicates_sql})")
     
     if not result or not result.get('success'):
         print("❌ Failed to find duplicates")
         return
-        
-    duplicate_ids = [row['id'] for row in result['result'][0]['results']]
     
-    if not duplicate_ids:
+    duplicate_count = result['result'][0]['results'][0]['total']
+    
+    if not duplicate_count:
         print("✅ No exact duplicates found!")
         return
     
-    print(f"   🗑️  Found {len(duplicate_ids)} duplicate records to remove")
-    
-    # Delete from contact_sources first (due to foreign key constraint)
-    print("   🔗 Removing contact_sources references...")
-    for i in range(0, len(duplicate_ids), 100):  # Process in batches
-        batch_ids = duplicate_ids[i:i+100]
-        id_list = "', '".join(batch_ids)
-        delete_sources_sql = f"DELETE FROM contact_sources WHERE contact_id IN ('{id_list}')"
-        
-        sources_result = d1.execute_query(delete_sources_sql)
-        if not sources_result or not sources_result.get('success'):
-            print(f"⚠️  Warning: Failed to delete contact_sources for batch {i//100 + 1}")
-    
-    # Now delete from contacts
-    print("   👥 Removing duplicate contacts...")
-    for i in range(0, len(duplicate_ids), 100):  # Process in batches  
-        batch_ids = duplicate_ids[i:i+100]
-        id_list = "', '".join(batch_ids)
-        delete_contacts_sql = f"DELETE FROM contacts WHERE id IN ('{id_list}')"
-        
-        contacts_result = d1.execute_query(delete_contacts_sql)
-        if not contacts_result or not contacts_result.get('success'):
-            print(f"❌ Failed to delete contacts for batch {i//100 + 1}")
-            return
-        
-        print(f"      ✅ Deleted batch {i//100 + 1}/{(len(duplicate_ids)-1)//100 + 1}")
-    
-    result = {"success": True}  # Mark as successful if we got here
+    print(f"   🗑️  Found {duplicate_count:,} duplicate records to remove")
+    
+    # One batched request: snapshot the duplicate IDs into a staging table so
+    # every DELETE sees the same set, then remove dependents before contacts
+    print("   ⚡ Deleting equipment_data, contact_sources and contacts server-side...")
+    statements = [
+        "CREATE TABLE IF NOT EXISTS cleanup_duplicate_ids (id TEXT PRIMARY KEY)",
+        "DELETE FROM cleanup_duplicate_ids",
+        f"INSERT INTO cleanup_duplicate_ids (id) {find_duplicates_sql}",
+        "DELETE FROM equipment_data WHERE contact_id IN (SELECT id FROM cleanup_duplicate_ids)",
+        "DELETE FROM contact_sources WHERE contact_id IN (SELECT id FROM cleanup_duplicate_ids)",
+        "DELETE FROM contacts WHERE id IN (SELECT id FROM cleanup_duplicate_ids)",
+    ]
+    if use_entities:
+        statements.append("DELETE FROM contact_entities WHERE contact_id IN (SELECT id FROM cleanup_duplicate_ids)")
+    statements.append("DROP TABLE cleanup_duplicate_ids")
+    
+    result = d1.execute_batch_query(";\n".join(statements) + ";")
     
-    if result and result.get('success'):
-        # Get new count
-        result = d1.execute_query("SELECT COUNT(*) as total FROM contacts")
-        if result and result.get('success'):
-            after_count = result['result'][0]['results'][0]['total']
-            removed_count = before_count - after_count
-            
-            print(f"✅ Cleanup completed!")
-            print(f"📊 Results:")
-            print(f"   • Contacts before: {before_count:,}")
-            print(f"   • Contacts after: {after_count:,}")
-            print(f"   • Duplicates removed: {removed_count:,}")
-            print(f"   • Space saved: {(removed_count/before_count)*100:.1f}%")
-            
-            if removed_count > 0:
-                print(f"\\n💡 Next steps:")
-                print(f"   1. Run 'python d1_duplicate_cleaner.py analyze' to verify")
-                print(f"   2. Test your application with the cleaned data")
-                print(f"   3. If satisfied, you can drop the backup table")
-        else:
-            print("❌ Failed to get final count")
-    else:
+    if not result or not result.get('success'):
         print("❌ Cleanup failed!")
         print(f"💡 If data was corrupted, run 'python d1_duplicate_cleaner.py restore'")
+        return
+    
+    # Per-statement row counts as reported by D1
+    changes = [step.get('meta', {}).get('changes', 0) for step in result['result']]
+    print(f"      ✅ equipment_data rows removed: {changes[3]:,}")
+    print(f"      ✅ contact_sources rows removed: {changes[4]:,}")
+    print(f"      ✅ contacts removed: {changes[5]:,}")
+    
+    after_count = before_count - changes[5]
+    removed_count = changes[5]
+    
+    print(f"✅ Cleanup completed!")
+    print(f"📊 Results:")
+    print(f"   • Contacts before: {before_count:,}")
+    print(f"   • Contacts after: {after_count:,}")
+    print(f"   • Duplicates removed: {removed_count:,}")
+    print(f"   • Space saved: {(removed_count/before_count)*100:.1f}%")
+    
+    if removed_count > 0:
+        print(f"\\n💡 Next steps:")
+        print(f"   1. Run 'python d1_duplicate_cleaner.py analyze' to verify")
+        print(f"   2. Test your application with the cleaned data")
+        print(f"   3. If satisfied, old snapshots in d1_snapshots/ can be deleted")
 
 def restore_from_backup():
-    """Restore contacts table from backup"""
+    """Restore every table (schema, data and indexes) from the latest snapshot"""
     print("🔄 RESTORING FROM BACKUP")
     print("=" * 30)
     
-    d1 = get_d1_connection()
-    if not d1:
+    snapshots = list_snapshots()
+    if not snapshots:
+        print("❌ No backup snapshot found!")
         return
     
-    # Check if backup exists
-    result = d1.execute_query("SELECT name FROM sqlite_master WHERE type='table' AND name='contacts_backup'")
-    if not (result and result.get('success') and result['result'][0]['results']):
-        print("❌ No backup table found!")
-        return
-    
-    # Get backup count
-    result = d1.execute_query("SELECT COUNT(*) as backup_count FROM contacts_backup")
-    if not result or not result.get('success'):
-        print("❌ Failed to read backup table")
-        return
-    
-    backup_count = result['result'][0]['results'][0]['backup_count']
-    print(f"📊 Backup contains {backup_count:,} contacts")
+    snapshot_dir = snapshots[0]
+    manifest = load_manifest(snapshot_dir)
+    print(f"📁 Snapshot: {snapshot_dir} ({manifest['created']})")
+    for table, entry in manifest['tables'].items():
+        print(f"   • {table}: {entry['rows']:,} rows")
     
     response = input(f"Are you sure you want to restore? This will REPLACE current data! (y/N): ").lower().strip()
     if response != 'y':
         print("❌ Restore cancelled")
         return
     
-    # Drop current table and restore from backup
-    print("🗑️  Dropping current contacts table...")
-    d1.execute_query("DROP TABLE contacts")
-    
-    print("🔄 Restoring from backup...")
-    result = d1.execute_query("CREATE TABLE contacts AS SELECT * FROM contacts_backup")
+    d1 = get_d1_connection()
+    if not d1:
+        return
     
-    if result and result.get('success'):
+    if restore_snapshot(snapshot_dir, d1):
         print(f"✅ Restore completed!")
-        print(f"📊 Restored {backup_count:,} contacts")
     else:
         print("❌ Restore failed!")
 
@@ -359,13 +350,14 @@ def check_status():
         total = result['result'][0]['results'][0]['total']
         print(f"📋 Contacts table: {total:,} records")
     
-    # Backup table
-    result = d1.execute_query("SELECT COUNT(*) as backup_total FROM contacts_backup")
-    if result and result.get('success'):
-        backup_total = result['result'][0]['results'][0]['backup_total']
-        print(f"💾 Backup table: {backup_total:,} records")
+    # Latest local snapshot
+    snapshots = list_snapshots()
+    if snapshots:
+        manifest = load_manifest(snapshots[0])
+        backup_total = manifest['tables'].get('contacts', {}).get('rows', 0)
+        print(f"💾 Latest snapshot: {backup_total:,} contacts ({manifest['created']})")
     else:
-        print("💾 Backup table: Not found")
+        print("💾 Backup snapshot: Not found")
     
     # Contact sources
     result = d1.execute_query("SELECT COUNT(*) as sources_total FROM contact_sources")
@@ -390,9 +382,9 @@ def main():
         print("=" * 40)
         print("Usage:")
         print("  python d1_duplicate_cleaner.py analyze   # Analyze duplicates (safe)")
-        print("  python d1_duplicate_cleaner.py backup    # Create backup table")
+        print("  python d1_duplicate_cleaner.py backup    # Snapshot all tables locally")
         print("  python d1_duplicate_cleaner.py clean     # Remove duplicates (keep newest)")
-        print("  python d1_duplicate_cleaner.py restore   # Restore from backup")
+        print("  python d1_duplicate_cleaner.py restore   # Restore the latest snapshot")
         print("  python d1_duplicate_cleaner.py status    # Check database status")
         print()
         print("⚠️  IMPORTANT: Always run 'backup' before 'clean'!")
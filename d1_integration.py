@@ -270,8 +270,12 @@ class D1ScraperIntegration:
             print(f"❌ Batch query failed: {response.status_code} - {response.text}")
             return None
 
-    def fast_batch_insert_contacts(self, contacts_data, category, source_site, batch_size=50):
-        """Ultra-fast batch insert using single API calls for batches"""
+    def fast_batch_insert_contacts(self, contacts_data, category, source_site, batch_size=50, on_batch_committed=None):
+        """Ultra-fast batch insert using single API calls for batches
+        
+        on_batch_committed, if given, is called with each batch of contacts
+        once D1 has accepted it.
+        """
         total_contacts = len(contacts_data)
         processed = 0
         
@@ -294,14 +298,19 @@ class D1ScraperIntegration:
                 contact_id = self.create_contact_id(phone, company)
                 city, state = self.extract_location_parts(location)
                 
-                # Build INSERT OR REPLACE for contact
+                # Upsert the contact - an update (not REPLACE's silent delete +
+                # insert) so the contacts stats triggers only count new rows
                 contact_sql = f"""
-                    INSERT OR REPLACE INTO contacts 
+                    INSERT INTO contacts 
                     (id, seller_company, primary_phone, primary_location, 
                      total_listings, first_contact_date, last_updated, city, state) 
                     VALUES ('{contact_id}', '{company.replace("'", "''")}', '{phone}', '{location.replace("'", "''")}', 
                             1, '{datetime.now().strftime('%Y-%m-%d')}', '{datetime.now().isoformat()}', 
-                            '{city.replace("'", "''")}', '{state}');
+                            '{city.replace("'", "''")}', '{state}')
+                    ON CONFLICT(id) DO UPDATE SET 
+                        seller_company = excluded.seller_company, primary_phone = excluded.primary_phone, 
+                        primary_location = excluded.primary_location, last_updated = excluded.last_updated, 
+                        city = excluded.city, state = excluded.state;
                 """
                 sql_statements.append(contact_sql)
                 
@@ -333,6 +342,8 @@ class D1ScraperIntegration:
                 
                 if result:
                     processed += len(batch)
+                    if on_batch_committed:
+                        on_batch_committed(batch)
                     progress = min(i + batch_size, total_contacts)
                     print(f"   ⚡ Batch {i//batch_size + 1}: {progress:,}/{total_contacts:,} contacts ({progress/total_contacts*100:.1f}%)")
                 else:
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+D1 Local Replica
+Keeps a local SQLite copy of the D1 contact tables so analysis tools and the
+dashboard can read without a Cloudflare round trip per query
+
+The first sync is a full paged copy. Later syncs only pull rows changed since
+the stored watermark: contacts by last_updated, unique_phones by updated_at,
+and the append-only contact_sources / equipment_data tables by id.
+contact_sources rows are also updated in place (listing_count), always
+together with their contact's last_updated, so the sources of every contact
+changed since the last sync are re-pulled as well.
+Rows deleted in D1 are only dropped from the replica by a full sync.
+
+Usage:
+    python d1_replica.py sync      # Incremental sync (full copy on first run)
+    python d1_replica.py full      # Force a full re-copy of every table
+    python d1_replica.py status    # Show replica row counts and watermarks
+
+Readers (dashboard.py, contact_analyzer.py, target_finder.py) use the replica
+when USE_D1_REPLICA=1; D1_REPLICA_PATH overrides the file location.
+"""
+
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+from dotenv import load_dotenv
+from d1_integration import D1ScraperIntegration
+
+# Load environment variables
+load_dotenv()
+
+REPLICA_FILE = os.getenv('D1_REPLICA_PATH', 'd1_replica.sqlite')
+PAGE_SIZE = 1000
+
+# table -> column that changes when a row is updated (None = append-only, synced by id)
+SYNC_TABLES = {
+    'contacts': 'last_updated',
+    'contact_sources': None,
+    'equipment_data': None,
+    'unique_phones': 'updated_at',
+}
+
+# id-synced table -> (foreign key, parent table) whose sync column moves whenever its rows are updated
+PARENT_TABLES = {
+    'contact_sources': ('contact_id', 'contacts'),
+}
+
+CREATE_PREFIX = re.compile(r'^\s*CREATE\s+(UNIQUE\s+)?(TABLE|INDEX)\s+(?!IF\s+NOT\s+EXISTS)', re.IGNORECASE)
+
+def get_d1_connection():
+    """Get D1 database connection"""
+    if not all([os.getenv('CLOUDFLARE_ACCOUNT_ID'),
+                os.getenv('D1_DATABASE_ID'),
+                os.getenv('CLOUDFLARE_API_TOKEN')]):
+        print("❌ Missing D1 credentials in .env file")
+        return None
+    
+    return D1ScraperIntegration(
+        os.getenv('CLOUDFLARE_ACCOUNT_ID'),
+        os.getenv('D1_DATABASE_ID'),
+        os.getenv('CLOUDFLARE_API_TOKEN')
+    )
+
+def d1_rows(d1, sql, params=None):
+    """Run a D1 query and return its result rows (raises if the query fails)"""
+    result = d1.execute_query(sql, params)
+    if not result or not result.get('success'):
+        raise RuntimeError(f"D1 query failed: {sql.strip().splitlines()[0]}")
+    return result['result'][0].get('results', [])
+
+def use_replica(replica_file=None):
+    """True when readers should query the local replica instead of D1"""
+    if os.getenv('USE_D1_REPLICA', '').lower() not in ('1', 'true', 'yes'):
+        return False
+    return os.path.exists(replica_file or REPLICA_FILE)
+
+def connect_replica(replica_file=None):
+    """Open the replica with dict-like rows"""
+    conn = sqlite3.connect(replica_file or REPLICA_FILE)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def query_replica(sql, params=(), replica_file=None):
+    """Run a read query on the replica and return rows as dicts (same shape as D1 results)"""
+    conn = connect_replica(replica_file)
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+def load_replica_master_log(replica_file=None):
+    """Rebuild the master-log structure (metadata + contacts with sources) from the replica"""
+    conn = connect_replica(replica_file)
+    try:
+        contacts = {}
+        for row in conn.execute("SELECT * FROM contacts"):
+            contacts[row['id']] = {
+                'contact_id': row['id'],
+                'primary_phone': row['primary_phone'] or '',
+                'seller_company': row['seller_company'] or '',
+                'primary_location': row['primary_location'] or '',
+                'email': row['email'] or '',
+                'sources': [],
+                'total_listings': row['total_listings'] or 0,
+                'first_contact_date': row['first_contact_date'] or '',
+                'last_updated': row['last_updated'] or '',
+                'additional_info': {},
+                'contact_priority': row['priority_level'] or 'medium',
+                'notes': row['notes'] or ''
+            }
+        
+        total_sources = 0
+        for row in conn.execute("SELECT * FROM contact_sources ORDER BY id"):
+            contact = contacts.get(row['contact_id'])
+            if contact is None:
+                continue
+            contact['sources'].append({
+                'site': row['site'] or '',
+                'category': row['category'] or '',
+                'first_seen': row['first_seen'] or '',
+                'page_url': row['page_url'] or '',
+                'listing_count': row['listing_count'] or 0
+            })
+            total_sources += 1
+        
+        state = {row['table_name']: row['synced_at'] for row in conn.execute("SELECT * FROM _sync_state")}
+    finally:
+        conn.close()
+    
+    return {
+        'metadata': {
+            'last_updated': state.get('contacts'),
+            'total_sources': total_sources,
+            'source': replica_file or REPLICA_FILE
+        },
+        'contacts': contacts
+    }
+
+def ensure_schema(d1, conn):
+    """Create the replicated tables and indexes locally using D1's own DDL"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS _sync_state (
+        table_name TEXT PRIMARY KEY,
+        sync_column TEXT,
+        watermark TEXT,
+        last_id INTEGER DEFAULT 0,
+        rows_synced INTEGER DEFAULT 0,
+        synced_at TEXT
+    )
+    """)
+    
+    placeholders = ', '.join('?' for _ in SYNC_TABLES)
+    schema = d1_rows(d1, f"""
+    SELECT type, name, sql FROM sqlite_master
+    WHERE tbl_name IN ({placeholders}) AND type IN ('table', 'index') AND sql IS NOT NULL
+    ORDER BY type DESC
+    """, list(SYNC_TABLES))
+    
+    for entry in schema:
+        conn.execute(CREATE_PREFIX.sub(lambda m: m.group(0) + 'IF NOT EXISTS ', entry['sql'], count=1))
+    conn.commit()
+
+def get_sync_state(conn, table):
+    """Stored watermark for a table, or None if it has never been synced"""
+    return conn.execute("SELECT * FROM _sync_state WHERE table_name = ?", (table,)).fetchone()
+
+def upsert_rows(conn, table, rows):
+    """Insert or replace a page of D1 rows into the replica"""
+    if not rows:
+        return
+    columns = [column for column in rows[0] if not column.startswith('_')]
+    sql = f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    conn.executemany(sql, [[row.get(column) for column in columns] for row in rows])
+
+def sync_table(d1, conn, table, full=False, page_size=PAGE_SIZE):
+    """Copy one table from D1, fully or only rows past its watermark"""
+    sync_column = SYNC_TABLES[table]
+    state = None if full else get_sync_state(conn, table)
+    
+    if state is None:
+        # Full paged copy, keyed on rowid so pages stay stable while D1 is written to
+        conn.execute(f"DELETE FROM {table}")
+        watermark, last_rowid, copied = None, 0, 0
+        while True:
+            rows = d1_rows(d1, f"SELECT rowid AS _rowid, * FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                           [last_rowid, page_size])
+            upsert_rows(conn, table, rows)
+            copied += len(rows)
+            if rows:
+                last_rowid = rows[-1]['_rowid']
+                if sync_column:
+                    page_max = max((row[sync_column] or '' for row in rows), default='')
+                    watermark = max(watermark or '', page_max)
+            if len(rows) < page_size:
+                break
+        last_id = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+    
+    elif sync_column:
+        # Changed rows, paged on (sync_column, rowid); rows at exactly the old
+        # watermark are re-read so same-second updates are never missed
+        watermark, last_rowid, copied = state['watermark'] or '', 0, 0
+        start = watermark
+        while True:
+            rows = d1_rows(d1, f"""
+            SELECT rowid AS _rowid, * FROM {table}
+            WHERE {sync_column} > ? OR ({sync_column} = ? AND rowid > ?)
+            ORDER BY {sync_column}, rowid LIMIT ?
+            """, [start, start, last_rowid, page_size])
+            upsert_rows(conn, table, rows)
+            copied += len(rows)
+            if rows:
+                start, last_rowid = rows[-1][sync_column], rows[-1]['_rowid']
+                watermark = max(watermark, start)
+            if len(rows) < page_size:
+                break
+        last_id = state['last_id']
+    
+    else:
+        # Append-only tables: everything past the highest id we hold
+        last_id, copied, watermark = state['last_id'] or 0, 0, None
+        while True:
+            rows = d1_rows(d1, f"SELECT * FROM {table} WHERE id > ? ORDER BY id LIMIT ?", [last_id, page_size])
+            upsert_rows(conn, table, rows)
+            copied += len(rows)
+            if rows:
+                last_id = rows[-1]['id']
+            if len(rows) < page_size:
+                break
+        
+        if table in PARENT_TABLES:
+            copied += resync_child_rows(d1, conn, table, state['watermark'], page_size)
+    
+    if table in PARENT_TABLES:
+        # Watermark = the parent's, as just synced; re-read from it (inclusive) next time
+        parent_state = get_sync_state(conn, PARENT_TABLES[table][1])
+        watermark = parent_state['watermark'] if parent_state else None
+    
+    conn.execute("""
+    INSERT OR REPLACE INTO _sync_state (table_name, sync_column, watermark, last_id, rows_synced, synced_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    """, (table, sync_column or 'id', watermark, last_id, copied, datetime.now().isoformat()))
+    conn.commit()
+    return copied
+
+def resync_child_rows(d1, conn, table, parent_watermark, page_size=PAGE_SIZE):
+    """Re-pull an id-synced table's rows whose parent changed since parent_watermark
+
+    Replicas synced before the parent watermark was tracked (None) re-pull
+    every row once.
+    """
+    foreign_key, parent = PARENT_TABLES[table]
+    parent_column = SYNC_TABLES[parent]
+    last_id, copied = 0, 0
+    while True:
+        rows = d1_rows(d1, f"""
+        SELECT t.* FROM {parent} p JOIN {table} t ON t.{foreign_key} = p.id
+        WHERE p.{parent_column} >= ? AND t.id > ?
+        ORDER BY t.id LIMIT ?
+        """, [parent_watermark or '', last_id, page_size])
+        upsert_rows(conn, table, rows)
+        copied += len(rows)
+        if rows:
+            last_id = rows[-1]['id']
+        if len(rows) < page_size:
+            break
+    return copied
+
+def sync_replica(full=False, replica_file=None):
+    """Sync every replicated table from D1 into the local SQLite file"""
+    replica_file = replica_file or REPLICA_FILE
+    print("🔄 SYNCING D1 → LOCAL REPLICA")
+    print("=" * 60)
+    
+    d1 = get_d1_connection()
+    if not d1:
+        return False
+    
+    conn = sqlite3.connect(replica_file)
+    conn.row_factory = sqlite3.Row
+    try:
+        ensure_schema(d1, conn)
+        for table in SYNC_TABLES:
+            mode = 'full copy' if full or get_sync_state(conn, table) is None else 'incremental'
+            copied = sync_table(d1, conn, table, full=full)
+            print(f"   ✅ {table}: {copied:,} rows ({mode})")
+    except RuntimeError as e:
+        print(f"❌ Sync failed: {e}")
+        return False
+    finally:
+        conn.close()
+    
+    print(f"\n🎉 Replica up to date: {replica_file}")
+    return True
+
+def show_replica_status(replica_file=None):
+    """Print row counts and watermarks for the local replica"""
+    replica_file = replica_file or REPLICA_FILE
+    if not os.path.exists(replica_file):
+        print(f"❌ No replica found at {replica_file}. Run: python d1_replica.py sync")
+        return
+    
+    print(f"📊 REPLICA STATUS: {replica_file}")
+    print("=" * 60)
+    conn = connect_replica(replica_file)
+    try:
+        for table in SYNC_TABLES:
+            state = get_sync_state(conn, table)
+            if state is None:
+                print(f"   ⚪ {table}: never synced")
+                continue
+            count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            watermark = state['watermark'] if state['sync_column'] != 'id' else f"id {state['last_id']}"
+            print(f"   • {table}: {count:,} rows | watermark {watermark} | synced {state['synced_at']}")
+    finally:
+        conn.close()
+
+def main():
+    """Main function"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    
+    command = sys.argv[1].lower()
+    
+    if command == 'sync':
+        if not sync_replica():
+            sys.exit(1)
+    elif command == 'full':
+        if not sync_replica(full=True):
+            sys.exit(1)
+    elif command == 'status':
+        show_replica_status()
+    else:
+        print(f"❌ Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
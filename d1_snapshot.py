@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+D1 Snapshots
+Fast local backups of every D1 table, and complete restores from them
+
+A snapshot is a directory of gzip-compressed NDJSON chunks plus a
+manifest.json holding each table's CREATE statement, indexes, triggers, row
+counts and chunk checksums. Tables are exported in rowid ranges fetched in
+parallel, so backups cost no D1 storage. Restores recreate each table from
+its original DDL, bulk-load the chunks and only then rebuild the indexes.
+D1 enforces foreign keys, so tables are dropped children first (in one
+batch) and recreated parents first.
+
+Usage:
+    python d1_snapshot.py backup [table ...]           # Snapshot all (or some) tables
+    python d1_snapshot.py restore [snapshot] [table ...]  # Restore latest (or given) snapshot
+    python d1_snapshot.py list                         # List local snapshots
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from d1_replica import d1_rows, get_d1_connection
+
+SNAPSHOT_DIR = os.getenv('D1_SNAPSHOT_DIR', 'd1_snapshots')
+CHUNK_ROWS = 5000
+PAGE_SIZE = 1000
+WORKERS = 4
+MAX_STATEMENT_BYTES = 90000  # stay under D1's per-statement size limit
+
+# Scratch/internal tables that never belong in a snapshot
+SKIP_TABLES = ('contacts_backup', 'cleanup_duplicate_ids')
+
+REFERENCES = re.compile(r'\bREFERENCES\s+["`\[]?(\w+)', re.IGNORECASE)
+
+def list_tables(d1):
+    """User tables in D1 with their CREATE statements"""
+    rows = d1_rows(d1, """
+    SELECT name, sql FROM sqlite_master
+    WHERE type = 'table' AND sql IS NOT NULL
+    AND name NOT LIKE 'sqlite_%' AND name NOT LIKE '_cf_%'
+    ORDER BY name
+    """)
+    return {row['name']: row['sql'] for row in rows if row['name'] not in SKIP_TABLES}
+
+def table_extras(d1, table):
+    """CREATE statements for the indexes and triggers defined on a table"""
+    rows = d1_rows(d1, """
+    SELECT type, sql FROM sqlite_master
+    WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ORDER BY type, name
+    """, [table])
+    return ([row['sql'] for row in rows if row['type'] == 'index'],
+            [row['sql'] for row in rows if row['type'] == 'trigger'])
+
+def export_chunk(d1, table, low, high, path, page_size=PAGE_SIZE):
+    """Write rows with low <= rowid < high to a gzip NDJSON chunk; returns (rows, sha256)"""
+    count, last_rowid = 0, low - 1
+    digest = hashlib.sha256()
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        while True:
+            rows = d1_rows(d1, f"""
+            SELECT rowid AS _rowid, * FROM {table}
+            WHERE rowid > ? AND rowid < ? ORDER BY rowid LIMIT ?
+            """, [last_rowid, high, page_size])
+            for row in rows:
+                last_rowid = row.pop('_rowid')
+                line = json.dumps(row, ensure_ascii=False) + "\n"
+                f.write(line)
+                digest.update(line.encode('utf-8'))
+            count += len(rows)
+            if len(rows) < page_size:
+                break
+    return count, digest.hexdigest()
+
+def create_snapshot(d1=None, tables=None, snapshot_dir=None, workers=WORKERS, chunk_rows=CHUNK_ROWS):
+    """Export tables to a new local snapshot directory; returns its path (None on failure)"""
+    d1 = d1 or get_d1_connection()
+    if not d1:
+        return None
+    
+    snapshot_dir = snapshot_dir or os.path.join(SNAPSHOT_DIR, datetime.now().strftime('snapshot_%Y%m%d_%H%M%S'))
+    os.makedirs(snapshot_dir, exist_ok=True)
+    
+    try:
+        schema = list_tables(d1)
+        unknown = [table for table in tables or [] if table not in schema]
+        if unknown:
+            print(f"❌ Unknown tables: {', '.join(unknown)}")
+            return None
+        
+        manifest = {'created': datetime.now().isoformat(), 'format': 'ndjson.gz', 'tables': {}}
+        tasks = []
+        for table in tables or schema:
+            bounds = d1_rows(d1, f"SELECT MIN(rowid) AS low, MAX(rowid) AS high, COUNT(*) AS total FROM {table}")[0]
+            indexes, triggers = table_extras(d1, table)
+            entry = manifest['tables'][table] = {
+                'sql': schema[table], 'indexes': indexes, 'triggers': triggers,
+                'rows': 0, 'chunks': []
+            }
+            if not bounds['total']:
+                continue
+            
+            # Split the rowid span into ranges of roughly chunk_rows rows each
+            span = bounds['high'] - bounds['low'] + 1
+            step = max(chunk_rows, span * chunk_rows // bounds['total'] + 1)
+            for n, low in enumerate(range(bounds['low'], bounds['high'] + 1, step)):
+                chunk = {'file': f"{table}.{n:05d}.ndjson.gz"}
+                entry['chunks'].append(chunk)
+                tasks.append((table, chunk, low, low + step))
+        
+        print(f"📤 Exporting {len(manifest['tables'])} tables in {len(tasks)} chunks...")
+        
+        def run(task):
+            table, chunk, low, high = task
+            chunk['rows'], chunk['sha256'] = export_chunk(d1, table, low, high, os.path.join(snapshot_dir, chunk['file']))
+            return table, chunk['rows']
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for table, rows in executor.map(run, tasks):
+                manifest['tables'][table]['rows'] += rows
+    except RuntimeError as e:
+        print(f"❌ Snapshot failed: {e}")
+        return None
+    
+    # Manifest last - a snapshot without one is incomplete and never restored
+    with open(os.path.join(snapshot_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    for table, entry in manifest['tables'].items():
+        print(f"   ✅ {table}: {entry['rows']:,} rows")
+    print(f"💾 Snapshot saved: {snapshot_dir}")
+    return snapshot_dir
+
+def list_snapshots(snapshot_root=None):
+    """Complete snapshots (those with a manifest), newest first"""
+    snapshot_root = snapshot_root or SNAPSHOT_DIR
+    if not os.path.isdir(snapshot_root):
+        return []
+    paths = [os.path.join(snapshot_root, name) for name in os.listdir(snapshot_root)]
+    return sorted((path for path in paths if os.path.exists(os.path.join(path, 'manifest.json'))), reverse=True)
+
+def load_manifest(snapshot_dir):
+    with open(os.path.join(snapshot_dir, 'manifest.json'), 'r') as f:
+        return json.load(f)
+
+def sql_literal(value):
+    """Inline SQL literal for a JSON-decoded value"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+def insert_statements(table, rows):
+    """Multi-row INSERTs for rows sharing a column layout, each under MAX_STATEMENT_BYTES"""
+    columns = list(rows[0])
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    prefix_bytes = len(prefix.encode('utf-8'))
+    values, size = [], prefix_bytes
+    for row in rows:
+        value = "(" + ", ".join(sql_literal(row.get(column)) for column in columns) + ")"
+        value_bytes = len(value.encode('utf-8'))
+        if values and size + value_bytes + 2 > MAX_STATEMENT_BYTES:
+            yield prefix + ", ".join(values)
+            values, size = [], prefix_bytes
+        values.append(value)
+        size += value_bytes + 2
+    if values:
+        yield prefix + ", ".join(values)
+
+def restore_chunk(d1, table, path, expected_sha256=None):
+    """Bulk-load one chunk file into a (freshly created) table; returns rows loaded"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        lines = f.readlines()
+    if expected_sha256:
+        digest = hashlib.sha256()
+        for line in lines:
+            digest.update(line.encode('utf-8'))
+        if digest.hexdigest() != expected_sha256:
+            raise RuntimeError(f"Checksum mismatch in {os.path.basename(path)}")
+    
+    rows = [json.loads(line) for line in lines]
+    if not rows:
+        return 0
+    for statement in insert_statements(table, rows):
+        result = d1.execute_query(statement)
+        if not result or not result.get('success'):
+            raise RuntimeError(f"Insert failed while restoring {os.path.basename(path)}")
+    return len(rows)
+
+def restore_order(manifest, tables):
+    """Tables to restore, parents before the tables whose foreign keys reference them
+    
+    Tables in the snapshot that reference a restored table are restored
+    with it - their rows would block dropping the parent otherwise.
+    """
+    references = {
+        table: {name.lower() for name in REFERENCES.findall(entry['sql'])} - {table.lower()}
+        for table, entry in manifest['tables'].items()
+    }
+    selected = set(tables)
+    while True:
+        children = {
+            table for table, parents in references.items()
+            if table not in selected and parents & {name.lower() for name in selected}
+        }
+        if not children:
+            break
+        selected |= children
+    
+    ordered = []
+    pending = [table for table in manifest['tables'] if table in selected]
+    while pending:
+        waiting = {name.lower() for name in pending}
+        ready = [table for table in pending if not references[table] & waiting]
+        for table in ready or pending[:1]:  # a reference cycle is broken in manifest order
+            ordered.append(table)
+            pending.remove(table)
+    return ordered
+
+def restore_snapshot(snapshot_dir, d1=None, tables=None, workers=WORKERS):
+    """Recreate tables from a snapshot: original DDL, bulk data load, then indexes and triggers"""
+    d1 = d1 or get_d1_connection()
+    if not d1:
+        return False
+    
+    manifest = load_manifest(snapshot_dir)
+    tables = tables or list(manifest['tables'])
+    unknown = [table for table in tables if table not in manifest['tables']]
+    if unknown:
+        print(f"❌ Tables not in snapshot: {', '.join(unknown)}")
+        return False
+    
+    ordered = restore_order(manifest, tables)
+    dependents = [table for table in ordered if table not in tables]
+    if dependents:
+        print(f"🔗 Also restoring tables that reference them: {', '.join(dependents)}")
+    
+    try:
+        # Children first, in one batch - if any drop fails, nothing is dropped
+        drops = ";\n".join(f"DROP TABLE IF EXISTS {table}" for table in reversed(ordered))
+        result = d1.execute_batch_query(f"PRAGMA defer_foreign_keys = ON;\n{drops};")
+        if not result or not result.get('success'):
+            raise RuntimeError(f"could not drop the tables being restored: {(result or {}).get('errors', 'Unknown error')}")
+        
+        for table in ordered:
+            entry = manifest['tables'][table]
+            print(f"🔄 Restoring {table} ({entry['rows']:,} rows)...")
+            d1_rows(d1, entry['sql'])
+            
+            # Load before indexing - building indexes once is faster than per-row upkeep
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                loaded = sum(executor.map(
+                    lambda chunk: restore_chunk(d1, table, os.path.join(snapshot_dir, chunk['file']), chunk.get('sha256')),
+                    entry['chunks']
+                ))
+            
+            for statement in entry['indexes'] + entry['triggers']:
+                d1_rows(d1, statement)
+            print(f"   ✅ {table}: {loaded:,} rows, {len(entry['indexes'])} indexes")
+    except (RuntimeError, OSError) as e:
+        print(f"❌ Restore failed: {e}")
+        return False
+    
+    return True
+
+def show_snapshots(snapshot_root=None):
+    """Print local snapshots with per-table row counts"""
+    snapshots = list_snapshots(snapshot_root)
+    if not snapshots:
+        print(f"❌ No snapshots found in {snapshot_root or SNAPSHOT_DIR}")
+        return
+    
+    print(f"💾 D1 SNAPSHOTS ({len(snapshots)})")
+    print("=" * 60)
+    for path in snapshots:
+        manifest = load_manifest(path)
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        total = sum(entry['rows'] for entry in manifest['tables'].values())
+        print(f"📁 {path} | {manifest['created']} | {total:,} rows | {size / 1024 / 1024:.1f} MB")
+        for table, entry in manifest['tables'].items():
+            print(f"   • {table}: {entry['rows']:,} rows")
+
+def main():
+    """Main function"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    
+    command = sys.argv[1].lower()
+    
+    if command == 'backup':
+        if not create_snapshot(tables=sys.argv[2:] or None):
+            sys.exit(1)
+    elif command == 'restore':
+        args = sys.argv[2:]
+        if args and os.path.isdir(args[0]):
+            snapshot_dir, tables = args[0], args[1:]
+        else:
+            snapshots = list_snapshots()
+            if not snapshots:
+                print("❌ No snapshots found")
+                sys.exit(1)
+            snapshot_dir, tables = snapshots[0], args
+        print(f"📁 Snapshot: {snapshot_dir}")
+        if not restore_snapshot(snapshot_dir, tables=tables or None):
+            sys.exit(1)
+    elif command == 'list':
+        show_snapshots()
+    else:
+        print(f"❌ Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ Enhanced with Heavy Haulers Equipment Logistics sales intelligence
 
 import json
 import os
+import numpy as np
 import pandas as pd
 import streamlit as st
 import subprocess
@@ -15,12 +16,22 @@ from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
+
+# Sessions share one contact frame (see load_shared_dataset); Copy-on-Write keeps
+# their column writes private. Always on from pandas 3.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
 import plotly.express as px
 import plotly.graph_objects as go
 from collections import defaultdict, Counter
 import re
 from datetime import datetime
 import openai
+from d1_replica import use_replica, query_replica
+from lead_scoring import score_frame
+from contact_query import PRIORITY_SCORE_RANGES, ContactQuery, fetch_page, fetch_summary
+from filter_index import FilterIndex
+from search_index import SearchIndex
 
 # Import CRM features
 try:
@@ -68,11 +79,68 @@ def check_password():
     else:
         return True
 
+# How often sessions re-check whether unique_phones changed (seconds)
+DATA_VERSION_TTL = 60
+
+# Above this many unique phones the general dashboard filters and pages in D1
+# (contact_query.py) instead of loading every contact into memory
+IN_MEMORY_CONTACT_LIMIT = int(os.getenv('DASHBOARD_IN_MEMORY_LIMIT', '100000'))
+CONTACT_PAGE_SIZE = 100
+
+# Columns of the in-memory frame with bitmap filter indexes (plus 'category')
+FILTER_FACETS = ['state', 'priority_level', 'call_status', 'has_equipment_data', 'has_pricing_data']
+EQUIPMENT_DATA_OPTIONS = {'All Contacts': None, 'With Equipment Data': True, 'Without Equipment Data': False}
+PRICING_OPTIONS = {'All Contacts': None, 'With Pricing': True, 'Without Pricing': False}
+
+# Searchable columns and their ranking weights
+CONTACT_SEARCH_FIELDS = {'seller_company': 3, 'categories': 2, 'equipment_makes': 2, 'equipment_models': 2, 'primary_location': 1}
+DEALER_SEARCH_FIELDS = {'name': 3, 'equipment_types': 2, 'location': 1}
+COMPANY_PICKER_SIZE = 50
+
+# Cheap fingerprint of unique_phones: changes when rows are added, removed,
+# rescored, updated or dialed (updated_at is stamped by CRM edits and call
+# results; last_updated only moves when the table is repopulated)
+DATA_VERSION_QUERY = """
+SELECT COUNT(*) AS row_count, MAX(updated_at) AS updated_at,
+       TOTAL(priority_score) AS score_total, TOTAL(call_attempts) AS attempt_total
+FROM unique_phones
+"""
+
 class DashboardAnalyzer:
-    def __init__(self):
+    def __init__(self, load=True):
         """Initialize D1-powered dashboard analyzer"""
         self.database_name = "equipment-contacts"
-        self.load_data()
+        self.data_version = None
+        if load:
+            self.load_data()
+            self._build_category_index()
+            self._build_filter_index()
+    
+    @classmethod
+    def shared(cls):
+        """Session view of the process-wide contact dataset
+        
+        The dataset is loaded once per data version and shared by every
+        session; each call gets a shallow copy of the frame, so sessions can
+        add or replace columns without copying or touching the shared data.
+        """
+        dataset = load_shared_dataset(contact_data_version())
+        analyzer = cls(load=False)
+        analyzer.data_version = dataset.data_version
+        analyzer.df = dataset.df.copy(deep=False)
+        analyzer.category_df = dataset.category_df
+        analyzer.category_stats = dataset.category_stats
+        analyzer.filter_index = dataset.filter_index
+        analyzer.search_index = dataset.search_index
+        analyzer.master_log = dataset.master_log
+        return analyzer
+    
+    def fetch_data_version(self):
+        """Current fingerprint of unique_phones, row count first (None if it can't be read)"""
+        rows = self.execute_d1_query(DATA_VERSION_QUERY)
+        if not rows:
+            return None
+        return tuple(rows[0].values())
     
     def get_cloudflare_credentials(self):
         """Get Cloudflare credentials from secrets or environment variables"""
@@ -99,8 +167,16 @@ class DashboardAnalyzer:
             st.error("Please configure credentials in Streamlit secrets or environment variables")
             return None
 
-    def execute_d1_query(self, sql_query):
+    def execute_d1_query(self, sql_query, params=None):
         """Execute a query on D1 database using wrangler CLI or HTTP API fallback"""
+        # Reads go to the local replica when enabled (see d1_replica.py)
+        if use_replica() and sql_query.lstrip().upper().startswith('SELECT'):
+            return query_replica(sql_query, params or ())
+        
+        # wrangler --command can't bind parameters
+        if params:
+            return self.execute_d1_query_http(sql_query, params)
+        
         # Get credentials
         creds = self.get_cloudflare_credentials()
         if not creds:
@@ -132,7 +208,7 @@ class DashboardAnalyzer:
             # Fallback to HTTP API (for production)
             return self.execute_d1_query_http(sql_query)
     
-    def execute_d1_query_http(self, sql_query):
+    def execute_d1_query_http(self, sql_query, params=None):
         """Execute D1 query using HTTP API (production fallback)"""
         try:
             import requests
@@ -152,6 +228,8 @@ class DashboardAnalyzer:
             payload = {
                 'sql': sql_query
             }
+            if params:
+                payload['params'] = params
             
             response = requests.post(url, headers=headers, json=payload)
             
@@ -172,6 +250,7 @@ class DashboardAnalyzer:
     
     def load_data(self):
         """Load and process contact data from D1 database - USING UNIQUE PHONES"""
+        self.master_log = {'metadata': {'categories': []}}
         try:
             # Check if unique_phones table exists first
             check_table_query = """
@@ -278,8 +357,7 @@ class DashboardAnalyzer:
             self.master_log = {
                 'metadata': {
                     'categories': list(set(unique_categories)) if unique_categories else ['general']
-                },
-                'contacts': {record['contact_id']: record for record in records}
+                }
             }
             
             st.success(f"✅ Successfully processed {len(records):,} UNIQUE contacts from D1 database!")
@@ -287,54 +365,51 @@ class DashboardAnalyzer:
         except Exception as e:
             st.error(f"❌ Error loading unique phone data from D1: {str(e)}")
             self.df = pd.DataFrame()
-            self.master_log = {'metadata': {'categories': []}, 'contacts': {}}
-    
-    def _calculate_priority_score(self, record):
-        """Calculate priority score"""
-        score = 0
-        
-        # Listing volume
-        listings = record['total_listings']
-        if listings >= 50:
-            score += 100
-        elif listings >= 25:
-            score += 80
-        elif listings >= 15:
-            score += 60
-        elif listings >= 8:
-            score += 40
-        elif listings >= 3:
-            score += 20
-        
-        # Company analysis
-        company = str(record['seller_company']).lower()
-        
-        # Major brands
-        major_brands = ['wheeler machinery', 'holt cat', 'caterpillar', 'john deere', 'komatsu', 
-                       'empire southwest', 'ring power', 'altorfer', 'fabick cat']
-        if any(brand in company for brand in major_brands):
-            score += 25
-        
-        # Equipment focus
-        if any(word in company for word in ['equipment', 'machinery', 'rental']):
-            score += 15
-        
-        # Contact quality
-        if record['primary_phone'] and len(str(record['primary_phone'])) >= 10:
-            score += 10
-        
-        if record['email']:
-            score += 10
-            
-        # Equipment data bonus (NEW!)
-        if record.get('has_equipment_data', False):
-            score += 15
-            
-        # Pricing data bonus (NEW!)
-        if record.get('has_pricing_data', False):
-            score += 10
+            self.master_log = {'metadata': {'categories': []}}
+    
+    def _build_category_index(self):
+        """Exploded (contact, category) table and per-category stats, built once per data load
+        
+        category_df has one row per category of each contact, indexed like
+        self.df: 'name' (as written), 'category' (lowercase) and 'display'
+        (title case). category_stats is indexed by display name, most
+        popular first.
+        """
+        if self.df.empty:
+            self.category_df = pd.DataFrame(columns=['name', 'category', 'display'])
+            self.category_stats = pd.DataFrame(columns=['category', 'count', 'total_listings', 'states'])
+            return
         
-        return score
+        names = self.df['categories'].fillna('construction').astype(str).str.split(',').explode().str.strip()
+        names = names[names != '']
+        categories = names.str.lower()
+        self.category_df = pd.DataFrame({
+            'name': names,
+            'category': categories,
+            'display': categories.str.replace('_', ' ').str.title()
+        })
+        
+        known_states = self.df['state'].where(~self.df['state'].isin(['Unknown', '']))
+        self.category_stats = self.category_df.assign(
+            total_listings=self.df['total_listings'].reindex(self.category_df.index).to_numpy(),
+            state=known_states.reindex(self.category_df.index).to_numpy()
+        ).groupby('display').agg(
+            category=('category', 'first'),
+            count=('category', 'size'),
+            total_listings=('total_listings', 'sum'),
+            states=('state', 'nunique')
+        ).sort_values('count', ascending=False, kind='stable')
+    
+    def _build_filter_index(self):
+        """Bitmaps for the sidebar facets (categories by display name) and the search index"""
+        if self.df.empty:
+            self.filter_index = FilterIndex(0)
+            self.search_index = SearchIndex(CONTACT_SEARCH_FIELDS)
+            return
+        self.filter_index = FilterIndex.from_frame(
+            self.df, FILTER_FACETS, exploded={'category': self.category_df['display']}
+        )
+        self.search_index = SearchIndex.from_frame(self.df, CONTACT_SEARCH_FIELDS)
     
     def _calculate_price_range(self, prices):
         """Calculate price range category from price list"""
@@ -380,6 +455,29 @@ class DashboardAnalyzer:
         else:
             return 'Minimal'
 
+@st.cache_data(ttl=DATA_VERSION_TTL, show_spinner=False)
+def contact_data_version():
+    """unique_phones fingerprint, re-checked at most once per DATA_VERSION_TTL"""
+    return DashboardAnalyzer(load=False).fetch_data_version()
+
+@st.cache_resource(max_entries=1, show_spinner="Loading contact database...")
+def load_shared_dataset(version):
+    """Process-wide read-only contact dataset for a data version
+    
+    max_entries=1 drops the previous version when the data changes, so
+    memory follows the data size rather than the number of sessions.
+    """
+    dataset = DashboardAnalyzer()
+    dataset.data_version = version
+    return dataset
+
+def get_analyzer():
+    """Shared-dataset analyzer for this session; a failed load is retried on the next run"""
+    analyzer = DashboardAnalyzer.shared()
+    if analyzer.df.empty:
+        load_shared_dataset.clear()
+    return analyzer
+
 def main():
     # Check authentication first
     if not check_password():
@@ -393,11 +491,11 @@ def main():
         
         # Handle CRM modes
         if crm_mode == "Territory Management":
-            analyzer = DashboardAnalyzer()
+            analyzer = get_analyzer()
             render_territory_assignment(analyzer.df)
             return
         elif crm_mode == "Call Campaign":
-            analyzer = DashboardAnalyzer()
+            analyzer = get_analyzer()
             render_call_campaign_manager(analyzer.df)
             return
         elif crm_mode == "Email Marketing":
@@ -573,8 +671,14 @@ def main():
     
     st.markdown("---")
     
-    # Load analyzer
-    analyzer = DashboardAnalyzer()
+    # Large databases are filtered and paged in D1 instead of loaded per session
+    version = contact_data_version()
+    if dashboard_mode == "general" and version and version[0] > IN_MEMORY_CONTACT_LIMIT:
+        query_analytics_dashboard(version)
+        return
+    
+    # Load analyzer (shared across sessions, reloaded when the data changes)
+    analyzer = get_analyzer()
     
     if analyzer.df.empty:
         st.error("No data available. Please check your master database file.")
@@ -592,51 +696,205 @@ def main():
     else:
         general_analytics_dashboard(analyzer)
 
+def _joined(df, column):
+    """List column flattened to comma-separated text ('' where missing)"""
+    if column not in df:
+        return ''
+    return df[column].map(lambda values: ', '.join(map(str, values)) if isinstance(values, list) else '')
+
+def contact_export_frame(df, detailed=True):
+    """CSV export layout for contacts, built column-wise"""
+    export = pd.DataFrame({
+        'Company': df['seller_company'],
+        'Phone': df['primary_phone'],
+        'Location': df['primary_location'],
+        'State': df['state'],
+        'Email': df['email'] if 'email' in df else '',
+        'Categories': df['categories'],
+        'Total_Listings': df['total_listings'],
+        'Priority_Level': df['priority_level'],
+    })
+    if not detailed:
+        export['Equipment_Makes'] = _joined(df, 'equipment_makes')
+        export['Equipment_Models'] = _joined(df, 'equipment_models')
+        export['Listing_Prices'] = _joined(df, 'listing_prices')
+        return export
+    
+    export['Priority_Score'] = df['priority_score']
+    for label, column, default in [('First_Contact_Date', 'first_contact_date', ''),
+                                   ('Last_Updated', 'last_updated', ''),
+                                   ('Number_of_Sources', 'num_sources', 1)]:
+        export[label] = df[column] if column in df else default
+    export['Equipment_Makes'] = _joined(df, 'equipment_makes')
+    export['Equipment_Models'] = _joined(df, 'equipment_models')
+    export['Equipment_Years'] = _joined(df, 'equipment_years')
+    export['Listing_Prices'] = _joined(df, 'listing_prices')
+    export['Price_Range'] = df['price_range'] if 'price_range' in df else 'No Pricing'
+    export['Has_Equipment_Data'] = np.where(df['has_equipment_data'].fillna(False).astype(bool), '✅', '❌')
+    export['Has_Pricing_Data'] = np.where(df['has_pricing_data'].fillna(False).astype(bool), '✅', '❌')
+    return export
+
+def _years_summary(years):
+    if not years:
+        return 'N/A'
+    unique_years = sorted(set(years))
+    if len(unique_years) <= 3:
+        return ', '.join(unique_years)
+    return f"{unique_years[0]}-{unique_years[-1]} ({len(unique_years)} years)"
+
+def high_value_display_frame(df):
+    """High-value contacts table with summarized equipment info, built column-wise"""
+    makes = df['equipment_makes']
+    extra_makes = makes.str.len() - 3
+    makes_summary = makes.str[:3].str.join(', ').where(makes.str.len() > 0, 'N/A')
+    makes_summary = makes_summary.where(extra_makes <= 0, makes_summary + ' (+' + extra_makes.astype(str) + ' more)')
+    has_equipment = df['has_equipment_data'].fillna(False).astype(bool)
+    has_pricing = df['has_pricing_data'].fillna(False).astype(bool)
+    
+    return pd.DataFrame({
+        'Company': df['seller_company'],
+        'Phone': df['primary_phone'],
+        'Location': df['primary_location'],
+        'Listings': df['total_listings'],
+        'Priority': df['priority_level'],
+        'Score': df['priority_score'],
+        'Top Makes': makes_summary,
+        'Years': df['equipment_years'].map(_years_summary),
+        'Price Range': df['price_range'].where(has_pricing, 'No Pricing'),
+        'Equipment Data': np.where(has_equipment, '✅', '❌'),
+        'Pricing Data': np.where(has_pricing, '✅', '❌')
+    })
+
+def run_contact_query(sql, params):
+    return DashboardAnalyzer(load=False).execute_d1_query(sql, params)
+
+@st.cache_data(ttl=DATA_VERSION_TTL, show_spinner=False)
+def cached_contact_summary(version, query_key):
+    """Filter totals/breakdowns, cached per data version and filter"""
+    return fetch_summary(run_contact_query, ContactQuery(*query_key))
+
+@st.cache_data(ttl=DATA_VERSION_TTL, show_spinner=False)
+def cached_contact_page(version, query_key, page):
+    return fetch_page(run_contact_query, ContactQuery(*query_key), page, CONTACT_PAGE_SIZE)
+
+def query_analytics_dashboard(version):
+    """General analytics for databases too large to load: filters, aggregates and pages run in D1"""
+    st.info(f"📡 {version[0]:,} unique contacts - filtering and paging directly in the database")
+    
+    # Sidebar filters; options and their counts come from the unfiltered summary
+    st.sidebar.header("🔍 Filters")
+    overall = cached_contact_summary(version, ContactQuery().key())
+    category_counts = {item['value']: item['contacts'] for item in overall['category'] if item['value']}
+    state_counts = {item['value']: item['contacts'] for item in overall['state'] if item['value']}
+    priority_counts = {item['value']: item['contacts'] for item in overall['priority']}
+    
+    selected_category = st.sidebar.selectbox(
+        "Equipment Category", ['All'] + list(category_counts),
+        format_func=lambda value: value if value == 'All' else f"{value.replace('_', ' ').title()} ({category_counts[value]:,})"
+    )
+    search_term = st.sidebar.text_input("Search Equipment/Company", placeholder="e.g., CAT, John Deere, Excavator")
+    selected_priority = st.sidebar.selectbox(
+        "Priority Level", ['All'] + list(PRIORITY_SCORE_RANGES),
+        format_func=lambda value: value if value == 'All' else f"{value} ({priority_counts.get(value, 0):,})"
+    )
+    selected_state = st.sidebar.selectbox(
+        "State", ['All'] + sorted(state_counts),
+        format_func=lambda value: value if value == 'All' else f"{value} ({state_counts[value]:,})"
+    )
+    min_listings = st.sidebar.number_input("Minimum Listings", min_value=0, value=0, step=1)
+    
+    query = ContactQuery(category=selected_category, state=selected_state, priority_level=selected_priority,
+                         min_listings=min_listings, search=search_term)
+    summary = cached_contact_summary(version, query.key())
+    total = summary['total']
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Contacts", f"{total['contacts']:,}")
+    with col2:
+        st.metric("High-Value Contacts", f"{total['high_value']:,}",
+                 help="Dealers with highest business potential - call these first!")
+    with col3:
+        st.metric("Total Listings", f"{total['listings']:,}")
+    with col4:
+        avg_listings = total['listings'] / total['contacts'] if total['contacts'] else 0
+        st.metric("Avg Listings/Dealer", f"{avg_listings:.1f}")
+    
+    if not total['contacts']:
+        st.warning("No contacts match the current filters.")
+        return
+    
+    # Breakdowns of the filtered contacts
+    col1, col2, col3 = st.columns(3)
+    for column, facet, title in [(col1, 'priority', "Priority Distribution"),
+                                 (col2, 'category', "Equipment Categories"),
+                                 (col3, 'state', "🗺️ Geographic Distribution")]:
+        with column:
+            st.subheader(title)
+            facet_df = pd.DataFrame(summary[facet][:10])
+            fig = px.bar(facet_df, x='contacts', y='value', orientation='h',
+                         labels={'contacts': 'Number of Contacts', 'value': ''})
+            fig.update_layout(yaxis={'categoryorder': 'total ascending'}, height=400)
+            st.plotly_chart(fig, use_container_width=True)
+    
+    # One page of matching contacts, highest priority first
+    st.markdown("---")
+    st.subheader("📋 Matching Contacts")
+    page_count = (total['contacts'] + CONTACT_PAGE_SIZE - 1) // CONTACT_PAGE_SIZE
+    page = st.number_input(f"Page (of {page_count:,})", min_value=1, max_value=page_count, value=1, step=1)
+    page_df = pd.DataFrame(cached_contact_page(version, query.key(), page - 1))
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+    st.download_button(
+        label=f"📥 Download page {page} (CSV)",
+        data=page_df.to_csv(index=False),
+        file_name=f"contacts_page_{page}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+
 def general_analytics_dashboard(analyzer):
     """Original general analytics dashboard with dynamic category detection"""
     
     # Sidebar filters
     st.sidebar.header("🔍 Filters")
     
-    # Extract unique categories from the data with statistics
-    all_categories = {}
-    category_stats = {}
-    
-    for _, contact in analyzer.df.iterrows():
-        categories = contact.get('categories', 'construction').split(',')
-        for cat in categories:
-            cat = cat.strip().lower()
-            if cat and cat != '':
-                # Clean category name for display
-                clean_cat = cat.replace('_', ' ').title()
-                if clean_cat not in all_categories:
-                    all_categories[clean_cat] = cat
-                    category_stats[clean_cat] = {
-                        'count': 0,
-                        'total_listings': 0,
-                        'states': set()
-                    }
-                
-                category_stats[clean_cat]['count'] += 1
-                category_stats[clean_cat]['total_listings'] += contact.get('total_listings', 0)
-                if contact.get('state') and contact.get('state') != 'Unknown':
-                    category_stats[clean_cat]['states'].add(contact.get('state'))
+    # Categories with statistics, most popular first (precomputed per data load)
+    category_stats = analyzer.category_stats
+    
+    # Live option counts: each facet's options are counted under the other
+    # facets' current selections (widget state from the previous run)
+    filter_index = analyzer.filter_index
+    current = st.session_state
+    facet_selections = {
+        'category': None if current.get('ga_category', 'All Categories') == 'All Categories' else current['ga_category'],
+        'state': None if current.get('ga_state', 'All') == 'All' else current['ga_state'],
+        'priority_level': None if current.get('ga_priority', 'All') == 'All' else current['ga_priority'],
+        'has_equipment_data': EQUIPMENT_DATA_OPTIONS.get(current.get('ga_equipment_data')),
+        'has_pricing_data': PRICING_OPTIONS.get(current.get('ga_pricing')),
+    }
+    option_counts = {facet: filter_index.counts(facet, facet_selections) for facet in facet_selections}
     
-    # Sort categories by contact count (most popular first)
-    sorted_categories = sorted(category_stats.items(), key=lambda x: x[1]['count'], reverse=True)
+    def counted(facet, options=None):
+        """format_func showing an option's live count ('All ...' options unchanged)"""
+        def label(option):
+            value = options[option] if options else option
+            if value is None or str(option).startswith('All'):
+                return option
+            return f"{option} ({option_counts[facet].get(value, 0):,})"
+        return label
     
     # Machine Category filter with dynamic options
-    category_options = ['All Categories'] + [cat[0] for cat in sorted_categories]
-    selected_category = st.sidebar.selectbox("Equipment Category", category_options)
+    category_options = ['All Categories'] + list(category_stats.index)
+    selected_category = st.sidebar.selectbox("Equipment Category", category_options, key="ga_category",
+                                             format_func=counted('category'))
     
     # Show category insights in sidebar
-    if selected_category != 'All Categories' and selected_category in category_stats:
-        stats = category_stats[selected_category]
+    if selected_category != 'All Categories' and selected_category in category_stats.index:
+        stats = category_stats.loc[selected_category]
         st.sidebar.markdown("---")
         st.sidebar.markdown(f"### 📊 {selected_category} Overview")
         st.sidebar.metric("Dealers", f"{stats['count']:,}")
         st.sidebar.metric("Total Listings", f"{stats['total_listings']:,}")
-        st.sidebar.metric("States", f"{len(stats['states'])}")
+        st.sidebar.metric("States", f"{stats['states']}")
         
         if stats['count'] > 0:
             avg_listings = stats['total_listings'] / stats['count']
@@ -651,12 +909,12 @@ def general_analytics_dashboard(analyzer):
     st.sidebar.markdown("### 🔧 Equipment Filters")
     
     # Equipment data availability filter
-    equipment_data_options = ['All Contacts', 'With Equipment Data', 'Without Equipment Data']
-    equipment_data_filter = st.sidebar.selectbox("Equipment Data", equipment_data_options)
+    equipment_data_filter = st.sidebar.selectbox("Equipment Data", list(EQUIPMENT_DATA_OPTIONS), key="ga_equipment_data",
+                                                 format_func=counted('has_equipment_data', EQUIPMENT_DATA_OPTIONS))
     
     # Price data filter
-    pricing_options = ['All Contacts', 'With Pricing', 'Without Pricing']
-    pricing_filter = st.sidebar.selectbox("Pricing Data", pricing_options)
+    pricing_filter = st.sidebar.selectbox("Pricing Data", list(PRICING_OPTIONS), key="ga_pricing",
+                                          format_func=counted('has_pricing_data', PRICING_OPTIONS))
     
     # Price range filter (only show if there are contacts with pricing)
     if analyzer.df['has_pricing_data'].any():
@@ -688,47 +946,31 @@ def general_analytics_dashboard(analyzer):
     st.sidebar.markdown("### 📊 Standard Filters")
     
     # Priority filter
-    priority_options = ['All'] + list(analyzer.df['priority_level'].unique())
-    selected_priority = st.sidebar.selectbox("Priority Level", priority_options)
+    priority_options = ['All'] + list(filter_index.values['priority_level'])
+    selected_priority = st.sidebar.selectbox("Priority Level", priority_options, key="ga_priority",
+                                             format_func=counted('priority_level'))
     
     # State filter
-    state_options = ['All'] + sorted(analyzer.df['state'].unique())
-    selected_state = st.sidebar.selectbox("State", state_options)
+    state_options = ['All'] + sorted(filter_index.values['state'])
+    selected_state = st.sidebar.selectbox("State", state_options, key="ga_state",
+                                          format_func=counted('state'))
     
     # Listing count filter
     min_listings = st.sidebar.slider("Minimum Listings", 0, int(analyzer.df['total_listings'].max()), 0)
     
-    # Apply filters
-    filtered_df = analyzer.df.copy()
-    
-    # Category filter (NEW!)
-    if selected_category != 'All Categories':
-        # Filter contacts that have this category in their categories string
-        filtered_df = filtered_df[filtered_df['categories'].str.contains(selected_category.lower(), case=False, na=False)]
-    
-    # Search filter (NEW!)
+    # Apply filters: facets combine as bitmaps, the rest filter the narrowed frame
+    facet_mask = filter_index.mask({
+        'category': None if selected_category == 'All Categories' else selected_category,
+        'state': None if selected_state == 'All' else selected_state,
+        'priority_level': None if selected_priority == 'All' else selected_priority,
+        'has_equipment_data': EQUIPMENT_DATA_OPTIONS[equipment_data_filter],
+        'has_pricing_data': PRICING_OPTIONS[pricing_filter],
+    })
+    filtered_df = analyzer.df[facet_mask]
+    
+    # Search filter: company, categories, location, equipment makes and models
     if search_term:
-        search_mask = (
-            filtered_df['seller_company'].str.contains(search_term, case=False, na=False) |
-            filtered_df['categories'].str.contains(search_term, case=False, na=False) |
-            filtered_df['primary_location'].str.contains(search_term, case=False, na=False)
-        )
-        # Also search in equipment makes and models
-        equipment_mask = filtered_df.apply(lambda row: 
-            any(search_term.lower() in str(make).lower() for make in row.get('equipment_makes', [])) or
-            any(search_term.lower() in str(model).lower() for model in row.get('equipment_models', [])), axis=1)
-        filtered_df = filtered_df[search_mask | equipment_mask]
-    
-    # Equipment data filters (NEW!)
-    if equipment_data_filter == 'With Equipment Data':
-        filtered_df = filtered_df[filtered_df['has_equipment_data'] == True]
-    elif equipment_data_filter == 'Without Equipment Data':
-        filtered_df = filtered_df[filtered_df['has_equipment_data'] == False]
-    
-    if pricing_filter == 'With Pricing':
-        filtered_df = filtered_df[filtered_df['has_pricing_data'] == True]
-    elif pricing_filter == 'Without Pricing':
-        filtered_df = filtered_df[filtered_df['has_pricing_data'] == False]
+        filtered_df = analyzer.search_index.filter_frame(filtered_df, search_term)
     
     if selected_price_range != 'All Price Ranges':
         filtered_df = filtered_df[filtered_df['price_range'] == selected_price_range]
@@ -737,13 +979,6 @@ def general_analytics_dashboard(analyzer):
         make_mask = filtered_df.apply(lambda row: selected_make in row.get('equipment_makes', []), axis=1)
         filtered_df = filtered_df[make_mask]
     
-    # Standard filters
-    if selected_priority != 'All':
-        filtered_df = filtered_df[filtered_df['priority_level'] == selected_priority]
-    
-    if selected_state != 'All':
-        filtered_df = filtered_df[filtered_df['state'] == selected_state]
-    
     filtered_df = filtered_df[filtered_df['total_listings'] >= min_listings]
     
     # Main dashboard
@@ -805,43 +1040,7 @@ def general_analytics_dashboard(analyzer):
         # Create comprehensive CSV data
         if len(filtered_df) > 0:
             # Prepare detailed export data
-            export_records = []
-            for _, row in filtered_df.iterrows():
-                # Basic contact info
-                record = {
-                    'Company': row['seller_company'],
-                    'Phone': row['primary_phone'],
-                    'Location': row['primary_location'], 
-                    'State': row['state'],
-                    'Email': row.get('email', ''),
-                    'Categories': row['categories'],
-                    'Total_Listings': row['total_listings'],
-                    'Priority_Level': row['priority_level'],
-                    'Priority_Score': row['priority_score'],
-                    'First_Contact_Date': row.get('first_contact_date', ''),
-                    'Last_Updated': row.get('last_updated', ''),
-                    'Number_of_Sources': row.get('num_sources', 1)
-                }
-                
-                # Equipment data (flatten arrays for CSV)
-                equipment_makes = ', '.join(row.get('equipment_makes', []))
-                equipment_models = ', '.join(row.get('equipment_models', []))
-                equipment_years = ', '.join(row.get('equipment_years', []))
-                listing_prices = ', '.join(row.get('listing_prices', []))
-                
-                record.update({
-                    'Equipment_Makes': equipment_makes,
-                    'Equipment_Models': equipment_models, 
-                    'Equipment_Years': equipment_years,
-                    'Listing_Prices': listing_prices,
-                    'Price_Range': row.get('price_range', 'No Pricing'),
-                    'Has_Equipment_Data': '✅' if row.get('has_equipment_data', False) else '❌',
-                    'Has_Pricing_Data': '✅' if row.get('has_pricing_data', False) else '❌'
-                })
-                
-                export_records.append(record)
-            
-            export_df = pd.DataFrame(export_records)
+            export_df = contact_export_frame(filtered_df, detailed=True)
             csv_data = export_df.to_csv(index=False)
             
             # Generate filename based on current filters
@@ -896,18 +1095,11 @@ def general_analytics_dashboard(analyzer):
     st.markdown("**One-click downloads for popular equipment categories:**")
     
     # Get category counts for quick download buttons
-    category_counts = {}
-    for _, contact in analyzer.df.iterrows():
-        categories = contact.get('categories', 'construction').split(',')
-        for cat in categories:
-            cat = cat.strip().lower()
-            if cat and cat != '' and cat != 'construction':
-                if cat not in category_counts:
-                    category_counts[cat] = 0
-                category_counts[cat] += 1
+    categories = analyzer.category_df['category']
+    category_counts = categories[categories != 'construction'].value_counts()
     
     # Sort by count and show top categories
-    sorted_cats = sorted(category_counts.items(), key=lambda x: x[1], reverse=True)[:6]
+    sorted_cats = list(category_counts.head(6).items())
     
     if sorted_cats:
         st.markdown("**Available Categories:**")
@@ -919,24 +1111,7 @@ def general_analytics_dashboard(analyzer):
                 
                 if len(cat_filter_df) > 0:
                     # Create CSV for this category
-                    cat_export_records = []
-                    for _, row in cat_filter_df.iterrows():
-                        record = {
-                            'Company': row['seller_company'],
-                            'Phone': row['primary_phone'],
-                            'Location': row['primary_location'],
-                            'State': row['state'],
-                            'Email': row.get('email', ''),
-                            'Categories': row['categories'],
-                            'Total_Listings': row['total_listings'],
-                            'Priority_Level': row['priority_level'],
-                            'Equipment_Makes': ', '.join(row.get('equipment_makes', [])),
-                            'Equipment_Models': ', '.join(row.get('equipment_models', [])),
-                            'Listing_Prices': ', '.join(row.get('listing_prices', []))
-                        }
-                        cat_export_records.append(record)
-                    
-                    cat_csv = pd.DataFrame(cat_export_records).to_csv(index=False)
+                    cat_csv = contact_export_frame(cat_filter_df, detailed=False).to_csv(index=False)
                     cat_filename = f"{cat}_contacts_{datetime.now().strftime('%Y%m%d')}.csv"
                     
                     st.download_button(
@@ -1037,18 +1212,13 @@ def general_analytics_dashboard(analyzer):
     
     with col2:
         st.subheader("Equipment Categories")
-        # Extract equipment categories from sources for chart
-        category_counts = {}
-        for _, contact in filtered_df.iterrows():
-            categories = contact.get('categories', 'construction').split(',')
-            for cat in categories:
-                cat = cat.strip()
-                if cat:
-                    category_counts[cat] = category_counts.get(cat, 0) + 1
-        
-        if category_counts:
+        # Equipment categories of the filtered contacts, from the exploded category table
+        category_names = analyzer.category_df['name']
+        category_counts = category_names[category_names.index.isin(filtered_df.index)].value_counts()
+        
+        if len(category_counts) > 0:
             # Create category chart - show ALL categories
-            cat_df = pd.DataFrame(list(category_counts.items()), columns=['Category', 'Count'])
+            cat_df = category_counts.rename_axis('Category').reset_index(name='Count')
             cat_df = cat_df.sort_values('Count', ascending=True)  # Show ALL categories
             
             fig_cat = px.bar(
@@ -1130,38 +1300,7 @@ def general_analytics_dashboard(analyzer):
     
     if len(high_value_df) > 0:
         # Create enhanced display with equipment info
-        display_records = []
-        for _, row in high_value_df.iterrows():
-            # Summarize equipment data
-            makes_summary = ', '.join(row['equipment_makes'][:3]) if row['equipment_makes'] else 'N/A'
-            if len(row['equipment_makes']) > 3:
-                makes_summary += f" (+{len(row['equipment_makes'])-3} more)"
-            
-            years_summary = 'N/A'
-            if row['equipment_years']:
-                unique_years = sorted(set(row['equipment_years']))
-                if len(unique_years) <= 3:
-                    years_summary = ', '.join(unique_years)
-                else:
-                    years_summary = f"{unique_years[0]}-{unique_years[-1]} ({len(unique_years)} years)"
-            
-            price_summary = row['price_range'] if row['has_pricing_data'] else 'No Pricing'
-            
-            display_records.append({
-                'Company': row['seller_company'],
-                'Phone': row['primary_phone'],
-                'Location': row['primary_location'],
-                'Listings': row['total_listings'],
-                'Priority': row['priority_level'],
-                'Score': row['priority_score'],
-                'Top Makes': makes_summary,
-                'Years': years_summary,
-                'Price Range': price_summary,
-                'Equipment Data': '✅' if row['has_equipment_data'] else '❌',
-                'Pricing Data': '✅' if row['has_pricing_data'] else '❌'
-            })
-        
-        display_df = pd.DataFrame(display_records)
+        display_df = high_value_display_frame(high_value_df)
         
         # Show equipment data toggle
         show_equipment = st.checkbox("Show Equipment Details", value=True)
@@ -1193,13 +1332,13 @@ def general_analytics_dashboard(analyzer):
         # Equipment insights for high-value contacts
         col1, col2 = st.columns(2)
         with col1:
-            equipment_coverage = len([r for r in display_records if r['Equipment Data'] == '✅'])
-            st.metric("Equipment Data Coverage", f"{equipment_coverage}/{len(display_records)}", 
-                     f"{equipment_coverage/len(display_records)*100:.1f}%")
+            equipment_coverage = int((display_df['Equipment Data'] == '✅').sum())
+            st.metric("Equipment Data Coverage", f"{equipment_coverage}/{len(display_df)}", 
+                     f"{equipment_coverage/len(display_df)*100:.1f}%")
         with col2:
-            pricing_coverage = len([r for r in display_records if r['Pricing Data'] == '✅'])
-            st.metric("Pricing Data Coverage", f"{pricing_coverage}/{len(display_records)}", 
-                     f"{pricing_coverage/len(display_records)*100:.1f}%")
+            pricing_coverage = int((display_df['Pricing Data'] == '✅').sum())
+            st.metric("Pricing Data Coverage", f"{pricing_coverage}/{len(display_df)}", 
+                     f"{pricing_coverage/len(display_df)*100:.1f}%")
         
     else:
         st.info("No high-value contacts match your current filters.")
@@ -1216,9 +1355,9 @@ def general_analytics_dashboard(analyzer):
             'contact_id': 'count'
         }).sort_values('total_listings', ascending=False).head(5)
         
-        for state, row in top_states.iterrows():
-            avg_listings = row['total_listings'] / row['contact_id']
-            st.write(f"• **{state}**: {row['contact_id']} contacts, {avg_listings:.1f} avg listings")
+        avg_listings = top_states['total_listings'] / top_states['contact_id']
+        for state, contacts, avg in zip(top_states.index, top_states['contact_id'], avg_listings):
+            st.write(f"• **{state}**: {contacts} contacts, {avg:.1f} avg listings")
     
     with col2:
         st.write("**Equipment Dealer Networks**")
@@ -1241,6 +1380,56 @@ def general_analytics_dashboard(analyzer):
         st.write(f"• **Email Coverage**: {with_email/total_contacts*100:.1f}%")
         st.write(f"• **Complete Locations**: {complete_location/total_contacts*100:.1f}%")
 
+def heavy_haulers_frame(contacts):
+    """Dealer records for the Heavy Haulers views"""
+    records = []
+    for _, row in contacts.iterrows():
+        # Skip contacts with "Unknown" names for better data quality
+        if row['seller_company'] == 'Unknown' or str(row['seller_company']).strip() == '':
+            continue
+            
+        # Extract equipment categories from the existing categories field
+        equipment_types = []
+        if pd.notna(row['categories']):
+            categories = str(row['categories']).lower().split(',')
+            for category in categories:
+                category = category.strip()
+                if 'excavator' in category:
+                    equipment_types.append('Excavator')
+                elif 'crane' in category:
+                    equipment_types.append('Crane')
+                elif 'dozer' in category or 'bulldozer' in category:
+                    equipment_types.append('Dozer')
+                elif category:
+                    equipment_types.append(category.title())
+        
+        # Remove duplicates and create string
+        equipment_types = list(set(equipment_types))
+        equipment_str = ', '.join(equipment_types) if equipment_types else 'General'
+        
+        records.append({
+            'contact_id': row['contact_id'],
+            'name': row['seller_company'],
+            'phone': row['primary_phone'],
+            'location': row['primary_location'],
+            'state': row['state'],
+            'website': row.get('website', ''),
+            'equipment_types': equipment_str,
+            'num_equipment_types': len(equipment_types),
+            'num_sources': row.get('num_sources', 1),
+            'total_listings': row['total_listings']
+        })
+    
+    return pd.DataFrame(records)
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def heavy_haulers_dataset(version, _contacts):
+    """(dealer frame, search index) for a data version of the shared contacts"""
+    df = heavy_haulers_frame(_contacts)
+    if df.empty:
+        return df, SearchIndex(DEALER_SEARCH_FIELDS)
+    return df, SearchIndex.from_frame(df, DEALER_SEARCH_FIELDS, id_column='contact_id')
+
 def heavy_haulers_dashboard(analyzer):
     """Heavy Haulers Equipment Logistics - Sales Intelligence Dashboard"""
     
@@ -1282,49 +1471,8 @@ def heavy_haulers_dashboard(analyzer):
     </div>
     """, unsafe_allow_html=True)
     
-    # Process dealer data for Heavy Haulers
-    def process_dealer_data_heavy_haulers():
-        records = []
-        for _, row in analyzer.df.iterrows():
-            # Skip contacts with "Unknown" names for better data quality
-            if row['seller_company'] == 'Unknown' or str(row['seller_company']).strip() == '':
-                continue
-                
-            # Extract equipment categories from the existing categories field
-            equipment_types = []
-            if pd.notna(row['categories']):
-                categories = str(row['categories']).lower().split(',')
-                for category in categories:
-                    category = category.strip()
-                    if 'excavator' in category:
-                        equipment_types.append('Excavator')
-                    elif 'crane' in category:
-                        equipment_types.append('Crane')
-                    elif 'dozer' in category or 'bulldozer' in category:
-                        equipment_types.append('Dozer')
-                    elif category:
-                        equipment_types.append(category.title())
-            
-            # Remove duplicates and create string
-            equipment_types = list(set(equipment_types))
-            equipment_str = ', '.join(equipment_types) if equipment_types else 'General'
-            
-            records.append({
-                'contact_id': row['contact_id'],
-                'name': row['seller_company'],
-                'phone': row['primary_phone'],
-                'location': row['primary_location'],
-                'state': row['state'],
-                'website': row.get('website', ''),
-                'equipment_types': equipment_str,
-                'num_equipment_types': len(equipment_types),
-                'num_sources': row.get('num_sources', 1),
-                'total_listings': row['total_listings']
-            })
-        
-        return pd.DataFrame(records)
-    
-    df = process_dealer_data_heavy_haulers()
+    # Dealer frame and its search index are built once per data version
+    df, dealer_search = heavy_haulers_dataset(analyzer.data_version, analyzer.df)
     
     if df.empty:
         st.error("No Heavy Haulers data available.")
@@ -1522,35 +1670,7 @@ def heavy_haulers_dashboard(analyzer):
             """)
         
         # Calculate business potential scores
-        def calculate_business_potential(row):
-            score = 0
-            
-            # More equipment types = higher potential
-            score += row['num_equipment_types'] * 20
-            
-            # Multiple sources = more established business
-            score += min(row['num_sources'], 5) * 10
-            
-            # Has phone number = easier to reach
-            if row['phone']:
-                score += 25
-            
-            # Has website = more professional operation
-            if row['website']:
-                score += 15
-            
-            # High-demand equipment bonuses
-            equipment_list = str(row['equipment_types']).lower()
-            if 'excavator' in equipment_list:
-                score += 15
-            if 'crane' in equipment_list:
-                score += 20  # Cranes are high-value for logistics
-            if 'dozer' in equipment_list:
-                score += 10
-            
-            return score
-        
-        filtered_df['business_potential'] = filtered_df.apply(calculate_business_potential, axis=1)
+        filtered_df['business_potential'] = score_frame(filtered_df, 'business_potential')
         filtered_df['priority_level'] = pd.cut(filtered_df['business_potential'], 
                                              bins=[0, 50, 80, 200], 
                                              labels=['Low', 'Medium', 'High'])
@@ -1736,36 +1856,7 @@ def heavy_haulers_dashboard(analyzer):
                                          help="Get your API key from https://platform.openai.com/api-keys")
         
         # Calculate business potential scores for filtering (always available)
-        def calculate_business_potential(row):
-            score = 0
-            
-            # More equipment types = higher potential
-            score += row['num_equipment_types'] * 20
-            
-            # Multiple sources = more established business
-            score += min(row['num_sources'], 5) * 10
-            
-            # Has phone number = easier to reach
-            if row['phone']:
-                score += 25
-            
-            # Has website = more professional operation
-            if row['website']:
-                score += 15
-            
-            # High-demand equipment bonuses
-            equipment_list = str(row['equipment_types']).lower()
-            if 'excavator' in equipment_list:
-                score += 15
-            if 'crane' in equipment_list:
-                score += 20  # Cranes are high-value for logistics
-            if 'dozer' in equipment_list:
-                score += 10
-            
-            return score
-        
-        # Apply business potential scoring (always available)
-        filtered_df['business_potential'] = filtered_df.apply(calculate_business_potential, axis=1)
+        filtered_df['business_potential'] = score_frame(filtered_df, 'business_potential')
         filtered_df['priority_level'] = pd.cut(filtered_df['business_potential'], 
                                              bins=[0, 50, 80, 200], 
                                              labels=['Low', 'Medium', 'High'])
@@ -1798,33 +1889,36 @@ def heavy_haulers_dashboard(analyzer):
         if priority_filter != 'All':
             searchable_df = searchable_df[searchable_df['priority_level'] == priority_filter]
         
-        # Apply company name search
-        if company_search:
-            searchable_df = searchable_df[searchable_df['name'].str.contains(company_search, case=False, na=False)]
+        # Company picker: one page of ranked matches (best search match, else highest score)
+        page_number = st.session_state.get("hh_company_page", 1)
+        company_page, match_count = dealer_search.picker_page(
+            searchable_df, company_search, 'contact_id', 'business_potential',
+            page=page_number - 1, page_size=COMPANY_PICKER_SIZE
+        )
+        if company_page.empty and page_number > 1:
+            # A narrower search left fewer pages; start over at the first
+            st.session_state["hh_company_page"] = 1
+            company_page, match_count = dealer_search.picker_page(
+                searchable_df, company_search, 'contact_id', 'business_potential', page_size=COMPANY_PICKER_SIZE
+            )
         
-        # Company selection dropdown
-        if not searchable_df.empty:
-            # Sort by business potential score (highest first)
-            searchable_df = searchable_df.sort_values('business_potential', ascending=False)
-            
-            # Create display options with score and location
-            company_options = []
-            for _, row in searchable_df.iterrows():
-                display_name = f"{row['name']} (Score: {row['business_potential']:.0f}, {row['location']})"
-                company_options.append(display_name)
-            
-            selected_company_display = st.selectbox(
-                f"Select company for analysis ({len(company_options)} matches)",
-                options=company_options,
-                help="Companies sorted by business potential score",
+        if match_count:
+            page_count = (match_count + COMPANY_PICKER_SIZE - 1) // COMPANY_PICKER_SIZE
+            if page_count > 1:
+                st.number_input(f"Result page (of {page_count:,})", min_value=1, max_value=page_count,
+                                step=1, key="hh_company_page")
+            
+            selected_contact_id = st.selectbox(
+                f"Select company for analysis ({match_count:,} matches)",
+                options=list(company_page.index),
+                format_func=lambda contact_id: "{name} (Score: {business_potential:.0f}, {location})".format(**company_page.loc[contact_id]),
+                help="Best search matches first; without a search, highest business potential first",
                 key="hh_company_select"
             )
             
             # Show company details (always available)
-            if selected_company_display:
-                # Extract actual company name from display
-                company_name = selected_company_display.split(" (Score:")[0]
-                selected_row = searchable_df[searchable_df['name'] == company_name].iloc[0]
+            if selected_contact_id is not None:
+                selected_row = company_page.loc[selected_contact_id]
                 
                 # Display company information
                 st.subheader(f"📊 Company Profile: {selected_row['name']}")
@@ -1855,9 +1949,8 @@ def heavy_haulers_dashboard(analyzer):
                 
                 if openai_api_key:
                     if st.button("🤖 Generate AI Analysis", key="hh_company_ai_analysis"):
-                        # Extract actual company name from display
-                        selected_company = selected_company_display.split(" (Score:")[0]
-                        dealer_info = searchable_df[searchable_df['name'] == selected_company].iloc[0]
+                        selected_company = selected_row['name']
+                        dealer_info = selected_row
                         
                         dealer_summary = f"""
                         Company: {dealer_info['name']}
@@ -2024,12 +2117,7 @@ def heavy_haulers_dashboard(analyzer):
         # Apply filters
         display_df = filtered_df.copy()
         if search_term:
-            mask = (
-                display_df['name'].str.contains(search_term, case=False, na=False) |
-                display_df['location'].str.contains(search_term, case=False, na=False) |
-                display_df['equipment_types'].str.contains(search_term, case=False, na=False)
-            )
-            display_df = display_df[mask]
+            display_df = dealer_search.filter_frame(display_df, search_term)
         
         if show_only_priority:
             display_df = display_df[display_df['priority_level'] == 'High']
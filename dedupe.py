@@ -1,108 +1,264 @@
-import pandas as pd
+import csv
+import hashlib
 import json
 from pathlib import Path
+from entity_resolution import match_keys
 
-def remove_duplicates_csv(input_file, output_file=None, key_columns=['Phone', 'Seller/Company']):
+# Records are streamed in and out; only 8-byte key hashes are kept in memory.
+# For inputs whose key set doesn't fit, passes=N splits the keys by hash and
+# scans the input N times, holding 1/N of them per pass plus a 1-byte-per-row
+# duplicate map.
+
+JSON_BUFFER_SIZE = 1 << 20
+
+def key_hash(key):
+    """Compact 64-bit hash of a dedupe key"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def record_dedupe_keys(record, key_fields, location_field=None, resolve_entities=True):
+    """Keys that mark a record as a duplicate if any of them was seen before
+    
+    With resolve_entities and (phone, company) key fields, these are the
+    entity resolver's exact keys: normalized phone, and normalized company
+    at the same location. Otherwise the lowercased key fields are joined;
+    records without any key data fall back to their full content.
+    """
+    def text(field):
+        value = record.get(field) if field else None
+        return str(value).strip() if value not in (None, '') else ''
+    
+    if resolve_entities and len(key_fields) == 2:
+        phone, site = match_keys({
+            'phone': text(key_fields[0]),
+            'company': text(key_fields[1]),
+            'location': text(location_field)
+        })
+        keys = [f"p:{phone}"] if phone else []
+        if site:
+            keys.append(f"s:{site}")
+        if keys:
+            return keys
+    
+    key_parts = [text(field).lower() for field in key_fields if text(field)]
+    if key_parts:
+        return ['k:' + '||'.join(key_parts)]  # Combine fields with separator
+    
+    # Fallback to the canonical serialization of the entire record
+    return ['r:' + json.dumps(record, sort_keys=True, ensure_ascii=False, default=str)]
+
+def duplicate_flags(read_records, record_keys, passes):
+    """Mark duplicate records (1 byte each) over several hash-partitioned passes"""
+    flags = bytearray()
+    for current_pass in range(passes):
+        seen = set()
+        for i, record in enumerate(read_records()):
+            if current_pass == 0:
+                flags.append(0)
+            for key in record_keys(record):
+                hashed = key_hash(key)
+                if hashed % passes != current_pass:
+                    continue
+                if hashed in seen:
+                    flags[i] = 1
+                else:
+                    seen.add(hashed)
+    return flags
+
+def dedupe_stream(read_records, record_keys, write_record, passes=1):
+    """Write the first record of every duplicate set, streaming; returns (total, kept)"""
+    total = kept = 0
+    
+    if passes <= 1:
+        seen = set()
+        for record in read_records():
+            total += 1
+            hashes = [key_hash(key) for key in record_keys(record)]
+            duplicate = any(hashed in seen for hashed in hashes)
+            seen.update(hashes)
+            if not duplicate:
+                write_record(record)
+                kept += 1
+        return total, kept
+    
+    flags = duplicate_flags(read_records, record_keys, passes)
+    for i, record in enumerate(read_records()):
+        total += 1
+        if not flags[i]:
+            write_record(record)
+            kept += 1
+    return total, kept
+
+def iter_json_array(input_file, buffer_size=JSON_BUFFER_SIZE):
+    """Yield the elements of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(input_file, 'r', encoding='utf-8') as f:
+        buffer = f.read(buffer_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{input_file} is not a JSON array")
+        pos = 1
+        eof = False
+        
+        while True:
+            # Skip separators, refilling the buffer as needed
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer, pos = f.read(buffer_size), 0
+                eof = not buffer
+            
+            if pos >= len(buffer) or buffer[pos] == ']':
+                return
+            
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                more = f.read(buffer_size)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            
+            yield element
+            pos = end
+            if pos > buffer_size:
+                buffer, pos = buffer[pos:], 0
+
+def json_layout(input_file):
+    """'array' for a top-level JSON list, 'object' for anything else"""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                return 'array' if char == '[' else 'object'
+
+def remove_duplicates_csv(input_file, output_file=None, key_columns=['Phone', 'Seller/Company'],
+                          location_column='Location', resolve_entities=True, passes=1):
     """
     Remove duplicates from CSV file based on specified columns
+    
+    Rows are streamed from input to output. With resolve_entities and both
+    a phone and a company key column present, rows are collapsed per
+    business entity (normalized phone, or company at the same location).
     """
     if output_file is None:
         output_file = input_file.replace('.csv', '_deduped.csv')
     
-    # Read CSV
-    df = pd.read_csv(input_file)
+    with open(input_file, 'r', encoding='utf-8', newline='') as f:
+        columns = next(csv.reader(f), [])
     
-    print(f"Original CSV records: {len(df)}")
-    print(f"Available columns: {list(df.columns)}")
+    print(f"Available columns: {columns}")
     
     # Find the best columns to use for deduplication
-    available_key_columns = [col for col in key_columns if col in df.columns]
+    available_key_columns = [col for col in key_columns if col in columns]
+    location = location_column if location_column in columns else None
+    
+    def read_records():
+        with open(input_file, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                # Skip rows where ALL key columns are empty
+                if available_key_columns and not any(row.get(col) for col in available_key_columns):
+                    continue
+                yield row
     
     if available_key_columns:
-        # Remove rows where ALL key columns are empty/null
-        mask = df[available_key_columns].notna().any(axis=1)
-        df_clean = df[mask]
-        
-        print(f"Records with valid key data: {len(df_clean)}")
-        
-        # Remove duplicates based on key columns, only considering non-null values
-        df_deduped = df_clean.drop_duplicates(subset=available_key_columns, keep='first')
-        print(f"Removed duplicates based on: {available_key_columns}")
+        record_keys = lambda row: record_dedupe_keys(row, available_key_columns, location, resolve_entities)
+        print(f"Removing duplicates based on: {available_key_columns}")
     else:
         print(f"None of the preferred columns found. Removing exact duplicate rows.")
-        # Remove exact duplicates
-        df_deduped = df.drop_duplicates(keep='first')
+        record_keys = lambda row: ['r:' + '\x1f'.join(row.get(col) or '' for col in columns)]
     
-    print(f"Deduplicated CSV records: {len(df_deduped)}")
-    print(f"Duplicates removed: {len(df) - len(df_deduped)}")
+    with open(output_file, 'w', encoding='utf-8', newline='') as out:
+        writer = csv.DictWriter(out, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        total, kept = dedupe_stream(read_records, record_keys, writer.writerow, passes)
     
-    # Save deduplicated CSV
-    df_deduped.to_csv(output_file, index=False)
+    print(f"Records with valid key data: {total}")
+    print(f"Deduplicated CSV records: {kept}")
+    print(f"Duplicates removed: {total - kept}")
     print(f"Saved to: {output_file}")
     
-    return df_deduped
+    return total, kept
 
-def remove_duplicates_json(input_file, output_file=None, key_fields=['phone', 'seller']):
+def remove_duplicates_ndjson(input_file, output_file=None, key_fields=['phone', 'seller'],
+                             location_field='location', resolve_entities=True, passes=1):
     """
-    Remove duplicates from JSON file based on specified fields
+    Remove duplicates from a newline-delimited JSON file (one record per line)
     """
     if output_file is None:
-        output_file = input_file.replace('.json', '_deduped.json')
+        path = Path(input_file)
+        output_file = str(path.with_name(f"{path.stem}_deduped{path.suffix}"))
     
-    # Read JSON
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    def read_records():
+        with open(input_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
     
-    # Handle different JSON structures
-    if isinstance(data, list):
-        records = data
-    elif isinstance(data, dict) and 'data' in data:
-        records = data['data']
-    else:
-        records = [data]  # Single record
+    record_keys = lambda record: record_dedupe_keys(record, key_fields, location_field, resolve_entities)
+    
+    with open(output_file, 'w', encoding='utf-8') as out:
+        write_record = lambda record: out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        total, kept = dedupe_stream(read_records, record_keys, write_record, passes)
+    
+    print(f"Original NDJSON records: {total}")
+    print(f"Deduplicated NDJSON records: {kept}")
+    print(f"Duplicates removed: {total - kept}")
+    print(f"Saved to: {output_file}")
+    
+    return total, kept
+
+def remove_duplicates_json(input_file, output_file=None, key_fields=['phone', 'seller'],
+                           location_field='location', resolve_entities=True, passes=1):
+    """
+    Remove duplicates from JSON file based on specified fields
     
-    print(f"Original JSON records: {len(records)}")
+    Top-level arrays are streamed element by element. Wrapped layouts
+    ({"data": [...]} or a single record) are small exports and are
+    deduplicated in memory so their structure can be preserved.
+    """
+    if output_file is None:
+        output_file = input_file.replace('.json', '_deduped.json')
     
-    # Remove duplicates
-    seen = set()
-    deduped_records = []
+    record_keys = lambda record: record_dedupe_keys(record, key_fields, location_field, resolve_entities)
     
-    for record in records:
-        # Create a key for duplicate detection using multiple fields
-        key_parts = []
-        for field in key_fields:
-            if field in record and record[field]:
-                key_parts.append(str(record[field]).lower().strip())
+    if json_layout(input_file) == 'array':
+        with open(output_file, 'w', encoding='utf-8') as out:
+            out.write('[')
+            written = [0]
+            
+            def write_record(record):
+                out.write((',\n  ' if written[0] else '\n  ') + json.dumps(record, ensure_ascii=False))
+                written[0] += 1
+            
+            total, kept = dedupe_stream(lambda: iter_json_array(input_file), record_keys, write_record, passes)
+            out.write('\n]\n')
+    else:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        records = data['data'] if isinstance(data, dict) and 'data' in data else [data]
+        deduped_records = []
+        total, kept = dedupe_stream(lambda: iter(records), record_keys, deduped_records.append)
         
-        if key_parts:
-            key = '||'.join(key_parts)  # Combine fields with separator
+        # Preserve original JSON structure
+        if isinstance(data, dict) and 'data' in data:
+            output_data = data.copy()
+            output_data['data'] = deduped_records
         else:
-            # Fallback to string representation of entire record
-            key = str(sorted(record.items()))
+            output_data = deduped_records[0] if deduped_records else {}
         
-        if key not in seen:
-            seen.add(key)
-            deduped_records.append(record)
-    
-    print(f"Deduplicated JSON records: {len(deduped_records)}")
-    print(f"Duplicates removed: {len(records) - len(deduped_records)}")
-    
-    # Preserve original JSON structure
-    if isinstance(data, list):
-        output_data = deduped_records
-    elif isinstance(data, dict) and 'data' in data:
-        output_data = data.copy()
-        output_data['data'] = deduped_records
-    else:
-        output_data = deduped_records[0] if deduped_records else {}
-    
-    # Save deduplicated JSON
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
     
+    print(f"Original JSON records: {total}")
+    print(f"Deduplicated JSON records: {kept}")
+    print(f"Duplicates removed: {total - kept}")
     print(f"Saved to: {output_file}")
     
-    return output_data
+    return total, kept
 
 def main():
     """
@@ -113,6 +269,7 @@ def main():
     # Find CSV files
     csv_files = list(current_dir.glob('*.csv'))
     json_files = list(current_dir.glob('*.json'))
+    ndjson_files = list(current_dir.glob('*.ndjson')) + list(current_dir.glob('*.jsonl'))
     
     print(f"Found {len(csv_files)} CSV files:")
     for f in csv_files:
@@ -120,19 +277,17 @@ def main():
     print(f"Found {len(json_files)} JSON files:")
     for f in json_files:
         print(f"  - {f}")
+    print(f"Found {len(ndjson_files)} NDJSON files:")
+    for f in ndjson_files:
+        print(f"  - {f}")
     
     print("\n=== CSV Deduplication ===")
     for csv_file in csv_files:
         if '_deduped' not in csv_file.name:  # Skip already processed files
             print(f"\nProcessing: {csv_file}")
             try:
-                # Try different key columns in order of preference
-                df = pd.read_csv(csv_file)
-                
                 # Use phone and company name for deduplication
-                key_columns = ['Phone', 'Seller/Company']
-                remove_duplicates_csv(str(csv_file), key_columns=key_columns)
-                    
+                remove_duplicates_csv(str(csv_file), key_columns=['Phone', 'Seller/Company'])
             except Exception as e:
                 print(f"Error processing {csv_file}: {e}")
     
@@ -141,60 +296,49 @@ def main():
         if '_deduped' not in json_file.name:  # Skip already processed files
             print(f"\nProcessing: {json_file}")
             try:
-                # Try different key fields
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    sample_data = json.load(f)
-                
-                # Determine structure and key field
-                if isinstance(sample_data, list) and sample_data:
-                    sample_record = sample_data[0]
-                elif isinstance(sample_data, dict) and 'data' in sample_data:
-                    sample_record = sample_data['data'][0] if sample_data['data'] else {}
-                else:
-                    sample_record = sample_data
-                
-                key_fields = ['email', 'Email', 'phone', 'Phone', 'name', 'Name']
-                key_field = None
-                
-                for field in key_fields:
-                    if field in sample_record:
-                        key_field = field
-                        break
-                
                 remove_duplicates_json(str(json_file))
-                
             except Exception as e:
                 print(f"Error processing {json_file}: {e}")
+    
+    print("\n=== NDJSON Deduplication ===")
+    for ndjson_file in ndjson_files:
+        if '_deduped' not in ndjson_file.name:  # Skip already processed files
+            print(f"\nProcessing: {ndjson_file}")
+            try:
+                remove_duplicates_ndjson(str(ndjson_file))
+            except Exception as e:
+                print(f"Error processing {ndjson_file}: {e}")
 
 # Additional utility functions
+def count_records(file_path):
+    """Count records in a CSV, JSON or NDJSON file without loading it"""
+    if file_path.endswith('.csv'):
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            return sum(1 for _ in csv.DictReader(f))
+    if file_path.endswith(('.ndjson', '.jsonl')):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return sum(1 for line in f if line.strip())
+    if json_layout(file_path) == 'array':
+        return sum(1 for _ in iter_json_array(file_path))
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return len(data.get('data', [])) if isinstance(data, dict) else 1
+
 def compare_files(original_file, deduped_file):
     """
     Compare original and deduplicated files
     """
-    if original_file.endswith('.csv'):
-        df_orig = pd.read_csv(original_file)
-        df_dedup = pd.read_csv(deduped_file)
-        
-        print(f"Original: {len(df_orig)} records")
-        print(f"Deduplicated: {len(df_dedup)} records")
-        print(f"Removed: {len(df_orig) - len(df_dedup)} duplicates")
-        
-    elif original_file.endswith('.json'):
-        with open(original_file, 'r') as f:
-            orig_data = json.load(f)
-        with open(deduped_file, 'r') as f:
-            dedup_data = json.load(f)
-        
-        orig_count = len(orig_data) if isinstance(orig_data, list) else len(orig_data.get('data', []))
-        dedup_count = len(dedup_data) if isinstance(dedup_data, list) else len(dedup_data.get('data', []))
-        
-        print(f"Original: {orig_count} records")
-        print(f"Deduplicated: {dedup_count} records")
-        print(f"Removed: {orig_count - dedup_count} duplicates")
+    orig_count = count_records(original_file)
+    dedup_count = count_records(deduped_file)
+    
+    print(f"Original: {orig_count} records")
+    print(f"Deduplicated: {dedup_count} records")
+    print(f"Removed: {orig_count - dedup_count} duplicates")
 
 if __name__ == "__main__":
     main()
     
     # Example usage for specific files:
-    # remove_duplicates_csv('seller_contacts_20250815_125706.csv', key_column='email')
-    # remove_duplicates_json('contacts.json', key_field='email')
\ No newline at end of file
+    # remove_duplicates_csv('seller_contacts_20250815_125706.csv', key_columns=['Email'])
+    # remove_duplicates_ndjson('contacts.ndjson', key_fields=['email'], resolve_entities=False)
+    # remove_duplicates_csv('merged_exports.csv', passes=4)  # bound memory for very large inputs
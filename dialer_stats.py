@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Materialized Dialer Statistics
+Summary tables in D1 that the dashboards and the dialer status report read
+instead of recounting unique_phones and contacts on every load
+
+    dialer_stats    stat_key -> value (totals, not called, high priority,
+                    per-priority-level and per-call-status counts)
+    category_stats  per equipment category counts
+    state_stats     per state counts (state parsed from the location)
+
+Triggers on unique_phones and contacts keep the tables current as rows are
+ingested, dialed and dispositioned. Bulk rewrites (populate_unique_phones)
+drop the unique_phones triggers, rewrite, then rebuild everything with one
+set-based refresh.
+
+Usage:
+    python dialer_stats.py install    # Create tables + triggers, then refresh
+    python dialer_stats.py refresh    # Recompute every summary from scratch
+    python dialer_stats.py show       # Print the materialized stats
+"""
+
+import sys
+from d1_replica import get_d1_connection
+
+HIGH_PRIORITY_SCORE = 75
+MULTI_LISTING_COUNT = 3
+
+PRIORITY_LEVELS = ['Very High', 'High', 'Medium', 'Standard']
+
+# Same derivations as the dashboard's dialer analytics query
+STATE_SQL = """(CASE WHEN {row}location LIKE '%, %' THEN TRIM(SUBSTR({row}location, INSTR({row}location, ',') + 1)) ELSE 'Unknown' END)"""
+PRIORITY_LEVEL_SQL = """(CASE WHEN {row}priority_score >= 90 THEN 'Very High' WHEN {row}priority_score >= 75 THEN 'High' WHEN {row}priority_score >= 60 THEN 'Medium' ELSE 'Standard' END)"""
+
+STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dialer_stats (
+    stat_key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS category_stats (
+    equipment_category TEXT PRIMARY KEY,
+    phone_count INTEGER NOT NULL DEFAULT 0,
+    not_called INTEGER NOT NULL DEFAULT 0,
+    high_priority INTEGER NOT NULL DEFAULT 0,
+    total_listings INTEGER NOT NULL DEFAULT 0,
+    priority_sum INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS state_stats (
+    state TEXT PRIMARY KEY,
+    phone_count INTEGER NOT NULL DEFAULT 0,
+    not_called INTEGER NOT NULL DEFAULT 0,
+    high_priority INTEGER NOT NULL DEFAULT 0,
+    total_listings INTEGER NOT NULL DEFAULT 0,
+    priority_sum INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+PHONE_TRIGGERS = ('unique_phones_stats_insert', 'unique_phones_stats_delete', 'unique_phones_stats_update')
+CONTACT_TRIGGERS = ('contacts_stats_insert', 'contacts_stats_delete')
+
+def _group_columns(row):
+    """(phone_count, not_called, high_priority, total_listings, priority_sum) of one unique_phones row"""
+    return (
+        "1",
+        f"({row}call_status IS 'not_called')",
+        f"(IFNULL({row}priority_score, 0) >= {HIGH_PRIORITY_SCORE})",
+        f"IFNULL({row}total_listings, 0)",
+        f"IFNULL({row}priority_score, 0)",
+    )
+
+def _delta_sql(row, sign):
+    """Statements adding (sign=1) or removing (sign=-1) one unique_phones row from the summaries"""
+    prefix = f"{row}."
+    _, not_called, high_priority, total_listings, _ = _group_columns(prefix)
+    group_values = ", ".join(f"{sign} * {column}" for column in _group_columns(prefix))
+    group_update = """
+        phone_count = phone_count + excluded.phone_count,
+        not_called = not_called + excluded.not_called,
+        high_priority = high_priority + excluded.high_priority,
+        total_listings = total_listings + excluded.total_listings,
+        priority_sum = priority_sum + excluded.priority_sum"""
+    return f"""
+    INSERT INTO dialer_stats (stat_key, value) VALUES
+        ('total_numbers', {sign}),
+        ('not_called', {sign} * {not_called}),
+        ('high_priority', {sign} * {high_priority}),
+        ('multi_listing', {sign} * ({total_listings} >= {MULTI_LISTING_COUNT})),
+        ('priority:' || {PRIORITY_LEVEL_SQL.format(row=prefix)}, {sign}),
+        ('status:' || IFNULL({prefix}call_status, 'unknown'), {sign})
+    ON CONFLICT(stat_key) DO UPDATE SET value = value + excluded.value;
+    INSERT INTO category_stats (equipment_category, phone_count, not_called, high_priority, total_listings, priority_sum)
+    VALUES (IFNULL({prefix}equipment_category, 'unknown'), {group_values})
+    ON CONFLICT(equipment_category) DO UPDATE SET{group_update};
+    INSERT INTO state_stats (state, phone_count, not_called, high_priority, total_listings, priority_sum)
+    VALUES ({STATE_SQL.format(row=prefix)}, {group_values})
+    ON CONFLICT(state) DO UPDATE SET{group_update};"""
+
+def trigger_sql():
+    """CREATE TRIGGER statements keeping the summaries in step with unique_phones and contacts"""
+    insert, delete, update = PHONE_TRIGGERS
+    contact_insert, contact_delete = CONTACT_TRIGGERS
+    return f"""
+CREATE TRIGGER IF NOT EXISTS {insert} AFTER INSERT ON unique_phones
+BEGIN{_delta_sql('NEW', 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS {delete} AFTER DELETE ON unique_phones
+BEGIN{_delta_sql('OLD', -1)}
+END;
+CREATE TRIGGER IF NOT EXISTS {update}
+AFTER UPDATE OF call_status, priority_score, total_listings, equipment_category, location ON unique_phones
+BEGIN{_delta_sql('OLD', -1)}{_delta_sql('NEW', 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS {contact_insert} AFTER INSERT ON contacts
+BEGIN
+    INSERT INTO dialer_stats (stat_key, value) VALUES ('total_contacts', 1)
+    ON CONFLICT(stat_key) DO UPDATE SET value = value + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS {contact_delete} AFTER DELETE ON contacts
+BEGIN
+    INSERT INTO dialer_stats (stat_key, value) VALUES ('total_contacts', -1)
+    ON CONFLICT(stat_key) DO UPDATE SET value = value - 1;
+END;
+"""
+
+def refresh_sql():
+    """Set-based full recompute of every summary table"""
+    _, not_called, high_priority, total_listings, priority_sum = _group_columns("")
+    group_columns = f"COUNT(*), SUM({not_called}), SUM({high_priority}), SUM({total_listings}), SUM({priority_sum})"
+    return f"""
+DELETE FROM dialer_stats;
+DELETE FROM category_stats;
+DELETE FROM state_stats;
+INSERT INTO dialer_stats (stat_key, value)
+SELECT 'total_contacts', COUNT(*) FROM contacts
+UNION ALL SELECT 'total_numbers', COUNT(*) FROM unique_phones
+UNION ALL SELECT 'not_called', COUNT(*) FROM unique_phones WHERE {not_called}
+UNION ALL SELECT 'high_priority', COUNT(*) FROM unique_phones WHERE {high_priority}
+UNION ALL SELECT 'multi_listing', COUNT(*) FROM unique_phones WHERE {total_listings} >= {MULTI_LISTING_COUNT}
+UNION ALL SELECT 'priority:' || {PRIORITY_LEVEL_SQL.format(row='')}, COUNT(*) FROM unique_phones GROUP BY 1
+UNION ALL SELECT 'status:' || IFNULL(call_status, 'unknown'), COUNT(*) FROM unique_phones GROUP BY 1;
+INSERT INTO category_stats (equipment_category, phone_count, not_called, high_priority, total_listings, priority_sum)
+SELECT IFNULL(equipment_category, 'unknown'), {group_columns}
+FROM unique_phones GROUP BY 1;
+INSERT INTO state_stats (state, phone_count, not_called, high_priority, total_listings, priority_sum)
+SELECT {STATE_SQL.format(row='')}, {group_columns}
+FROM unique_phones GROUP BY 1;
+"""
+
+def _run(d1, sql, action):
+    result = d1.execute_batch_query(sql)
+    if not result or not result.get('success'):
+        print(f"❌ Failed to {action}: {(result or {}).get('errors', 'Unknown error')}")
+        return False
+    return True
+
+def refresh_stats(d1):
+    """Recompute the summary tables from unique_phones and contacts"""
+    return _run(d1, refresh_sql(), "refresh dialer stats")
+
+def drop_phone_triggers(d1):
+    """Stop per-row maintenance ahead of a bulk rewrite of unique_phones"""
+    return _run(d1, "\n".join(f"DROP TRIGGER IF EXISTS {name};" for name in PHONE_TRIGGERS), "drop stats triggers")
+
+def install_stats(d1):
+    """Create the summary tables and triggers, then fill the tables"""
+    if not _run(d1, STATS_SCHEMA + trigger_sql(), "create dialer stats"):
+        return False
+    return refresh_stats(d1)
+
+def load_stats(d1):
+    """All materialized stats in a single request; None if they haven't been installed
+    
+    Returns {'dialer': {stat_key: value}, 'categories': [...], 'states': [...]}
+    with categories and states ordered by phone count.
+    """
+    result = d1.execute_batch_query("""
+    SELECT stat_key, value FROM dialer_stats;
+    SELECT * FROM category_stats WHERE phone_count > 0 ORDER BY phone_count DESC;
+    SELECT * FROM state_stats WHERE phone_count > 0 ORDER BY phone_count DESC;
+    """)
+    if not result or not result.get('success') or len(result.get('result') or []) < 3:
+        return None
+    
+    dialer, categories, states = (statement.get('results', []) for statement in result['result'][:3])
+    if not dialer:
+        return None
+    return {
+        'dialer': {row['stat_key']: row['value'] for row in dialer},
+        'categories': categories,
+        'states': states
+    }
+
+def show_stats(d1):
+    """Print the materialized stats"""
+    stats = load_stats(d1)
+    if not stats:
+        print("❌ Dialer stats not installed")
+        print("💡 Run: python dialer_stats.py install")
+        return
+    
+    dialer = stats['dialer']
+    print("📊 MATERIALIZED DIALER STATS")
+    print("=" * 60)
+    for key, value in sorted(dialer.items()):
+        print(f"   • {key}: {value:,}")
+    print(f"\n📂 {len(stats['categories'])} categories, 🗺️ {len(stats['states'])} states")
+
+def main():
+    """Main function"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    
+    command = sys.argv[1].lower()
+    d1 = get_d1_connection()
+    if not d1:
+        sys.exit(1)
+    
+    if command == 'install':
+        if not install_stats(d1):
+            sys.exit(1)
+        print("✅ Dialer stats installed")
+        show_stats(d1)
+    elif command == 'refresh':
+        if not refresh_stats(d1):
+            sys.exit(1)
+        print("✅ Dialer stats refreshed")
+        show_stats(d1)
+    elif command == 'show':
+        show_stats(d1)
+    else:
+        print(f"❌ Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,9 @@ load_dotenv()
 
 # Import D1 integration
 from d1_integration import D1ScraperIntegration
+from dialer_stats import PRIORITY_LEVELS, load_stats
+from area_codes import CALL_WINDOW, callable_timezones, local_time, timezone_series
+from export_artifacts import EXPORT_FORMATS, artifact_download, artifact_name, data_version
 
 # Import CRM features
 try:
@@ -160,9 +163,15 @@ def load_dialer_analytics():
             result_data = result['result']
             if isinstance(result_data, list) and len(result_data) > 0:
                 if 'results' in result_data[0]:
-                    return pd.DataFrame(result_data[0]['results'])
+                    df = pd.DataFrame(result_data[0]['results'])
                 else:
-                    return pd.DataFrame(result_data)
+                    df = pd.DataFrame(result_data)
+                if not df.empty:
+                    # Dealer's local timezone from the area code
+                    df['timezone'] = timezone_series(df['phone_number'])
+                    # Export artifacts are cached on disk per data version
+                    df.attrs['version'] = data_version(df)
+                return df
         
         return pd.DataFrame()
         
@@ -180,6 +189,25 @@ def get_database_statistics():
     stats = {}
     
     try:
+        # Materialized summary tables answer everything in one request
+        materialized = load_stats(d1)
+        if materialized:
+            dialer = materialized['dialer']
+            return {
+                'total_contacts': dialer.get('total_contacts', 0),
+                'unique_phones': dialer.get('total_numbers', 0),
+                'high_priority': dialer.get('high_priority', 0),
+                'not_called': dialer.get('not_called', 0),
+                'called': dialer.get('total_numbers', 0) - dialer.get('not_called', 0),
+                'priority_levels': {level: dialer.get(f'priority:{level}', 0) for level in PRIORITY_LEVELS},
+                'top_categories': [
+                    {'equipment_category': row['equipment_category'], 'count': row['phone_count']}
+                    for row in materialized['categories'][:10]
+                ],
+                'categories': materialized['categories'],
+                'states': materialized['states']
+            }
+        
         # Total contacts
         result = d1.execute_query("SELECT COUNT(*) as total FROM contacts")
         if result and result.get('success') and result.get('result'):
@@ -243,11 +271,19 @@ def render_dialer_command_center():
     </div>
     """, unsafe_allow_html=True)
     
-    # Load dialer data
-    dialer_df = load_dialer_analytics()
+    # Load dialer stats (row data only when the summary tables aren't installed)
     stats = get_database_statistics()
+    if 'called' in stats:
+        called_count, total_numbers = stats['called'], stats['unique_phones']
+    else:
+        dialer_df = load_dialer_analytics()
+        if dialer_df is None or dialer_df.empty:
+            st.error("❌ No dialer data available. Run: `python d1_dialer_setup.py populate`")
+            return
+        called_count = len(dialer_df[dialer_df['call_status'] != 'not_called'])
+        total_numbers = len(dialer_df)
     
-    if dialer_df is None or dialer_df.empty:
+    if not total_numbers:
         st.error("❌ No dialer data available. Run: `python d1_dialer_setup.py populate`")
         return
     
@@ -281,8 +317,7 @@ def render_dialer_command_center():
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col5:
-        called_count = len(dialer_df[dialer_df['call_status'] != 'not_called'])
-        conversion_rate = (called_count / len(dialer_df) * 100) if len(dialer_df) > 0 else 0
+        conversion_rate = called_count / total_numbers * 100
         st.markdown('<div class="analytics-card priority-high">', unsafe_allow_html=True)
         st.markdown('<div class="metric-highlight">📈</div>', unsafe_allow_html=True)
         st.metric("Contact Rate", f"{conversion_rate:.1f}%", f"{called_count:,} contacted")
@@ -292,16 +327,26 @@ def render_priority_breakdown():
     """Render priority-based lead breakdown"""
     st.markdown("### 🎯 Priority Lead Analysis")
     
-    dialer_df = load_dialer_analytics()
-    if dialer_df.empty:
-        return
+    stats = get_database_statistics()
+    if 'priority_levels' in stats:
+        if not stats['unique_phones']:
+            return
+        priority_counts = pd.Series({level: count for level, count in stats['priority_levels'].items() if count})
+        top_categories = pd.Series({row['equipment_category']: row['phone_count'] for row in stats['categories'][:8]})
+        state_counts = pd.Series({row['state']: row['phone_count'] for row in stats['states'][:10]})
+    else:
+        dialer_df = load_dialer_analytics()
+        if dialer_df.empty:
+            return
+        priority_counts = dialer_df['priority_level'].value_counts()
+        top_categories = dialer_df['equipment_category'].value_counts().head(8)
+        state_counts = dialer_df['state'].value_counts().head(10)
     
     # Priority analysis
     col1, col2, col3 = st.columns(3)
     
     with col1:
         st.markdown("#### 📊 Priority Distribution")
-        priority_counts = dialer_df['priority_level'].value_counts()
         
         # Create enhanced priority chart
         colors = {'Very High': '#28a745', 'High': '#17a2b8', 'Medium': '#ffc107', 'Standard': '#6c757d'}
@@ -317,7 +362,6 @@ def render_priority_breakdown():
     
     with col2:
         st.markdown("#### 📈 Equipment Categories")
-        top_categories = dialer_df['equipment_category'].value_counts().head(8)
         
         fig_categories = px.bar(
             x=top_categories.values,
@@ -332,7 +376,6 @@ def render_priority_breakdown():
     
     with col3:
         st.markdown("#### 🗺️ Geographic Distribution")
-        state_counts = dialer_df['state'].value_counts().head(10)
         
         fig_states = px.bar(
             x=state_counts.index,
@@ -344,6 +387,22 @@ def render_priority_breakdown():
         fig_states.update_layout(showlegend=False, xaxis_tickangle=45)
         st.plotly_chart(fig_states, use_container_width=True)
 
+def render_export_download(df, name, label, file_label, export_format, primary=False):
+    """Download button serving a cached export artifact (built once per data version)"""
+    version = df.attrs.get('version') or data_version(df)
+    data, file_name, mime = artifact_download(
+        df, name, version, export_format,
+        label=f"{file_label}_{datetime.now().strftime('%Y%m%d')}"
+    )
+    st.download_button(
+        label=label,
+        data=data,
+        file_name=file_name,
+        mime=mime,
+        type="primary" if primary else "secondary",
+        key=f"download_{name}"
+    )
+
 def render_dialer_export_center():
     """Render export options for dialer lists"""
     st.markdown("### 📤 Dialer Export Center")
@@ -352,6 +411,8 @@ def render_dialer_export_center():
     if dialer_df.empty:
         return
     
+    export_format = st.radio("Export Format:", list(EXPORT_FORMATS), horizontal=True)
+    
     export_col1, export_col2, export_col3, export_col4 = st.columns(4)
     
     with export_col1:
@@ -360,14 +421,8 @@ def render_dialer_export_center():
         st.metric("Count", f"{len(very_high_df):,}")
         
         if len(very_high_df) > 0:
-            csv_data = very_high_df.to_csv(index=False)
-            st.download_button(
-                label="📞 Download VIP List",
-                data=csv_data,
-                file_name=f"very_high_priority_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv",
-                type="primary"
-            )
+            render_export_download(very_high_df, 'priority_very_high', "📞 Download VIP List",
+                                   'very_high_priority', export_format, primary=True)
     
     with export_col2:
         st.markdown("#### ⭐ High Priority")
@@ -375,13 +430,8 @@ def render_dialer_export_center():
         st.metric("Count", f"{len(high_df):,}")
         
         if len(high_df) > 0:
-            csv_data = high_df.to_csv(index=False)
-            st.download_button(
-                label="📞 Download High Priority",
-                data=csv_data,
-                file_name=f"high_priority_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
+            render_export_download(high_df, 'priority_high', "📞 Download High Priority",
+                                   'high_priority', export_format)
     
     with export_col3:
         st.markdown("#### 📲 Not Called Yet")
@@ -389,13 +439,8 @@ def render_dialer_export_center():
         st.metric("Count", f"{len(not_called_df):,}")
         
         if len(not_called_df) > 0:
-            csv_data = not_called_df.to_csv(index=False)
-            st.download_button(
-                label="📞 Download Fresh Leads",
-                data=csv_data,
-                file_name=f"not_called_leads_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
+            render_export_download(not_called_df, 'not_called', "📞 Download Fresh Leads",
+                                   'not_called_leads', export_format)
     
     with export_col4:
         st.markdown("#### 🎯 Custom Filter")
@@ -410,13 +455,8 @@ def render_dialer_export_center():
         st.metric("Count", f"{len(filtered_df):,}")
         
         if len(filtered_df) > 0:
-            csv_data = filtered_df.to_csv(index=False)
-            st.download_button(
-                label="📞 Download Filtered",
-                data=csv_data,
-                file_name=f"{selected_category.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
+            render_export_download(filtered_df, artifact_name('category', selected_category), "📞 Download Filtered",
+                                   str(selected_category).replace(' ', '_'), export_format)
 
 def render_live_dialer_preview():
     """Render live preview of dialer-ready numbers"""
@@ -427,7 +467,7 @@ def render_live_dialer_preview():
         return
     
     # Filter options
-    filter_col1, filter_col2, filter_col3 = st.columns(3)
+    filter_col1, filter_col2, filter_col3, filter_col4 = st.columns(4)
     
     with filter_col1:
         priority_filter = st.selectbox(
@@ -444,9 +484,18 @@ def render_live_dialer_preview():
     with filter_col3:
         limit = st.slider("Preview Limit:", 5, 100, 20)
     
+    with filter_col4:
+        callable_only = st.checkbox(
+            "📞 Callable now only",
+            help=f"Dealers whose local time is {CALL_WINDOW[0]}:00-{CALL_WINDOW[1]}:00 on a weekday"
+        )
+    
     # Apply filters
     preview_df = dialer_df.copy()
     
+    if callable_only:
+        preview_df = preview_df[preview_df['timezone'].isin(callable_timezones())]
+    
     if priority_filter != 'All':
         preview_df = preview_df[preview_df['priority_level'] == priority_filter]
     
@@ -466,6 +515,7 @@ def render_live_dialer_preview():
     # Custom formatting for dialer display
     display_df = preview_df.copy()
     display_df['phone_display'] = display_df['phone_number'].apply(lambda x: f"📞 {x}")
+    display_df['local_time'] = display_df['timezone'].map({tz: local_time(tz) for tz in display_df['timezone'].unique()})
     display_df['priority_display'] = display_df.apply(
         lambda row: f"{'🔥' if row['priority_level'] == 'Very High' else '⭐' if row['priority_level'] == 'High' else '📊' if row['priority_level'] == 'Medium' else '📋'} {row['priority_level']} ({row['priority_score']})",
         axis=1
@@ -473,12 +523,13 @@ def render_live_dialer_preview():
     
     # Show formatted table
     st.dataframe(
-        display_df[['company_name', 'phone_display', 'location', 'equipment_category', 'priority_display', 'total_listings', 'call_status']],
+        display_df[['company_name', 'phone_display', 'location', 'local_time', 'equipment_category', 'priority_display', 'total_listings', 'call_status']],
         use_container_width=True,
         column_config={
             'company_name': 'Company',
             'phone_display': 'Phone Number',
             'location': 'Location',
+            'local_time': 'Local Time',
             'equipment_category': 'Equipment',
             'priority_display': 'Priority',
             'total_listings': 'Listings',
@@ -670,36 +721,48 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
+def summary_analysis(rows, key):
+    """Market analysis table (listings, mean priority, numbers) from materialized category/state stats"""
+    summary = pd.DataFrame(rows).set_index(key)
+    return pd.DataFrame({
+        'total_listings': summary['total_listings'],
+        'priority_score': (summary['priority_sum'] / summary['phone_count']).round(1),
+        'company_name': summary['phone_count']
+    })
+
 def render_advanced_analytics():
     """Render advanced analytics and insights"""
     st.markdown("## 📊 Advanced Analytics & Market Insights")
     
-    dialer_df = load_dialer_analytics()
-    if dialer_df.empty:
-        st.warning("No data available for analytics")
-        return
-    
-    # Market analysis
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("### 🏗️ Equipment Market Analysis")
+    stats = get_database_statistics()
+    if stats.get('categories'):
+        category_analysis = summary_analysis(stats['categories'], 'equipment_category').sort_index()
+        state_analysis = summary_analysis(stats['states'], 'state').head(15)
+    else:
+        dialer_df = load_dialer_analytics()
+        if dialer_df.empty:
+            st.warning("No data available for analytics")
+            return
         category_analysis = dialer_df.groupby('equipment_category').agg({
             'total_listings': 'sum',
             'priority_score': 'mean',
             'company_name': 'count'
         }).round(1)
-        
-        st.dataframe(category_analysis, use_container_width=True)
-    
-    with col2:
-        st.markdown("### 🗺️ Geographic Market Distribution")
         state_analysis = dialer_df.groupby('state').agg({
             'company_name': 'count',
             'total_listings': 'sum',
             'priority_score': 'mean'
         }).sort_values('company_name', ascending=False).head(15)
-        
+    
+    # Market analysis
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("### 🏗️ Equipment Market Analysis")
+        st.dataframe(category_analysis, use_container_width=True)
+    
+    with col2:
+        st.markdown("### 🗺️ Geographic Market Distribution")
         st.dataframe(state_analysis, use_container_width=True)
 
 def render_system_administration():
@@ -729,13 +792,8 @@ def render_system_administration():
         if st.button("📋 Export Full Database"):
             dialer_df = load_dialer_analytics()
             if not dialer_df.empty:
-                csv_data = dialer_df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Complete Database",
-                    data=csv_data,
-                    file_name=f"complete_dialer_database_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                    mime="text/csv"
-                )
+                render_export_download(dialer_df, 'complete_database', "📥 Download Complete Database",
+                                       'complete_dialer_database', 'CSV')
     
     with col3:
         st.markdown("### 🔧 System Status")
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Entity Resolution for Contact Records
+One engine that decides which contact records are the same business, shared
+by dedupe.py, target_finder.py, the dialer table and the D1 duplicate cleaner
+
+Records are linked when they share a normalized phone number, or when their
+company names match (fuzzy, see company_matcher.py) in the same location.
+Links are merged with union-find into entities whose IDs stay stable across
+runs, and the clusters are persisted so new records can be resolved
+incrementally without re-clustering everything. Master-log contact IDs and
+D1 contact IDs are different ID spaces, so each has its own cluster file:
+entity_clusters.json (master log) and entity_clusters_d1.json (D1 and the
+local replica).
+
+Usage:
+    python entity_resolution.py build [master_file]   # Full resolve from the master log
+    python entity_resolution.py d1                    # Full resolve from D1 + push contact_entities
+    python entity_resolution.py status [d1]           # Show persisted cluster stats
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+from company_matcher import UnionFind, match_companies, normalize_company
+from contact_index import normalize_phone_digits
+
+ENTITY_FILE = 'entity_clusters.json'        # keyed by master-log contact IDs
+D1_ENTITY_FILE = 'entity_clusters_d1.json'  # keyed by D1 contact IDs
+NON_WORD = re.compile(r'[^\w\s]')
+
+def phone_key(phone):
+    """10-digit phone key (drops a leading US country code)"""
+    digits = normalize_phone_digits(phone)
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits
+
+def phone_key_sql(column):
+    """SQL expression for phone_key over a phone column (punctuation stripped, leading 1 dropped)"""
+    digits = "REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE({column}, '(', ''), ')', ''), '-', ''), ' ', ''), '.', ''), '+', '')".format(column=column)
+    return f"(CASE WHEN LENGTH({digits}) = 11 AND {digits} LIKE '1%' THEN SUBSTR({digits}, 2) ELSE {digits} END)"
+
+def location_key(location):
+    """Normalized location used to tell dealer branches apart"""
+    if not location:
+        return ""
+    return ' '.join(NON_WORD.sub(' ', str(location).lower()).split())
+
+def make_entity_id(first_member):
+    """Entity ID derived from the record that founded the entity"""
+    return 'ent_' + hashlib.md5(str(first_member).encode()).hexdigest()[:12]
+
+def records_from_contacts(contacts):
+    """Resolver records from a master-log style {contact_id: contact} mapping"""
+    return [
+        {
+            'id': contact_id,
+            'phone': contact.get('primary_phone', ''),
+            'company': contact.get('seller_company', ''),
+            'location': contact.get('primary_location', '')
+        }
+        for contact_id, contact in contacts.items()
+    ]
+
+def match_keys(record):
+    """(phone key, company|location key) for exact, incremental matching ('' when missing)"""
+    phone = phone_key(record['phone'])
+    company = normalize_company(record['company'])
+    location = location_key(record['location'])
+    site = f"{company}|{location}" if company and location else ""
+    return (phone if len(phone) >= 7 else ""), site
+
+def _link_records(records, threshold=0.8):
+    """Union-find over records: same phone key, or same company cluster + location"""
+    union_find = UnionFind()
+    by_phone = {}
+    by_site = {}
+    
+    company_key_of = {}
+    for cluster in match_companies((r['company'] for r in records), threshold=threshold):
+        for key in cluster['keys']:
+            company_key_of[key] = cluster['key']
+    
+    for record in records:
+        record_id = record['id']
+        union_find.add(record_id)
+        
+        key = phone_key(record['phone'])
+        if len(key) >= 7:
+            union_find.union(by_phone.setdefault(key, record_id), record_id)
+        
+        company = company_key_of.get(normalize_company(record['company']))
+        location = location_key(record['location'])
+        if company and location:
+            union_find.union(by_site.setdefault((company, location), record_id), record_id)
+    
+    return union_find
+
+class EntityResolver:
+    """Persisted entity clusters with stable IDs and incremental updates"""
+    
+    def __init__(self, clusters_file=ENTITY_FILE):
+        self.clusters_file = clusters_file
+        self.watermark = None      # newest contact last_updated seen by sync_contacts
+        self._clear()
+    
+    def _clear(self):
+        self.record_entity = {}    # record id -> entity id
+        self.record_keys = {}      # record id -> (phone key, site key)
+        self.entities = defaultdict(set)
+        self.phone_entity = {}
+        self.site_entity = {}
+    
+    @classmethod
+    def load(cls, clusters_file=ENTITY_FILE):
+        """Load persisted clusters (an empty resolver if none exist yet)"""
+        resolver = cls(clusters_file)
+        try:
+            with open(clusters_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return resolver
+        
+        for record_id, (entity_id, phone, site) in data.get('records', {}).items():
+            resolver._assign(record_id, entity_id, phone, site)
+        resolver.watermark = data.get('metadata', {}).get('watermark')
+        return resolver
+    
+    def _assign(self, record_id, entity_id, phone, site):
+        self.record_entity[record_id] = entity_id
+        self.record_keys[record_id] = (phone, site)
+        self.entities[entity_id].add(record_id)
+        if phone:
+            self.phone_entity[phone] = entity_id
+        if site:
+            self.site_entity[site] = entity_id
+    
+    def _reassign(self, old_entity, new_entity):
+        """Fold every member of old_entity into new_entity"""
+        for record_id in self.entities.pop(old_entity, set()):
+            phone, site = self.record_keys[record_id]
+            self._assign(record_id, new_entity, phone, site)
+    
+    def resolve(self, records, threshold=0.8):
+        """Full resolution of every record, keeping entity IDs from the previous run where possible"""
+        union_find = _link_records(records, threshold)
+        keys = {record['id']: match_keys(record) for record in records}
+        
+        # Largest clusters pick their previous entity ID first
+        clusters = sorted(union_find.groups().values(), key=len, reverse=True)
+        previous = self.record_entity
+        self._clear()
+        taken = set()
+        
+        for members in clusters:
+            members.sort()
+            votes = Counter(previous[m] for m in members if m in previous and previous[m] not in taken)
+            if votes:
+                entity_id = min(votes, key=lambda e: (-votes[e], e))
+            else:
+                entity_id = next(e for e in map(make_entity_id, members) if e not in taken)
+            taken.add(entity_id)
+            for record_id in members:
+                self._assign(record_id, entity_id, *keys[record_id])
+        
+        return self.record_entity
+    
+    def update(self, records):
+        """Resolve new or changed records against the persisted clusters
+        
+        Matches are exact on phone key or on normalized company + location;
+        fuzzy company variants are picked up by the next full resolve().
+        Returns the set of entity IDs that changed.
+        """
+        changed = set()
+        for record in records:
+            record_id = record['id']
+            phone, site = match_keys(record)
+            if self.record_keys.get(record_id) == (phone, site):
+                continue
+            
+            # Changed records leave their old entity before being re-linked
+            old_entity = self.record_entity.pop(record_id, None)
+            if old_entity:
+                self.entities[old_entity].discard(record_id)
+                changed.add(old_entity)
+            
+            matches = {self.phone_entity.get(phone), self.site_entity.get(site)} - {None}
+            matches = {entity for entity in matches if self.entities.get(entity)}
+            if not matches:
+                entity_id = make_entity_id(record_id)
+                while self.entities.get(entity_id):
+                    entity_id = make_entity_id(entity_id)
+            else:
+                entity_id = max(matches, key=lambda e: (len(self.entities[e]), e))
+                for other in matches - {entity_id}:
+                    self._reassign(other, entity_id)
+                    changed.add(other)
+            
+            self._assign(record_id, entity_id, phone, site)
+            changed.add(entity_id)
+        
+        return changed
+    
+    def sync_contacts(self, contacts):
+        """Bring the clusters up to date with a {contact_id: contact} mapping
+        
+        Only contacts never resolved, or whose last_updated is at or past the
+        stored watermark, are passed to update(); an empty resolver does a
+        full resolve(). Returns the number of contacts re-linked.
+        """
+        watermark = self.watermark or ''
+        newest = watermark
+        changed = {}
+        for contact_id, contact in contacts.items():
+            last_updated = contact.get('last_updated') or ''
+            if last_updated > newest:
+                newest = last_updated
+            if last_updated >= watermark or contact_id not in self.record_entity:
+                changed[contact_id] = contact
+        
+        if not self.record_entity:
+            self.resolve(records_from_contacts(contacts))
+        elif changed:
+            self.update(records_from_contacts(changed))
+        self.watermark = newest or None
+        return len(changed)
+    
+    def entity_of(self, record_id):
+        return self.record_entity.get(record_id)
+    
+    def clusters(self, min_size=2):
+        """Yield (entity_id, member ids) for entities with at least min_size records"""
+        for entity_id, members in self.entities.items():
+            if len(members) >= min_size:
+                yield entity_id, sorted(members)
+    
+    def save(self):
+        """Persist the clusters (compact JSON, one [entity, phone, site] triple per record)"""
+        data = {
+            "metadata": {
+                "updated": datetime.now().isoformat(),
+                "total_records": len(self.record_entity),
+                "total_entities": sum(1 for members in self.entities.values() if members),
+                "watermark": self.watermark,
+                "description": "Contact record -> business entity clusters"
+            },
+            "records": {
+                record_id: [entity_id, *self.record_keys[record_id]]
+                for record_id, entity_id in self.record_entity.items()
+            }
+        }
+        temp_file = f"{self.clusters_file}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_file, self.clusters_file)
+
+def fetch_d1_contact_records(d1, page_size=1000):
+    """Page the contact columns the resolver needs out of D1"""
+    from d1_replica import d1_rows
+    
+    records, last_rowid = [], 0
+    while True:
+        rows = d1_rows(d1, """
+        SELECT rowid AS _rowid, id, primary_phone, seller_company, primary_location
+        FROM contacts WHERE rowid > ? ORDER BY rowid LIMIT ?
+        """, [last_rowid, page_size])
+        records.extend({
+            'id': row['id'],
+            'phone': row['primary_phone'] or '',
+            'company': row['seller_company'] or '',
+            'location': row['primary_location'] or ''
+        } for row in rows)
+        if len(rows) < page_size:
+            return records
+        last_rowid = rows[-1]['_rowid']
+
+def push_entities_to_d1(d1, resolver):
+    """Replace D1's contact_entities table with the resolver's clusters
+    
+    Rows are loaded into a staging table first and swapped in with one
+    batched request, so a failed upload leaves the previous mapping intact.
+    """
+    from d1_snapshot import insert_statements
+    
+    result = d1.execute_batch_query("""
+    DROP TABLE IF EXISTS contact_entities_staging;
+    CREATE TABLE contact_entities_staging (
+        contact_id TEXT PRIMARY KEY,
+        entity_id TEXT NOT NULL,
+        phone_key TEXT
+    );
+    """)
+    if not result or not result.get('success'):
+        print("❌ Failed to create contact_entities staging table")
+        return False
+    
+    rows = [
+        {'contact_id': record_id, 'entity_id': entity_id, 'phone_key': resolver.record_keys[record_id][0]}
+        for record_id, entity_id in resolver.record_entity.items()
+    ]
+    for batch, statement in enumerate(insert_statements('contact_entities_staging', rows) if rows else (), 1):
+        result = d1.execute_query(statement)
+        if not result or not result.get('success'):
+            print(f"❌ Failed to upload entity batch {batch} - contact_entities left unchanged")
+            return False
+    
+    result = d1.execute_batch_query("""
+    DROP TABLE IF EXISTS contact_entities;
+    ALTER TABLE contact_entities_staging RENAME TO contact_entities;
+    CREATE INDEX IF NOT EXISTS idx_contact_entities_entity ON contact_entities(entity_id);
+    CREATE INDEX IF NOT EXISTS idx_contact_entities_phone ON contact_entities(phone_key);
+    """)
+    if not result or not result.get('success'):
+        print("❌ Failed to swap in the new contact_entities table")
+        return False
+    
+    print(f"   ✅ Uploaded {len(rows):,} contact → entity links")
+    return True
+
+def show_status(clusters_file=ENTITY_FILE):
+    """Print persisted cluster statistics"""
+    resolver = EntityResolver.load(clusters_file)
+    if not resolver.record_entity:
+        print(f"❌ No entity clusters found at {clusters_file}")
+        return
+    
+    sizes = Counter(len(members) for members in resolver.entities.values() if members)
+    multi = sum(count for size, count in sizes.items() if size > 1)
+    print(f"🧩 ENTITY CLUSTERS: {clusters_file}")
+    print("=" * 60)
+    print(f"   • Records: {len(resolver.record_entity):,}")
+    print(f"   • Entities: {sum(sizes.values()):,}")
+    print(f"   • Entities with duplicates: {multi:,}")
+    print(f"   • Largest entity: {max(sizes)} records")
+
+def main():
+    """Main function"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    
+    command = sys.argv[1].lower()
+    
+    if command == 'build':
+        master_file = sys.argv[2] if len(sys.argv) > 2 else "master_contact_database.json"
+        with open(master_file, 'r', encoding='utf-8') as f:
+            contacts = json.load(f)['contacts']
+        resolver = EntityResolver.load()
+        resolver.resolve(records_from_contacts(contacts))
+        resolver.save()
+        show_status()
+    elif command == 'd1':
+        from d1_replica import get_d1_connection
+        d1 = get_d1_connection()
+        if not d1:
+            sys.exit(1)
+        print("📥 Loading contacts from D1...")
+        records = fetch_d1_contact_records(d1)
+        resolver = EntityResolver.load(D1_ENTITY_FILE)
+        resolver.resolve(records)
+        resolver.save()
+        if not push_entities_to_d1(d1, resolver):
+            sys.exit(1)
+        show_status(D1_ENTITY_FILE)
+    elif command == 'status':
+        d1_ids = len(sys.argv) > 2 and sys.argv[2].lower() == 'd1'
+        show_status(D1_ENTITY_FILE if d1_ids else ENTITY_FILE)
+    else:
+        print(f"❌ Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Dialer Export Artifacts
+Export files built once per data version and cached on disk, so dashboard
+download buttons never re-serialize the dialer table on a rerun
+
+An artifact is identified by a name (the filter it holds, e.g.
+"priority_very_high"), the version of the data it was cut from and its
+format. Building an artifact that already exists is a no-op; building a
+newer version removes the older files of the same name and format.
+"""
+
+import glob
+import hashlib
+import os
+import re
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 - pandas' parquet engine
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+ARTIFACT_DIR = os.path.join("dialer_exports", "artifacts")
+
+# format -> (file extension, mime type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+}
+if PARQUET_AVAILABLE:
+    EXPORT_FORMATS['Parquet'] = ('parquet', 'application/vnd.apache.parquet')
+
+def data_version(df):
+    """Short content hash identifying a version of a DataFrame"""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    digest.update(','.join(map(str, df.columns)).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+def artifact_name(*parts):
+    """Filesystem-safe artifact name from filter parts"""
+    return '_'.join(re.sub(r'[^a-z0-9]+', '-', str(part).lower()).strip('-') for part in parts)
+
+def build_artifact(df, name, version, export_format='CSV', artifact_dir=None):
+    """Path of the artifact for (name, version, format), writing it first if needed"""
+    artifact_dir = artifact_dir or ARTIFACT_DIR
+    extension = EXPORT_FORMATS[export_format][0]
+    path = os.path.join(artifact_dir, f"{name}.{version}.{extension}")
+    if os.path.exists(path):
+        return path
+    
+    os.makedirs(artifact_dir, exist_ok=True)
+    temp_file = f"{path}.tmp"
+    if extension == 'parquet':
+        df.to_parquet(temp_file, index=False)
+    else:
+        df.to_csv(temp_file, index=False, compression='gzip' if extension.endswith('.gz') else None)
+    os.replace(temp_file, path)
+    
+    # Older versions of this artifact are never served again
+    for stale in glob.glob(os.path.join(glob.escape(artifact_dir), f"{glob.escape(name)}.*.{extension}")):
+        if stale != path:
+            os.remove(stale)
+    return path
+
+def artifact_download(df, name, version, export_format='CSV', label=None, artifact_dir=None):
+    """(bytes, download file name, mime type) for a cached artifact"""
+    path = build_artifact(df, name, version, export_format, artifact_dir)
+    extension, mime = EXPORT_FORMATS[export_format]
+    with open(path, 'rb') as f:
+        data = f.read()
+    return data, f"{label or name}.{extension}", mime
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Bitmap Filter Index
+Per-value boolean masks over a contact frame, so dashboard filters combine
+with vectorized AND/OR instead of rescanning string columns on every rerun,
+and every filter option can show its live count
+
+A facet is a column (or an exploded multi-value column such as categories);
+each of its values owns one row of a (values x contacts) boolean matrix.
+Selected values are OR'd within a facet and AND'd across facets. Option
+counts for a facet apply every other facet's selection, so each count is the
+number of contacts picking that option would leave.
+"""
+
+import numpy as np
+import pandas as pd
+
+class FilterIndex:
+    """Boolean bitmaps per facet value, positionally aligned with the indexed frame"""
+    
+    def __init__(self, size):
+        self.size = size
+        self.values = {}
+        self.bitmaps = {}
+        self.positions = {}
+    
+    @classmethod
+    def from_frame(cls, df, columns, exploded=None):
+        """Index `columns` of df plus {facet: exploded Series indexed by df labels}"""
+        index = cls(len(df))
+        for column in columns:
+            index.add_column(column, df[column])
+        for facet, values in (exploded or {}).items():
+            index.add_exploded(facet, values, df.index)
+        return index
+    
+    def _add(self, facet, values, matrix):
+        self.values[facet] = values
+        self.bitmaps[facet] = matrix
+        self.positions[facet] = {value: position for position, value in enumerate(values)}
+    
+    def add_column(self, facet, series):
+        """One bitmap per distinct value of a single-valued column (NaN is never matched)"""
+        codes, uniques = pd.factorize(series)
+        matrix = codes[np.newaxis, :] == np.arange(len(uniques))[:, np.newaxis]
+        self._add(facet, list(uniques), matrix)
+    
+    def add_exploded(self, facet, values, frame_index):
+        """One bitmap per distinct value of a multi-valued column given as (label, value) rows"""
+        rows = frame_index.get_indexer(values.index)
+        codes, uniques = pd.factorize(values)
+        keep = (codes >= 0) & (rows >= 0)
+        matrix = np.zeros((len(uniques), self.size), dtype=bool)
+        matrix[codes[keep], rows[keep]] = True
+        self._add(facet, list(uniques), matrix)
+    
+    def facet_mask(self, facet, selected):
+        """Rows having any of the selected values of a facet"""
+        if not isinstance(selected, (list, tuple, set)):
+            selected = [selected]
+        positions = [self.positions[facet][value] for value in selected if value in self.positions[facet]]
+        if not positions:
+            return np.zeros(self.size, dtype=bool)
+        return self.bitmaps[facet][positions].any(axis=0)
+    
+    def mask(self, selections, base=None):
+        """Rows matching every facet selection ({facet: value or values}; None = no filter)"""
+        mask = np.ones(self.size, dtype=bool) if base is None else base.copy()
+        for facet, selected in selections.items():
+            if selected is not None:
+                mask &= self.facet_mask(facet, selected)
+        return mask
+    
+    def counts(self, facet, selections, base=None):
+        """{value: matching rows} for a facet under every other facet's selection"""
+        others = self.mask({name: selected for name, selected in selections.items() if name != facet}, base)
+        totals = np.count_nonzero(self.bitmaps[facet] & others, axis=1)
+        return dict(zip(self.values[facet], totals.tolist()))
@@ -3,44 +3,35 @@
 Properly fix categories based on first_contact_date
 """
 
-import json
-from datetime import datetime
+from master_log_transforms import register_transform, run_transforms
 
-def fix_categories_properly():
-    """Fix categories based on actual scraping dates"""
-    
-    with open('master_contact_database.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    print(f"🔧 Properly categorizing {len(data['contacts'])} contacts...")
-    
-    updated_count = 0
-    
-    for contact_id, contact in data['contacts'].items():
-        first_contact_date = contact.get('first_contact_date', '')
-        
-        for source in contact.get('sources', []):
-            # Categorize based on when they were first scraped
-            if first_contact_date == '2025-08-15':
-                # First scrape was excavators  
-                if source.get('category') != 'excavator':
-                    source['category'] = 'excavator'
-                    updated_count += 1
-            elif first_contact_date == '2025-08-17':
-                # Second scrape was dozers
-                if source.get('category') != 'dozer':
-                    source['category'] = 'dozer'
-                    updated_count += 1
+# First scrape was excavators, second scrape was dozers
+SCRAPE_DATE_CATEGORIES = {
+    '2025-08-15': 'excavator',
+    '2025-08-17': 'dozer',
+}
+
+@register_transform('fix_categories_v2', metadata_flag='category_fix_v2_applied')
+def fix_contact_categories_by_date(contact_id, contact):
+    """Per-contact transform: categorize sources based on when they were first scraped"""
+    category = SCRAPE_DATE_CATEGORIES.get(contact.get('first_contact_date', ''))
+    if not category:
+        return False
     
-    # Update metadata
-    data['metadata']['last_updated'] = datetime.now().isoformat()
-    data['metadata']['category_fix_v2_applied'] = True
+    changed = False
+    for source in contact.get('sources', []):
+        if source.get('category') != category:
+            source['category'] = category
+            changed = True
     
-    # Save updated data
-    with open('master_contact_database.json', 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    return changed
+
+def fix_categories_properly():
+    """Fix categories based on actual scraping dates"""
+    results = run_transforms(['fix_categories_v2'])
+    if results is None:
+        return
     
-    print(f"✅ Updated {updated_count} source categories")
     print("🎯 Categories now properly mapped:")
     print("   - 2025-08-15 contacts (4,919) → excavator") 
     print("   - 2025-08-17 contacts (667) → dozer")
@@ -21,6 +21,8 @@ load_dotenv()
 import re
 import numpy as np
 from collections import Counter, defaultdict
+from lead_scoring import score_frame
+from search_index import SearchIndex
 
 # Configure page
 st.set_page_config(
@@ -138,10 +140,19 @@ def process_dealer_data(master_log):
     
     return pd.DataFrame(records)
 
+@st.cache_resource(max_entries=1, show_spinner=False)
+def dealer_search_index(version, _df):
+    """Search index over dealer name, equipment types and location, rebuilt when the data version changes"""
+    return SearchIndex.from_frame(_df, {'name': 3, 'equipment_types': 2, 'location': 1}, id_column='contact_id')
+
+COMPANY_PICKER_SIZE = 50
+
 # Load and process data
 master_log = load_master_database()
 if master_log:
     df = process_dealer_data(master_log)
+    # Changes whenever the master log is rewritten or the dealer frame is rebuilt differently
+    data_version = (master_log.get('metadata', {}).get('last_updated'), len(master_log['contacts']), len(df))
     
     if not df.empty:
         # Sidebar filters
@@ -163,35 +174,7 @@ if master_log:
             filtered_df = filtered_df[filtered_df['state'] == selected_state]
         
         # Calculate business potential scores (needed for all tabs)
-        def calculate_business_potential(row):
-            score = 0
-            
-            # More equipment types = higher potential
-            score += row['num_equipment_types'] * 20
-            
-            # Multiple sources = more established business
-            score += min(row['num_sources'], 5) * 10
-            
-            # Has phone number = easier to reach
-            if row['phone']:
-                score += 25
-            
-            # Has website = more professional operation
-            if row['website']:
-                score += 15
-            
-            # High-demand equipment bonuses
-            equipment_list = str(row['equipment_types']).lower()
-            if 'excavator' in equipment_list:
-                score += 15
-            if 'crane' in equipment_list:
-                score += 20  # Cranes are high-value for logistics
-            if 'dozer' in equipment_list:
-                score += 10
-            
-            return score
-        
-        filtered_df['business_potential'] = filtered_df.apply(calculate_business_potential, axis=1)
+        filtered_df['business_potential'] = score_frame(filtered_df, 'business_potential')
         filtered_df['priority_level'] = pd.cut(filtered_df['business_potential'], 
                                              bins=[0, 50, 80, 200], 
                                              labels=['Low', 'Medium', 'High'])
@@ -584,31 +567,36 @@ if master_log:
                 if priority_filter != 'All':
                     searchable_df = searchable_df[searchable_df['priority_level'] == priority_filter]
                 
-                # Apply company name search
-                if company_search:
-                    searchable_df = searchable_df[searchable_df['name'].str.contains(company_search, case=False, na=False)]
+                # Company picker: one page of ranked matches (best search match, else highest score)
+                dealer_search = dealer_search_index(data_version, df)
+                page_number = st.session_state.get("company_page", 1)
+                company_page, match_count = dealer_search.picker_page(
+                    searchable_df, company_search, 'contact_id', 'business_potential',
+                    page=page_number - 1, page_size=COMPANY_PICKER_SIZE
+                )
+                if company_page.empty and page_number > 1:
+                    # A narrower search left fewer pages; start over at the first
+                    st.session_state["company_page"] = 1
+                    company_page, match_count = dealer_search.picker_page(
+                        searchable_df, company_search, 'contact_id', 'business_potential', page_size=COMPANY_PICKER_SIZE
+                    )
                 
-                # Company selection dropdown
-                if not searchable_df.empty:
-                    # Sort by business potential score (highest first)
-                    searchable_df = searchable_df.sort_values('business_potential', ascending=False)
-                    
-                    # Create display options with score and location
-                    company_options = []
-                    for _, row in searchable_df.iterrows():
-                        display_name = f"{row['name']} (Score: {row['business_potential']:.0f}, {row['location']})"
-                        company_options.append(display_name)
+                if match_count:
+                    page_count = (match_count + COMPANY_PICKER_SIZE - 1) // COMPANY_PICKER_SIZE
+                    if page_count > 1:
+                        st.number_input(f"Result page (of {page_count:,})", min_value=1, max_value=page_count,
+                                        step=1, key="company_page")
                     
-                    selected_company_display = st.selectbox(
-                        f"Select company for AI analysis ({len(company_options)} matches)",
-                        options=company_options,
-                        help="Companies sorted by business potential score"
+                    selected_contact_id = st.selectbox(
+                        f"Select company for AI analysis ({match_count:,} matches)",
+                        options=list(company_page.index),
+                        format_func=lambda contact_id: "{name} (Score: {business_potential:.0f}, {location})".format(**company_page.loc[contact_id]),
+                        help="Best search matches first; without a search, highest business potential first"
                     )
                     
-                    if selected_company_display and st.button("🤖 Generate AI Analysis", key="company_ai_analysis"):
-                        # Extract actual company name from display
-                        selected_company = selected_company_display.split(" (Score:")[0]
-                        dealer_info = searchable_df[searchable_df['name'] == selected_company].iloc[0]
+                    if selected_contact_id is not None and st.button("🤖 Generate AI Analysis", key="company_ai_analysis"):
+                        dealer_info = company_page.loc[selected_contact_id]
+                        selected_company = dealer_info['name']
                         
                         dealer_summary = f"""
                         Company: {dealer_info['name']}
@@ -843,12 +831,7 @@ if master_log:
             # Apply filters
             display_df = filtered_df.copy()
             if search_term:
-                mask = (
-                    display_df['name'].str.contains(search_term, case=False, na=False) |
-                    display_df['location'].str.contains(search_term, case=False, na=False) |
-                    display_df['equipment_types'].str.contains(search_term, case=False, na=False)
-                )
-                display_df = display_df[mask]
+                display_df = dealer_search_index(data_version, df).filter_frame(display_df, search_term)
             
             if show_only_priority:
                 display_df = display_df[display_df['priority_level'] == 'High']
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Lead Scheduler for the Dialer
+Hands out leads from unique_phones by priority, honouring callback times,
+retry spacing between attempts, and time-limited leases so two reps never
+get the same lead. Leads are identified by their normalized phone number
+(entity_resolution.phone_key), which survives reloads and rescoring.
+
+Each territory keeps two heaps: leads that are callable now, ordered by
+priority (callbacks first), and leads that become callable later, ordered
+by eligible time. Claims, releases and lease expiry are O(log n); entries
+made stale by a later change are skipped lazily. Leases, callbacks and
+queued call outcomes are written to crm_data/lead_scheduler.json on every
+claim and release; the outcomes (call_status, call_attempts,
+last_call_date) are written back to unique_phones in batched UPDATEs.
+"""
+
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from entity_resolution import phone_key
+
+SCHEDULER_STATE_FILE = os.path.join("crm_data", "lead_scheduler.json")
+LEASE_SECONDS = 4 * 60 * 60
+FLUSH_EVERY = 20  # call outcomes queued before they are written to unique_phones
+OUTCOME_BATCH = 25  # outcomes per UPDATE (4 bound parameters each, D1 allows 100)
+STATE_VERSION = 2  # 2: lead IDs are phone keys (1 used DataFrame row positions)
+
+# Hours to wait before the next attempt, by number of attempts already made
+RETRY_SPACING_HOURS = [0, 4, 24, 72, 168]
+
+# Outcomes that take a lead out of the queue for good
+FINAL_STATUSES = {
+    'interested', 'called_interested', 'not_interested', 'called_not_interested',
+    'do_not_call', 'wrong_number', 'sold'
+}
+CALLBACK_STATUSES = {'callback', 'callback_scheduled'}
+CALLBACK_PRIORITY = 10 ** 6  # due callbacks jump the queue
+
+NON_WORD = re.compile(r'[^a-z0-9]+')
+LEAD_ID = re.compile(r'^\d{10}$')
+
+def is_lead_id(lead_id):
+    """True for a 10-digit phone key (the lead ID format since STATE_VERSION 2)"""
+    return bool(LEAD_ID.match(str(lead_id)))
+
+def normalize_status(status):
+    """'Called - Not Interested' -> 'called_not_interested'"""
+    return NON_WORD.sub('_', str(status or 'not_called').lower()).strip('_')
+
+def parse_timestamp(value):
+    """Epoch seconds from an ISO / SQLite datetime string (None if empty or unparseable)"""
+    if value in (None, '') or value != value:  # value != value catches NaN from pandas
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '')).timestamp()
+    except ValueError:
+        return None
+
+def next_eligible_time(call_status, call_attempts=0, last_call_date=None, callback_at=None):
+    """When a lead may be called next (epoch seconds), or None if it is finished"""
+    status = normalize_status(call_status)
+    if status in FINAL_STATUSES:
+        return None
+    if status in CALLBACK_STATUSES and callback_at:
+        return callback_at
+    last_call = parse_timestamp(last_call_date)
+    if not last_call:
+        return 0.0
+    attempts = int(call_attempts or 0)
+    spacing = RETRY_SPACING_HOURS[min(attempts, len(RETRY_SPACING_HOURS) - 1)]
+    return last_call + spacing * 3600
+
+class LeadScheduler:
+    """Thread-safe per-territory lead queues with leases"""
+    
+    def __init__(self, state_file=SCHEDULER_STATE_FILE, lease_seconds=LEASE_SECONDS, flush_every=FLUSH_EVERY, d1=None):
+        self.state_file = state_file
+        self.lease_seconds = lease_seconds
+        self.flush_every = flush_every
+        self.d1 = d1                      # D1 connection outcomes are written to (queued only without one)
+        self._lock = threading.RLock()
+        self.leads = {}                   # lead_id -> {'territory', 'priority', 'attempts', 'eligible_at', 'state', 'version'}
+        self.ready = defaultdict(list)    # territory -> [(-priority, eligible_at, lead_id, version)]
+        self.waiting = defaultdict(list)  # territory -> [(eligible_at, lead_id, version)]
+        self.ready_count = defaultdict(int)
+        self.waiting_count = defaultdict(int)
+        self.leases = {}                  # lead_id -> (rep, expires_at)
+        self.lease_heap = []              # [(expires_at, lead_id)]
+        self.callbacks = {}               # lead_id -> epoch seconds
+        self.outcomes = {}                # lead_id -> {'phone', 'call_status', 'attempts', 'call_date'} not yet in D1
+        self.expired = []                 # lead IDs whose lease ran out, until drain_expired()
+        self.source_signature = None
+    
+    @classmethod
+    def load(cls, state_file=SCHEDULER_STATE_FILE, **kwargs):
+        """Scheduler with leases and callbacks restored from the state file"""
+        scheduler = cls(state_file, **kwargs)
+        try:
+            with open(state_file, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return scheduler
+        
+        if data.get('version') != STATE_VERSION:
+            # Row-position IDs point at other phones once the frame reloads:
+            # drop the leases and callbacks, re-key queued outcomes by their phone
+            outcomes = {}
+            for outcome in data.get('outcomes', {}).values():
+                lead_id = phone_key(outcome['phone'])
+                if lead_id in outcomes:
+                    outcome = dict(outcome, attempts=outcomes[lead_id]['attempts'] + outcome['attempts'])
+                outcomes[lead_id] = outcome
+            scheduler.outcomes = outcomes
+            print(f"♻️ Reset lead scheduler state from {state_file} "
+                  f"({len(data.get('leases', {}))} leases dropped, {len(outcomes)} outcomes kept)")
+            scheduler.flush()
+            return scheduler
+        
+        scheduler.callbacks = {lead_id: float(at) for lead_id, at in data.get('callbacks', {}).items()}
+        scheduler.outcomes = data.get('outcomes', {})
+        for lead_id, (rep, expires_at) in data.get('leases', {}).items():
+            scheduler.leases[lead_id] = (rep, expires_at)
+            heapq.heappush(scheduler.lease_heap, (expires_at, lead_id))
+        return scheduler
+    
+    def _dequeue(self, lead):
+        """Take a lead out of whichever heap holds it (its heap entry goes stale)"""
+        if lead['state'] == 'ready':
+            self.ready_count[lead['territory']] -= 1
+        elif lead['state'] == 'waiting':
+            self.waiting_count[lead['territory']] -= 1
+        lead['version'] += 1
+        lead['state'] = None
+    
+    def _enqueue(self, lead_id, now):
+        """Queue a lead according to its eligible time"""
+        lead = self.leads[lead_id]
+        if lead['eligible_at'] is None:
+            lead['state'] = 'done'
+            return
+        territory = lead['territory']
+        if lead['eligible_at'] <= now:
+            priority = CALLBACK_PRIORITY if lead_id in self.callbacks else lead['priority']
+            heapq.heappush(self.ready[territory], (-priority, lead['eligible_at'], lead_id, lead['version']))
+            self.ready_count[territory] += 1
+            lead['state'] = 'ready'
+        else:
+            heapq.heappush(self.waiting[territory], (lead['eligible_at'], lead_id, lead['version']))
+            self.waiting_count[territory] += 1
+            lead['state'] = 'waiting'
+    
+    def _promote(self, territory, now):
+        """Move leads whose eligible time has come from waiting to ready"""
+        waiting = self.waiting[territory]
+        while waiting and waiting[0][0] <= now:
+            _, lead_id, version = heapq.heappop(waiting)
+            lead = self.leads.get(lead_id)
+            if lead and lead['version'] == version and lead['state'] == 'waiting':
+                self.waiting_count[territory] -= 1
+                self._enqueue(lead_id, now)
+    
+    def _ready_head(self, territory):
+        """Best valid ready entry for a territory (drops stale entries on the way)"""
+        ready = self.ready[territory]
+        while ready:
+            _, _, lead_id, version = ready[0]
+            lead = self.leads.get(lead_id)
+            if lead and lead['version'] == version and lead['state'] == 'ready':
+                return ready[0]
+            heapq.heappop(ready)
+        return None
+    
+    def sync(self, leads, signature=None, exclude=(), now=None):
+        """Load or refresh leads from unique_phones-style rows
+        
+        leads is an iterable of dicts with 'id' (phone key), 'phone', 'territory',
+        'priority', 'call_status', 'call_attempts' and 'last_call_date'.
+        Outcomes not yet written to unique_phones are applied on top of the
+        rows. Leased leads keep their lease; leads in exclude (claimed outside
+        the scheduler) are never queued. Leads missing from the rows are dropped.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            seen = set()
+            for row in leads:
+                lead_id = str(row['id'])
+                seen.add(lead_id)
+                outcome = self.outcomes.get(lead_id)
+                if outcome:
+                    row = dict(row, call_status=outcome['call_status'], last_call_date=outcome['call_date'],
+                               call_attempts=int(row.get('call_attempts') or 0) + outcome['attempts'])
+                eligible_at = next_eligible_time(row.get('call_status'), row.get('call_attempts'),
+                                                 row.get('last_call_date'), self.callbacks.get(lead_id))
+                if lead_id in exclude and lead_id not in self.leases:
+                    eligible_at = None
+                
+                lead = self.leads.get(lead_id)
+                if lead is None:
+                    lead = self.leads[lead_id] = {'version': 0, 'state': None}
+                elif (lead['territory'], lead['priority'], lead['eligible_at']) == (
+                        row.get('territory') or 'Unknown', row.get('priority') or 0, eligible_at):
+                    continue
+                else:
+                    self._dequeue(lead)
+                
+                lead.update(territory=row.get('territory') or 'Unknown', priority=row.get('priority') or 0,
+                            attempts=int(row.get('call_attempts') or 0), eligible_at=eligible_at,
+                            phone=row.get('phone'))
+                if lead_id in self.leases:
+                    lead['state'] = 'leased'
+                else:
+                    self._enqueue(lead_id, now)
+            
+            for lead_id in [lead_id for lead_id in self.leads if lead_id not in seen]:
+                self._dequeue(self.leads.pop(lead_id))
+            self.source_signature = signature
+    
+    def claim(self, rep, territories=None, count=10, now=None):
+        """Lease the best callable leads across territories to rep; returns their IDs"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self.expire(now)
+            territories = list(territories) if territories else list(set(self.ready) | set(self.waiting))
+            
+            # Merge the territory heaps through a small heap of their current heads
+            heads = []
+            for territory in territories:
+                self._promote(territory, now)
+                head = self._ready_head(territory)
+                if head:
+                    heapq.heappush(heads, (head, territory))
+            
+            claimed = []
+            expires_at = now + self.lease_seconds
+            while heads and len(claimed) < count:
+                (_, _, lead_id, _), territory = heapq.heappop(heads)
+                heapq.heappop(self.ready[territory])
+                lead = self.leads[lead_id]
+                self.ready_count[territory] -= 1
+                lead['state'] = 'leased'
+                lead['version'] += 1
+                self.leases[lead_id] = (rep, expires_at)
+                heapq.heappush(self.lease_heap, (expires_at, lead_id))
+                claimed.append(lead_id)
+                
+                head = self._ready_head(territory)
+                if head:
+                    heapq.heappush(heads, (head, territory))
+            
+            if claimed:
+                self.flush()
+            return claimed
+    
+    def release(self, lead_id, rep, call_status=None, callback_at=None, now=None):
+        """Return a leased lead after a call
+        
+        Final outcomes retire the lead, callbacks requeue it for callback_at
+        (epoch seconds) ahead of everything else, and any other outcome
+        requeues it after the retry spacing for one more attempt. Outcomes
+        are queued for unique_phones and written every flush_every releases.
+        """
+        now = time.time() if now is None else now
+        lead_id = str(lead_id)
+        with self._lock:
+            lease = self.leases.get(lead_id)
+            if not lease or lease[0] != rep:
+                return False
+            del self.leases[lead_id]
+            
+            self.callbacks.pop(lead_id, None)
+            status = normalize_status(call_status) if call_status else None
+            if status in CALLBACK_STATUSES and callback_at:
+                self.callbacks[lead_id] = float(callback_at)
+            
+            lead = self.leads.get(lead_id)
+            if lead:
+                lead['version'] += 1
+                if status:
+                    lead['attempts'] += 1
+                    lead['eligible_at'] = next_eligible_time(status, lead['attempts'], now, self.callbacks.get(lead_id))
+                    if lead.get('phone'):
+                        queued = self.outcomes.get(lead_id)
+                        self.outcomes[lead_id] = {
+                            'phone': str(lead['phone']),
+                            'call_status': status,
+                            'attempts': (queued['attempts'] if queued else 0) + 1,
+                            'call_date': datetime.fromtimestamp(now).isoformat(timespec='seconds')
+                        }
+                self._enqueue(lead_id, now)
+            
+            if len(self.outcomes) >= self.flush_every:
+                self.flush_outcomes()
+            self.flush()
+            return True
+    
+    def renew(self, lead_id, rep, now=None):
+        """Extend a rep's lease on a lead"""
+        now = time.time() if now is None else now
+        with self._lock:
+            lease = self.leases.get(str(lead_id))
+            if not lease or lease[0] != rep:
+                return False
+            expires_at = now + self.lease_seconds
+            self.leases[str(lead_id)] = (rep, expires_at)
+            heapq.heappush(self.lease_heap, (expires_at, str(lead_id)))
+            self.flush()
+            return True
+    
+    def expire(self, now=None):
+        """Requeue leads whose lease ran out; returns their IDs (also kept for drain_expired)"""
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            while self.lease_heap and self.lease_heap[0][0] <= now:
+                expires_at, lead_id = heapq.heappop(self.lease_heap)
+                lease = self.leases.get(lead_id)
+                if not lease or lease[1] != expires_at:
+                    continue  # released or renewed since
+                del self.leases[lead_id]
+                expired.append(lead_id)
+                if lead_id in self.leads:
+                    self.leads[lead_id]['version'] += 1
+                    self._enqueue(lead_id, now)
+            if expired:
+                self.expired.extend(expired)
+                self.flush()
+        return expired
+    
+    def drain_expired(self):
+        """Lead IDs whose lease ran out since the last call, however expiry was triggered"""
+        with self._lock:
+            expired, self.expired = self.expired, []
+            return expired
+    
+    def available(self, territories=None, now=None):
+        """Number of leads callable right now in the given territories"""
+        now = time.time() if now is None else now
+        with self._lock:
+            territories = list(territories) if territories else list(set(self.ready) | set(self.waiting))
+            for territory in territories:
+                self._promote(territory, now)
+            return sum(self.ready_count[territory] for territory in territories)
+    
+    def leases_for(self, rep):
+        """Lead IDs currently leased to rep"""
+        with self._lock:
+            return [lead_id for lead_id, (owner, _) in self.leases.items() if owner == rep]
+    
+    def flush_outcomes(self):
+        """Write queued outcomes to unique_phones with batched UPDATE ... FROM (VALUES ...); True if all were written"""
+        with self._lock:
+            if not self.d1 or not self.outcomes:
+                return not self.outcomes
+            items = list(self.outcomes.items())
+            for i in range(0, len(items), OUTCOME_BATCH):
+                batch = items[i:i + OUTCOME_BATCH]
+                values = ", ".join("(?, ?, ?, ?)" for _ in batch)
+                params = [value for _, outcome in batch
+                          for value in (outcome['phone'], outcome['call_status'], outcome['attempts'], outcome['call_date'])]
+                result = self.d1.execute_query(f"""
+                WITH outcome (phone_number, call_status, attempts, call_date) AS (VALUES {values})
+                UPDATE unique_phones
+                SET call_status = outcome.call_status,
+                    call_attempts = call_attempts + outcome.attempts,
+                    last_call_date = outcome.call_date,
+                    updated_at = datetime('now')
+                FROM outcome
+                WHERE unique_phones.phone_number = outcome.phone_number
+                """, params)
+                if not result or not result.get('success'):
+                    print(f"❌ Failed to write {len(items) - i} call outcomes to unique_phones (kept queued)")
+                    self.flush()
+                    return False
+                for lead_id, _ in batch:
+                    del self.outcomes[lead_id]
+            self.flush()
+            return True
+    
+    def flush(self):
+        """Write leases, callbacks and queued outcomes to the state file atomically"""
+        with self._lock:
+            data = {
+                "version": STATE_VERSION,
+                "updated": datetime.now().isoformat(),
+                "leases": {lead_id: list(lease) for lead_id, lease in self.leases.items()},
+                "callbacks": self.callbacks,
+                "outcomes": self.outcomes
+            }
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            temp_file = f"{self.state_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp_file, self.state_file)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Lead Scoring Engine
+One configurable scorer for every priority / business-potential score in the
+dashboards, the contact analyzer and the D1 dialer table
+
+A rule set is a list of rules; each rule adds points per row and is computed
+for the whole DataFrame at once with column operations. Keyword rules compile
+their brand/keyword lists into a single regex, so a company name is scanned
+once per rule instead of once per keyword.
+
+Rule types:
+    tiers          {'column', 'tiers': [[min, points], ...], 'default'}  first tier reached
+    any_keyword    {'column', 'keywords': [...], 'points'}               any keyword in the text
+    keyword_points {'column', 'keywords': {keyword: points}}             each distinct keyword found
+    min_length     {'column', 'length', 'points'}                        text at least this long
+    present        {'column', 'points'}                                  non-empty value
+    flag           {'column', 'points'}                                  truthy value
+    per_unit       {'column', 'points', 'cap'}                           points * min(value, cap)
+
+Rule sets can be overridden by name in lead_scoring_rules.json. Columns a
+frame doesn't have score zero.
+
+Usage:
+    python lead_scoring.py rescore [rule_set]   # Rescore unique_phones in D1 (default: dialer)
+    python lead_scoring.py rules                # Print the active rule sets
+"""
+
+import json
+import os
+import re
+import sys
+import numpy as np
+import pandas as pd
+
+SCORING_RULES_FILE = os.getenv('LEAD_SCORING_RULES', 'lead_scoring_rules.json')
+
+LISTING_TIERS = [[50, 100], [25, 80], [15, 60], [8, 40], [3, 20]]
+
+MAJOR_BRANDS = ['wheeler machinery', 'holt cat', 'caterpillar', 'cat used', 'cat financial',
+                'john deere', 'komatsu', 'volvo', 'case', 'new holland', 'kubota',
+                'empire southwest', 'ring power', 'altorfer', 'fabick cat', 'thompson tractor',
+                'boyd cat', 'milton cat', 'warren cat', 'peterson cat']
+DASHBOARD_BRANDS = ['wheeler machinery', 'holt cat', 'caterpillar', 'john deere', 'komatsu',
+                    'empire southwest', 'ring power', 'altorfer', 'fabick cat']
+
+DEFAULT_RULE_SETS = {
+    # ContactAnalyzer (master log analysis)
+    'contact': [
+        {'type': 'tiers', 'column': 'total_listings', 'tiers': LISTING_TIERS},
+        {'type': 'any_keyword', 'column': 'seller_company', 'keywords': MAJOR_BRANDS, 'points': 25},
+        {'type': 'any_keyword', 'column': 'seller_company', 'points': 15,
+         'keywords': ['equipment', 'machinery', 'tractor', 'construction', 'rental', 'rentals']},
+        {'type': 'min_length', 'column': 'primary_phone', 'length': 10, 'points': 10},
+        {'type': 'present', 'column': 'email', 'points': 10},
+        {'type': 'any_keyword', 'column': 'primary_location', 'keywords': [','], 'points': 5},
+        {'type': 'flag', 'column': 'is_multi_site', 'points': 20},
+    ],
+    # DashboardAnalyzer (dashboards built on the master log / unique phones)
+    'dashboard': [
+        {'type': 'tiers', 'column': 'total_listings', 'tiers': LISTING_TIERS},
+        {'type': 'any_keyword', 'column': 'seller_company', 'keywords': DASHBOARD_BRANDS, 'points': 25},
+        {'type': 'any_keyword', 'column': 'seller_company', 'keywords': ['equipment', 'machinery', 'rental'], 'points': 15},
+        {'type': 'min_length', 'column': 'primary_phone', 'length': 10, 'points': 10},
+        {'type': 'present', 'column': 'email', 'points': 10},
+        {'type': 'flag', 'column': 'has_equipment_data', 'points': 15},
+        {'type': 'flag', 'column': 'has_pricing_data', 'points': 10},
+    ],
+    # Heavy Haulers business potential (equipment transport prospects)
+    'business_potential': [
+        {'type': 'per_unit', 'column': 'num_equipment_types', 'points': 20},
+        {'type': 'per_unit', 'column': 'num_sources', 'points': 10, 'cap': 5},
+        {'type': 'present', 'column': 'phone', 'points': 25},
+        {'type': 'present', 'column': 'website', 'points': 15},
+        {'type': 'keyword_points', 'column': 'equipment_types',
+         'keywords': {'excavator': 15, 'crane': 20, 'dozer': 10}},
+    ],
+    # unique_phones.priority_score (dialer call order)
+    'dialer': [
+        {'type': 'tiers', 'column': 'total_listings', 'tiers': [[10, 90], [5, 75], [3, 60]], 'default': 50},
+    ],
+}
+
+PRIORITY_LEVELS = [(120, 'Premium'), (80, 'High'), (50, 'Medium'), (25, 'Low')]
+
+def keyword_pattern(keywords):
+    """Single case-insensitive regex matching any keyword (longest first)"""
+    escaped = sorted((re.escape(keyword.lower()) for keyword in keywords), key=len, reverse=True)
+    return re.compile('|'.join(escaped), re.IGNORECASE)
+
+def _text(df, column):
+    return df[column].fillna('').astype(str)
+
+def _number(df, column):
+    return pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy()
+
+class LeadScorer:
+    """Vectorized scorer for one rule set"""
+    
+    def __init__(self, rules):
+        self.rules = rules
+        self.patterns = {
+            index: keyword_pattern(rule['keywords'])
+            for index, rule in enumerate(rules) if rule['type'] in ('any_keyword', 'keyword_points')
+        }
+    
+    def _points(self, df, index, rule):
+        kind, column = rule['type'], rule['column']
+        if column not in df.columns:
+            return 0
+        
+        if kind == 'tiers':
+            values = _number(df, column)
+            tiers = rule['tiers']
+            return np.select([values >= minimum for minimum, _ in tiers], [points for _, points in tiers], rule.get('default', 0))
+        if kind == 'any_keyword':
+            return _text(df, column).str.contains(self.patterns[index]).to_numpy() * rule['points']
+        if kind == 'keyword_points':
+            # One findall pass; each distinct keyword found counts once per row
+            keyword_points = {keyword.lower(): points for keyword, points in rule['keywords'].items()}
+            found = _text(df, column).str.lower().str.findall(self.patterns[index]).explode().dropna()
+            found = found.reset_index().drop_duplicates()
+            scores = found.iloc[:, 1].map(keyword_points).groupby(found.iloc[:, 0]).sum()
+            return scores.reindex(range(len(df)), fill_value=0).to_numpy()
+        if kind == 'min_length':
+            return (_text(df, column).str.len() >= rule['length']).to_numpy() * rule['points']
+        if kind == 'present':
+            return (_text(df, column).str.strip() != '').to_numpy() * rule['points']
+        if kind == 'flag':
+            return df[column].fillna(False).astype(bool).to_numpy() * rule['points']
+        if kind == 'per_unit':
+            values = _number(df, column)
+            if rule.get('cap') is not None:
+                values = np.minimum(values, rule['cap'])
+            return values * rule['points']
+        raise ValueError(f"Unknown scoring rule type: {kind}")
+    
+    def score(self, df):
+        """Score every row of a DataFrame; returns an integer Series aligned with df"""
+        # Positional indexing keeps the keyword_points groupby aligned whatever df's index is
+        frame = df.reset_index(drop=True)
+        total = np.zeros(len(frame), dtype=np.int64)
+        for index, rule in enumerate(self.rules):
+            total += np.asarray(self._points(frame, index, rule), dtype=np.int64)
+        return pd.Series(total, index=df.index)
+    
+    def case_sql(self, column_sql=None):
+        """SQL CASE for a tiers-only rule set, so D1 can score rows set-based"""
+        if len(self.rules) != 1 or self.rules[0]['type'] != 'tiers':
+            raise ValueError("Only a single tiers rule can be expressed in SQL")
+        rule = self.rules[0]
+        column_sql = column_sql or rule['column']
+        branches = " ".join(f"WHEN {column_sql} >= {minimum} THEN {points}" for minimum, points in rule['tiers'])
+        return f"CASE {branches} ELSE {rule.get('default', 0)} END"
+
+def load_rule_sets(rules_file=None):
+    """Default rule sets with any overrides from the rules file"""
+    rule_sets = dict(DEFAULT_RULE_SETS)
+    rules_file = rules_file or SCORING_RULES_FILE
+    if os.path.exists(rules_file):
+        with open(rules_file, 'r') as f:
+            rule_sets.update(json.load(f))
+    return rule_sets
+
+_scorers = {}
+
+def get_scorer(name):
+    """Compiled scorer for a named rule set (cached per process)"""
+    if name not in _scorers:
+        rule_sets = load_rule_sets()
+        if name not in rule_sets:
+            raise KeyError(f"Unknown scoring rule set: {name}")
+        _scorers[name] = LeadScorer(rule_sets[name])
+    return _scorers[name]
+
+def score_frame(df, name):
+    """Scores for a DataFrame under a named rule set"""
+    return get_scorer(name).score(df)
+
+def priority_levels(scores, levels=PRIORITY_LEVELS, default='Minimal'):
+    """Map scores to level names (first threshold reached)"""
+    values = np.asarray(scores)
+    return pd.Series(
+        np.select([values >= threshold for threshold, _ in levels], [name for _, name in levels], default),
+        index=getattr(scores, 'index', None)
+    )
+
+def push_scores(d1, keys, scores, table='unique_phones', key_column='phone_number', score_column='priority_score'):
+    """Write scores back to D1 in bulk; only rows whose score changed are updated
+    
+    Each request is one UPDATE ... FROM over an inline VALUES list; updated_at
+    is stamped too when the table has it, so change tracking sees the new
+    scores. Returns the number of rows updated.
+    """
+    from d1_snapshot import MAX_STATEMENT_BYTES, sql_literal
+    
+    columns = d1.execute_query(f"PRAGMA table_info({table})")
+    stamp = ""
+    if columns and columns.get('success'):
+        if 'updated_at' in [c['name'] for c in columns['result'][0]['results']]:
+            stamp = ", updated_at = datetime('now')"
+    
+    prefix = "WITH s(k, score) AS (VALUES "
+    suffix = (f") UPDATE {table} SET {score_column} = s.score{stamp} FROM s "
+              f"WHERE {table}.{key_column} = s.k AND {table}.{score_column} IS NOT s.score")
+    
+    def run(values):
+        result = d1.execute_query(prefix + ", ".join(values) + suffix)
+        if not result or not result.get('success'):
+            raise RuntimeError(f"Score update failed: {(result or {}).get('errors', 'Unknown error')}")
+        return result['result'][0].get('meta', {}).get('changes', 0)
+    
+    updated, values, size = 0, [], len(prefix) + len(suffix)
+    for key, score in zip(keys, scores):
+        value = f"({sql_literal(key)}, {int(score)})"
+        value_bytes = len(value.encode('utf-8'))
+        if values and size + value_bytes + 2 > MAX_STATEMENT_BYTES:
+            updated += run(values)
+            values, size = [], len(prefix) + len(suffix)
+        values.append(value)
+        size += value_bytes + 2
+    if values:
+        updated += run(values)
+    return updated
+
+def rescore_unique_phones(d1, name='dialer', page_size=5000):
+    """Recompute unique_phones.priority_score with a rule set and push the changes"""
+    from d1_replica import d1_rows
+    
+    frames, last_id = [], 0
+    while True:
+        rows = d1_rows(d1, "SELECT * FROM unique_phones WHERE id > ? ORDER BY id LIMIT ?", [last_id, page_size])
+        if rows:
+            frames.append(pd.DataFrame(rows))
+            last_id = rows[-1]['id']
+        if len(rows) < page_size:
+            break
+    if not frames:
+        print("❌ unique_phones is empty")
+        return 0
+    
+    df = pd.concat(frames, ignore_index=True)
+    # Dialer rows carry the company as company_name
+    df['seller_company'] = df.get('company_name')
+    df['primary_phone'] = df['phone_number']
+    scores = score_frame(df, name)
+    
+    print(f"🎯 Scored {len(df):,} numbers with '{name}' rules")
+    updated = push_scores(d1, df['phone_number'], scores)
+    print(f"   ✅ {updated:,} priority scores changed")
+    return updated
+
+def main():
+    """Main function"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    
+    command = sys.argv[1].lower()
+    
+    if command == 'rescore':
+        from d1_replica import get_d1_connection
+        d1 = get_d1_connection()
+        if not d1:
+            sys.exit(1)
+        try:
+            rescore_unique_phones(d1, sys.argv[2] if len(sys.argv) > 2 else 'dialer')
+        except (KeyError, RuntimeError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    elif command == 'rules':
+        print(json.dumps(load_rule_sets(), indent=2))
+    else:
+        print(f"❌ Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Master Log Transform Pipeline
+Runs any number of per-contact fixes over master_contact_database.json in a
+single pass with one atomic write, instead of one full load/rewrite per fix
+
+Usage:
+    python master_log_transforms.py list
+    python master_log_transforms.py clean_unicode fix_categories_v2 [--workers 4]
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+# name -> {'func': transform(contact_id, contact) -> bool, 'metadata_flag': str or None,
+#          'document_func': transform(data) or None}
+TRANSFORMS = {}
+
+BUILTIN_TRANSFORM_MODULES = ['clean_unicode', 'fix_categories', 'fix_categories_v2', 'restructure_contacts']
+
+def register_transform(name, metadata_flag=None, document_func=None):
+    """Register a per-contact transform
+    
+    The transform mutates the contact dict in place and returns True if it
+    changed anything. metadata_flag, if given, is set on the master metadata
+    once the transform has run. document_func, if given, is called once with
+    the whole master log to fix everything outside the contacts (metadata).
+    """
+    def decorator(func):
+        TRANSFORMS[name] = {'func': func, 'metadata_flag': metadata_flag, 'document_func': document_func}
+        return func
+    return decorator
+
+def load_builtin_transforms():
+    """Import the maintenance scripts so their transforms get registered"""
+    for module_name in BUILTIN_TRANSFORM_MODULES:
+        __import__(module_name)
+    return TRANSFORMS
+
+def _apply_chunk(funcs, items):
+    """Apply every transform to each contact in a chunk (runs in worker processes)"""
+    counts = [0] * len(funcs)
+    for contact_id, contact in items:
+        for i, func in enumerate(funcs):
+            if func(contact_id, contact):
+                counts[i] += 1
+    return items, counts
+
+def run_transforms(names, master_file='master_contact_database.json', output_file=None,
+                   workers=1, chunk_size=5000):
+    """Run the named transforms over every contact in one pass and save atomically"""
+    if output_file is None:
+        output_file = master_file
+    
+    load_builtin_transforms()
+    unknown = [name for name in names if name not in TRANSFORMS]
+    if unknown:
+        print(f"❌ Unknown transforms: {', '.join(unknown)}")
+        print(f"💡 Available: {', '.join(sorted(TRANSFORMS))}")
+        return None
+    
+    funcs = [TRANSFORMS[name]['func'] for name in names]
+    
+    print(f"📥 Loading {master_file}...")
+    with open(master_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    contacts = data['contacts']
+    print(f"🔧 Applying {', '.join(names)} to {len(contacts):,} contacts...")
+    
+    counts = [0] * len(funcs)
+    if workers > 1 and len(contacts) > chunk_size:
+        items = list(contacts.items())
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        transformed = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_items, chunk_counts in executor.map(partial(_apply_chunk, funcs), chunks):
+                transformed.update(chunk_items)
+                counts = [a + b for a, b in zip(counts, chunk_counts)]
+        data['contacts'] = transformed
+    else:
+        _, counts = _apply_chunk(funcs, contacts.items())
+    
+    for name in names:
+        document_func = TRANSFORMS[name]['document_func']
+        if document_func:
+            document_func(data)
+    
+    # Update metadata
+    data['metadata']['last_updated'] = datetime.now().isoformat()
+    for name in names:
+        flag = TRANSFORMS[name]['metadata_flag']
+        if flag:
+            data['metadata'][flag] = True
+    
+    # Single atomic write - a crash mid-save never leaves a truncated master file
+    temp_file = f"{output_file}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(temp_file, output_file)
+    
+    results = dict(zip(names, counts))
+    print(f"✅ Saved {output_file}")
+    for name, count in results.items():
+        print(f"   • {name}: {count:,} contacts changed")
+    
+    return results
+
+def main():
+    """Main function"""
+    args = sys.argv[1:]
+    
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+    
+    if args[0] == 'list':
+        for name in sorted(load_builtin_transforms()):
+            print(f"   • {name}")
+        return
+    
+    workers = 1
+    if '--workers' in args:
+        position = args.index('--workers')
+        workers = int(args[position + 1])
+        del args[position:position + 2]
+    
+    if run_transforms(args, workers=workers) is None:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    # Run through the importable module so transforms registered by the
+    # maintenance scripts land in the same TRANSFORMS registry
+    from master_log_transforms import main
+    main()
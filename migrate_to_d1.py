@@ -57,13 +57,28 @@ class D1DatabaseManager:
                 if city_match:
                     city = city_match.group(1).strip()
             
-            # Insert main contact
+            # Insert main contact (an upsert, not INSERT OR REPLACE: the REPLACE
+            # delete skips the contacts delete trigger and would inflate the dialer stats)
             contact_sql = """
-                INSERT OR REPLACE INTO contacts 
+                INSERT INTO contacts 
                 (id, seller_company, primary_phone, primary_location, email, website,
                  total_listings, priority_score, priority_level, first_contact_date, 
                  last_updated, notes, city, state) 
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    seller_company = excluded.seller_company,
+                    primary_phone = excluded.primary_phone,
+                    primary_location = excluded.primary_location,
+                    email = excluded.email,
+                    website = excluded.website,
+                    total_listings = excluded.total_listings,
+                    priority_score = excluded.priority_score,
+                    priority_level = excluded.priority_level,
+                    first_contact_date = excluded.first_contact_date,
+                    last_updated = excluded.last_updated,
+                    notes = excluded.notes,
+                    city = excluded.city,
+                    state = excluded.state
             """
             
             contact_params = [
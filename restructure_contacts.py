@@ -3,6 +3,8 @@ import hashlib
 from datetime import datetime
 from pathlib import Path
 import re
+from master_log_transforms import register_transform
+from split_master_database import add_to_category_views
 
 def normalize_phone(phone):
     """Normalize phone number for comparison"""
@@ -17,6 +19,16 @@ def normalize_phone(phone):
         return f"({digits[1:4]}) {digits[4:7]}-{digits[7:]}"
     return phone  # Return original if can't normalize
 
+@register_transform('normalize_phones')
+def normalize_contact_phone(contact_id, contact):
+    """Per-contact transform: reformat primary_phone as (XXX) XXX-XXXX"""
+    phone = contact.get('primary_phone', '')
+    normalized = normalize_phone(phone)
+    if normalized != phone:
+        contact['primary_phone'] = normalized
+        return True
+    return False
+
 def generate_contact_id(phone, seller_company):
     """Generate unique ID for contact based on phone and company"""
     key = f"{normalize_phone(phone)}_{seller_company}".lower()
@@ -154,6 +166,8 @@ def add_new_contacts_to_master_log(new_contacts_file, master_log_file, site_name
     
     new_unique = 0
     duplicates_updated = 0
+    gained_category = []  # contact IDs that now appear in this category
+    updated_ids = []      # existing contacts whose fields changed
     
     for contact in new_contacts:
         phone = contact.get('phone', '')
@@ -184,8 +198,10 @@ def add_new_contacts_to_master_log(new_contacts_file, master_log_file, site_name
                 })
                 existing['total_listings'] += 1
                 duplicates_updated += 1
+                gained_category.append(contact_id)
             
             existing['last_updated'] = datetime.now().isoformat()
+            updated_ids.append(contact_id)
             
         else:
             # Add new contact
@@ -216,18 +232,25 @@ def add_new_contacts_to_master_log(new_contacts_file, master_log_file, site_name
                 "notes": ""
             }
             new_unique += 1
+            gained_category.append(contact_id)
     
-    # Update metadata
+    # Update metadata (each new contact or new source adds exactly one source entry)
     master_log['metadata']['total_unique_contacts'] = len(master_log['contacts'])
-    master_log['metadata']['total_sources'] = sum(
-        len(contact['sources']) for contact in master_log['contacts'].values()
-    )
+    if 'total_sources' in master_log['metadata']:
+        master_log['metadata']['total_sources'] += new_unique + duplicates_updated
+    else:
+        master_log['metadata']['total_sources'] = sum(
+            len(contact['sources']) for contact in master_log['contacts'].values()
+        )
     master_log['metadata']['last_updated'] = datetime.now().isoformat()
     
     # Save updated master log
     with open(master_log_file, 'w', encoding='utf-8') as f:
         json.dump(master_log, f, indent=2, ensure_ascii=False)
     
+    # Only the views for this category change - no full re-split needed
+    add_to_category_views({category: gained_category}, master_log, changed_ids=updated_ids)
+    
     print(f"✅ Master log updated!")
     print(f"➕ New unique contacts: {new_unique}")
     print(f"🔄 Existing contacts updated: {duplicates_updated}")
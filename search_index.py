@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Contact Search Index
+Inverted index over company names, locations, categories and equipment
+makes/models, so the dashboard search boxes answer from postings instead of
+running str.contains over every row on each keystroke
+
+Text is split into lowercase tokens; each token has a posting of the
+documents (contacts) containing it, weighted by the best field it came from.
+The vocabulary itself is indexed by trigram, so a query term is resolved to
+matching tokens without scanning the whole vocabulary:
+
+    exact      token == term                      1.0
+    prefix     token starts with term             0.8
+    substring  term inside token (3+ chars)       0.6
+    fuzzy      trigram similarity >= 0.5 (4+ chars, only when nothing else matched)
+
+Every query term must match (AND); a document's score is the sum over terms
+of its best token match times that token's field weight, accumulated in NumPy
+arrays over dense document slots. Documents can be added, updated and removed
+one at a time; a removed document's slot is left empty.
+"""
+
+import bisect
+import re
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['&][a-z0-9]+)*")
+
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+SUBSTRING_SCORE = 0.6
+FUZZY_SCORE = 0.5
+FUZZY_THRESHOLD = 0.5
+
+def tokenize(text):
+    """Lowercase word tokens of a value (lists are joined)"""
+    if isinstance(text, (list, tuple, set)):
+        text = ' '.join(map(str, text))
+    if text is None or text != text:  # None / NaN
+        return []
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+def trigrams(token):
+    """Trigrams of a token (the token itself when shorter than three characters)"""
+    if len(token) < 3:
+        return {token}
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+class SearchIndex:
+    """Token/trigram inverted index keyed by document id"""
+    
+    def __init__(self, fields):
+        self.fields = fields                     # field -> weight
+        self.postings = defaultdict(dict)        # token -> {slot: weight}
+        self.token_trigrams = defaultdict(set)   # trigram -> tokens
+        self.documents = {}                      # doc_id -> (slot, {token: weight})
+        self.ids = []                            # slot -> doc_id (None once removed)
+        self.labels = []                         # slot -> row label in the indexed frame
+        self._arrays = {}                        # token -> (slots, weights) as NumPy arrays
+        self._id_array = None
+        self._label_array = None
+        self._sorted_tokens = None
+    
+    @classmethod
+    def from_frame(cls, df, fields, id_column=None):
+        """Index the `fields` ({column: weight}) of every row; ids are id_column values or index labels
+        
+        Frames later passed to filter_frame / rank_frame must be subsets of
+        this frame that keep its index labels.
+        """
+        index = cls(fields)
+        ids = df[id_column] if id_column else df.index
+        columns = [column for column in fields if column in df.columns]
+        for doc_id, label, values in zip(ids, df.index, zip(*(df[column] for column in columns))):
+            index.add(doc_id, dict(zip(columns, values)), label)
+        for token in index.postings:
+            index._posting(token)
+        index._prefixed('')
+        return index
+    
+    def __len__(self):
+        return len(self.documents)
+    
+    def add(self, doc_id, values, label=None):
+        """Index a document from {field: text}; replaces any earlier version of it"""
+        if doc_id in self.documents:
+            self.remove(doc_id)
+        slot = len(self.ids)
+        self.ids.append(doc_id)
+        self.labels.append(doc_id if label is None else label)
+        self._id_array = self._label_array = None
+        weights = {}
+        for field, value in values.items():
+            weight = self.fields.get(field, 1)
+            for token in tokenize(value):
+                weights[token] = max(weights.get(token, 0), weight)
+        for token, weight in weights.items():
+            if token not in self.postings:
+                for trigram in trigrams(token):
+                    self.token_trigrams[trigram].add(token)
+                self._sorted_tokens = None
+            self.postings[token][slot] = weight
+            self._arrays.pop(token, None)
+        self.documents[doc_id] = (slot, weights)
+    
+    update = add
+    
+    def remove(self, doc_id):
+        """Drop a document (no-op if it isn't indexed)"""
+        if doc_id not in self.documents:
+            return
+        slot, weights = self.documents.pop(doc_id)
+        self.ids[slot] = self.labels[slot] = None
+        self._id_array = self._label_array = None
+        for token in weights:
+            posting = self.postings[token]
+            posting.pop(slot, None)
+            self._arrays.pop(token, None)
+            if not posting:
+                del self.postings[token]
+                for trigram in trigrams(token):
+                    self.token_trigrams[trigram].discard(token)
+                    if not self.token_trigrams[trigram]:
+                        del self.token_trigrams[trigram]
+                self._sorted_tokens = None
+    
+    def _posting(self, token):
+        """(slots, weights) arrays of a token, built on first use after a change"""
+        if token not in self._arrays:
+            posting = self.postings[token]
+            self._arrays[token] = (np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                                   np.fromiter(posting.values(), dtype=np.float64, count=len(posting)))
+        return self._arrays[token]
+    
+    def _prefixed(self, term):
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.postings)
+        start = bisect.bisect_left(self._sorted_tokens, term)
+        end = bisect.bisect_left(self._sorted_tokens, term + '\uffff')
+        return self._sorted_tokens[start:end]
+    
+    def _term_tokens(self, term):
+        """{token: match score} for one query term"""
+        matches = {token: PREFIX_SCORE for token in self._prefixed(term)}
+        if term in self.postings:
+            matches[term] = EXACT_SCORE
+        if len(term) < 3:
+            return matches
+        
+        # Substring: tokens holding every trigram of the term, verified
+        term_trigrams = trigrams(term)
+        candidates = set.intersection(*(self.token_trigrams.get(trigram, set()) for trigram in term_trigrams))
+        for token in candidates:
+            if token not in matches and term in token:
+                matches[token] = SUBSTRING_SCORE
+        if matches or len(term) < 4:
+            return matches
+        
+        # Fuzzy: tokens sharing enough trigrams with the term (typos, plurals)
+        shared = defaultdict(int)
+        for trigram in term_trigrams:
+            for token in self.token_trigrams.get(trigram, ()):
+                shared[token] += 1
+        for token, count in shared.items():
+            similarity = count / (len(term_trigrams) + len(trigrams(token)) - count)
+            if similarity >= FUZZY_THRESHOLD:
+                matches[token] = FUZZY_SCORE * similarity
+        return matches
+    
+    def _slot_scores(self, query):
+        """Score per slot (0 = no match) for a query, or None if it has no terms"""
+        terms = tokenize(query)
+        if not terms:
+            return None
+        
+        total = np.zeros(len(self.ids))
+        matched = np.ones(len(self.ids), dtype=bool)
+        for term in dict.fromkeys(terms):
+            term_scores = np.zeros(len(self.ids))
+            for token, match in self._term_tokens(term).items():
+                slots, weights = self._posting(token)
+                term_scores[slots] = np.maximum(term_scores[slots], match * weights)
+            matched &= term_scores > 0
+            total += term_scores
+        return np.where(matched, total, 0)
+    
+    def _matched_slots(self, query):
+        """Slots of the matches, unranked"""
+        scores = self._slot_scores(query)
+        return np.array([], dtype=np.int64) if scores is None else np.flatnonzero(scores)
+    
+    def _ranked_slots(self, query, limit=None):
+        """(slots, scores) of the matches, best first"""
+        scores = self._slot_scores(query)
+        if scores is None:
+            return np.array([], dtype=np.int64), scores
+        slots = np.flatnonzero(scores)
+        if limit and len(slots) > limit:
+            slots = slots[np.argpartition(-scores[slots], limit - 1)[:limit]]
+        return slots[np.argsort(-scores[slots], kind='stable')], scores
+    
+    def _labels_of(self, slots):
+        if self._label_array is None:
+            self._label_array = pd.Index(self.labels)
+        return self._label_array[slots]
+    
+    def search(self, query, limit=None):
+        """[(doc_id, score)] matching every term of the query, best first (top `limit` only if given)"""
+        slots, scores = self._ranked_slots(query, limit)
+        return [(self.ids[slot], float(scores[slot])) for slot in slots]
+    
+    def matches(self, query):
+        """Array of the ids matching the query"""
+        if self._id_array is None:
+            self._id_array = np.asarray(self.ids, dtype=object)
+        return self._id_array[self._matched_slots(query)]
+    
+    def rank_frame(self, df, query):
+        """Rows of df matching the query, best match first"""
+        slots, _ = self._ranked_slots(query)
+        positions = df.index.get_indexer(self._labels_of(slots))
+        return df.iloc[positions[positions >= 0]]
+    
+    def picker_page(self, df, query, id_column, order_column, page=0, page_size=50):
+        """(one page of candidates indexed by id, total candidates) for a search-driven picker
+        
+        With a query the candidates are df's matches in rank order; without
+        one they are all of df by order_column, highest first. Only the page
+        is materialized, so a picker never ships more than page_size options.
+        """
+        if query and query.strip():
+            candidates = self.rank_frame(df, query)
+            rows = candidates.iloc[page * page_size:(page + 1) * page_size]
+        else:
+            candidates = df
+            rows = df.nlargest((page + 1) * page_size, order_column).iloc[page * page_size:]
+        return rows.set_index(id_column, drop=False), len(candidates)
+    
+    def filter_frame(self, df, query):
+        """Rows of df matching the query, in df's order"""
+        return df[df.index.isin(self._labels_of(self._matched_slots(query)))]
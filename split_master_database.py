@@ -1,95 +1,297 @@
 #!/usr/bin/env python3
 """
 Split Master Database by Category
-Creates separate JSON files for each equipment category to manage file sizes
+Creates compact per-category views (contact ID lists) over the shared master database,
+plus a columnar copy of the contact fields for fast, column-projected loading.
+The column store is split into hash partitions of contact IDs, so an ingest
+rewrites only the partitions holding the contacts it changed
+
+Usage:
+    python split_master_database.py            # Rebuild all category views
+    python split_master_database.py update     # Only apply contacts changed since the last split
 """
 
 import json
 import os
+import zlib
 from datetime import datetime
 from collections import defaultdict
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 - parquet engine for the columnar contact store
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+MASTER_FILE = 'master_contact_database.json'
+INDEX_FILE = 'master_database_index.json'
+VIEWS_DIR = 'category_databases'
+COLUMN_STORE_DIR = f'{VIEWS_DIR}/contact_columns'
+COLUMN_PARTITIONS = 16
+
+# Flat contact fields kept in the columnar store
+CONTACT_COLUMNS = [
+    'contact_id', 'seller_company', 'primary_phone', 'primary_location', 'email',
+    'total_listings', 'first_contact_date', 'last_updated', 'contact_priority',
+    'categories', 'num_sources'
+]
+
+def category_file_stem(category):
+    """File-system friendly name for a category"""
+    return category.replace('/', '_').replace(' ', '_')
+
+def category_view_file(category, views_dir=VIEWS_DIR):
+    """Path of the ID-list view for a category"""
+    return f"{views_dir}/{category_file_stem(category)}_view.json"
+
+def contact_categories(contact):
+    """All normalized categories a contact has been seen in"""
+    categories = set()
+    for source in contact.get('sources', []):
+        category = source.get('category', '').lower().strip()
+        if category:
+            categories.add(category)
+    return categories
+
+def load_index(index_file=INDEX_FILE):
+    """Load the category index, or None if the database hasn't been split yet"""
+    try:
+        with open(index_file, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def load_view_ids(view_file):
+    """Load the contact IDs stored in a category view"""
+    try:
+        with open(view_file, 'r') as f:
+            return json.load(f).get('contact_ids', [])
+    except FileNotFoundError:
+        return []
+
+def write_view(category, contact_ids, master_last_updated, views_dir=VIEWS_DIR, view_file=None):
+    """Write a single category view file (to view_file when given)"""
+    view_file = view_file or category_view_file(category, views_dir)
+    view_data = {
+        "metadata": {
+            "category": category,
+            "created_date": datetime.now().isoformat(),
+            "total_contacts": len(contact_ids),
+            "parent_database": MASTER_FILE,
+            "last_updated": master_last_updated
+        },
+        "contact_ids": contact_ids
+    }
+    with open(view_file, 'w') as f:
+        json.dump(view_data, f)
+    return view_file
+
+def column_partition(contact_id):
+    """Column store partition a contact's row lives in (stable across runs)"""
+    return zlib.crc32(str(contact_id).encode('utf-8')) % COLUMN_PARTITIONS
+
+def column_partition_file(partition, column_dir=COLUMN_STORE_DIR):
+    return f"{column_dir}/part-{partition:02d}.parquet"
+
+def contact_column_frame(contacts):
+    """Flat, typed column-store rows for a {contact_id: contact} dict"""
+    df = pd.DataFrame.from_dict(contacts, orient='index')
+    df = df.reindex(columns=[c for c in CONTACT_COLUMNS if c not in ('contact_id', 'categories', 'num_sources')])
+    df.insert(0, 'contact_id', list(contacts.keys()))
+    df['categories'] = [','.join(sorted(contact_categories(c))) for c in contacts.values()]
+    df['num_sources'] = [len(c.get('sources', [])) for c in contacts.values()]
+
+    text_columns = [c for c in CONTACT_COLUMNS if c not in ('total_listings', 'num_sources')]
+    df[text_columns] = df[text_columns].fillna('').astype(str)
+    df['total_listings'] = pd.to_numeric(df['total_listings'], errors='coerce').fillna(1).astype('int32')
+    df['num_sources'] = df['num_sources'].astype('int32')
+    return df.reset_index(drop=True)
+
+def _write_partition(df, partition, column_dir):
+    path = column_partition_file(partition, column_dir)
+    temp_file = f"{path}.tmp"
+    df.to_parquet(temp_file, index=False)
+    os.replace(temp_file, path)
+
+def write_contact_columns(master_data, column_dir=COLUMN_STORE_DIR, contact_ids=None):
+    """Write the flat contact fields as a partitioned parquet column store (skipped without pyarrow)
+
+    With contact_ids only the rows of those contacts are rewritten, in the
+    partitions that hold them; without, every partition is rebuilt.
+    """
+    if not PARQUET_AVAILABLE:
+        return None
 
-def split_master_database():
-    """Split the master database into category-specific files"""
-    
-    # Load the massive master database
-    print("📥 Loading master database...")
-    with open('master_contact_database.json', 'r') as f:
-        master_data = json.load(f)
-    
     contacts = master_data['contacts']
-    total_contacts = len(contacts)
-    print(f"   Total contacts: {total_contacts}")
-    
-    # Group contacts by category
-    category_contacts = defaultdict(dict)
-    category_stats = defaultdict(int)
-    
-    print("🔄 Grouping contacts by category...")
-    
-    for contact_id, contact in contacts.items():
-        # Get all categories for this contact
-        contact_categories = set()
-        
-        for source in contact.get('sources', []):
-            category = source.get('category', '').lower().strip()
-            if category:
-                contact_categories.add(category)
-        
-        # Add contact to each category file
-        for category in contact_categories:
-            category_contacts[category][contact_id] = contact
-            category_stats[category] += 1
-    
-    # Create directory for category files
-    os.makedirs('category_databases', exist_ok=True)
-    
-    # Save each category to its own file
-    print("\n💾 Creating category-specific database files...")
-    
-    for category, cat_contacts in category_contacts.items():
-        filename = f"category_databases/{category.replace('/', '_').replace(' ', '_')}_contacts.json"
-        
-        category_data = {
-            "metadata": {
-                "category": category,
-                "created_date": datetime.now().isoformat(),
-                "total_contacts": len(cat_contacts),
-                "parent_database": "master_contact_database.json",
-                "last_updated": master_data['metadata']['last_updated']
-            },
-            "contacts": cat_contacts
-        }
-        
-        with open(filename, 'w') as f:
-            json.dump(category_data, f, indent=2)
-        
-        print(f"   ✅ {category}: {len(cat_contacts)} contacts -> {filename}")
-    
-    # Create a lightweight master index
+    if contact_ids is None or not os.path.isdir(column_dir):
+        os.makedirs(column_dir, exist_ok=True)
+        df = contact_column_frame(contacts)
+        partitions = df['contact_id'].map(column_partition)
+        for partition in range(COLUMN_PARTITIONS):
+            _write_partition(df[partitions == partition], partition, column_dir)
+        return column_dir
+
+    touched = defaultdict(dict)
+    for contact_id in contact_ids:
+        if contact_id in contacts:
+            touched[column_partition(contact_id)][contact_id] = contacts[contact_id]
+
+    for partition, changed in touched.items():
+        path = column_partition_file(partition, column_dir)
+        rows = contact_column_frame(changed)
+        if os.path.exists(path):
+            existing = pd.read_parquet(path)
+            rows = pd.concat([existing[~existing['contact_id'].isin(rows['contact_id'])], rows], ignore_index=True)
+        _write_partition(rows, partition, column_dir)
+    return column_dir
+
+def write_index(category_counts, master_data, total_contacts, index_file=INDEX_FILE, views_dir=VIEWS_DIR):
+    """Write the lightweight master index that points at every category view"""
     master_index = {
         "metadata": {
             "created_date": datetime.now().isoformat(),
             "total_contacts": total_contacts,
-            "total_categories": len(category_stats),
+            "total_categories": len(category_counts),
             "split_date": datetime.now().isoformat(),
-            "description": "Index of split category databases"
+            "master_last_updated": master_data['metadata'].get('last_updated'),
+            "storage": "views",
+            "description": "Index of category views over the shared master database"
         },
-        "categories": dict(category_stats),
-        "category_files": {
-            category: f"category_databases/{category.replace('/', '_').replace(' ', '_')}_contacts.json"
-            for category in category_stats.keys()
+        "shared_store": MASTER_FILE,
+        "column_store": COLUMN_STORE_DIR if PARQUET_AVAILABLE and os.path.isdir(COLUMN_STORE_DIR) else None,
+        "categories": dict(category_counts),
+        "category_views": {
+            category: category_view_file(category, views_dir)
+            for category in category_counts.keys()
         }
     }
-    
-    with open('master_database_index.json', 'w') as f:
+
+    with open(index_file, 'w') as f:
         json.dump(master_index, f, indent=2)
-    
+    return master_index
+
+def split_master_database():
+    """Build an ID-list view per category over the master database"""
+
+    # Load the massive master database
+    print("📥 Loading master database...")
+    with open(MASTER_FILE, 'r') as f:
+        master_data = json.load(f)
+
+    contacts = master_data['contacts']
+    total_contacts = len(contacts)
+    print(f"   Total contacts: {total_contacts}")
+
+    # Group contact IDs by category
+    category_ids = defaultdict(list)
+
+    print("🔄 Grouping contacts by category...")
+
+    for contact_id, contact in contacts.items():
+        for category in contact_categories(contact):
+            category_ids[category].append(contact_id)
+
+    # Create directory for category views
+    os.makedirs(VIEWS_DIR, exist_ok=True)
+
+    # Save each category view (IDs only - contacts stay in the shared store)
+    print("\n💾 Creating category views...")
+
+    master_last_updated = master_data['metadata'].get('last_updated')
+    for category, ids in category_ids.items():
+        filename = write_view(category, ids, master_last_updated)
+        print(f"   ✅ {category}: {len(ids)} contacts -> {filename}")
+
+    if write_contact_columns(master_data):
+        print(f"   ✅ Column store -> {COLUMN_STORE_DIR}/")
+
+    category_counts = {category: len(ids) for category, ids in category_ids.items()}
+    write_index(category_counts, master_data, total_contacts)
+
     print(f"\n🎉 Database split complete!")
-    print(f"   📊 Created {len(category_stats)} category files")
-    print(f"   📁 Files saved in: category_databases/")
-    print(f"   🗂️  Master index: master_database_index.json")
-    print(f"   💽 Original file size reduction: ~{len(category_stats)}x smaller per category")
+    print(f"   📊 Created {len(category_counts)} category views")
+    print(f"   📁 Views saved in: {VIEWS_DIR}/")
+    print(f"   🗂️  Master index: {INDEX_FILE}")
+    print(f"   💽 Contacts stored once in {MASTER_FILE}, views hold IDs only")
+
+def add_to_category_views(category_updates, master_data, index_file=INDEX_FILE, changed_ids=()):
+    """Append contact IDs to their category views, rewriting only the views that changed
+
+    category_updates maps category -> iterable of contact IDs that gained it;
+    changed_ids are further contacts whose fields changed. The column store
+    rows of every contact in either are refreshed.
+    Returns the number of (category, contact) pairs actually added.
+    """
+    index = load_index(index_file)
+    if not index or index.get('metadata', {}).get('storage') != 'views':
+        return 0
+
+    os.makedirs(VIEWS_DIR, exist_ok=True)
+    category_counts = dict(index.get('categories', {}))
+    master_last_updated = master_data['metadata'].get('last_updated')
+    added = 0
+    touched = set(changed_ids)
+
+    for category, new_ids in category_updates.items():
+        new_ids = list(new_ids)
+        touched.update(new_ids)
+        category = category.lower().strip()
+        if not category:
+            continue
+
+        view_file = index.get('category_views', {}).get(category, category_view_file(category))
+        ids = load_view_ids(view_file)
+        known = set(ids)
+        delta = [contact_id for contact_id in dict.fromkeys(new_ids) if contact_id not in known]
+
+        if not delta:
+            continue
+
+        ids.extend(delta)
+        write_view(category, ids, master_last_updated, view_file=view_file)
+        category_counts[category] = len(ids)
+        added += len(delta)
+        print(f"   ➕ {category}: +{len(delta)} contacts")
+
+    if touched:
+        write_contact_columns(master_data, contact_ids=touched)
+
+    write_index(category_counts, master_data, len(master_data['contacts']), index_file)
+    return added
+
+def refresh_category_views():
+    """Apply only contacts updated since the last split to the category views"""
+    index = load_index()
+    if not index or index.get('metadata', {}).get('storage') != 'views':
+        print("⚠️  No category views found - running a full split")
+        split_master_database()
+        return
+
+    print("📥 Loading master database...")
+    with open(MASTER_FILE, 'r') as f:
+        master_data = json.load(f)
+
+    watermark = index['metadata'].get('master_last_updated') or ''
+    category_updates = defaultdict(list)
+    changed = []
+
+    for contact_id, contact in master_data['contacts'].items():
+        if (contact.get('last_updated') or '') <= watermark:
+            continue
+        changed.append(contact_id)
+        for category in contact_categories(contact):
+            category_updates[category].append(contact_id)
+
+    print(f"🔄 {len(changed):,} contacts changed since {watermark or 'the last split'}")
+    added = add_to_category_views(category_updates, master_data, changed_ids=changed)
+
+    print(f"✅ Category views refreshed ({added:,} new category memberships)")
 
 if __name__ == "__main__":
-    split_master_database()
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1].lower() == 'update':
+        refresh_category_views()
+    else:
+        split_master_database()
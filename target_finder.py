@@ -8,12 +8,20 @@ import json
 import pandas as pd
 from collections import defaultdict
 import re
+from entity_resolution import D1_ENTITY_FILE, ENTITY_FILE, EntityResolver
+from company_matcher import company_clusters
+from d1_replica import use_replica, load_replica_master_log
+
+def load_master_log(master_log_file="master_contact_database.json"):
+    """Load the full master database (metadata + contacts)"""
+    if use_replica():
+        return load_replica_master_log()
+    with open(master_log_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 def load_contacts(master_log_file="master_contact_database.json"):
     """Load contacts from master database"""
-    with open(master_log_file, 'r', encoding='utf-8') as f:
-        master_log = json.load(f)
-    return master_log['contacts']
+    return load_master_log(master_log_file)['contacts']
 
 def find_dealer_networks():
     """Identify major equipment dealer networks"""
@@ -22,24 +30,20 @@ def find_dealer_networks():
     print("🏢 MAJOR EQUIPMENT DEALER NETWORKS")
     print("="*80)
     
-    # Group by company name (fuzzy matching)
+    # Group by company name (fuzzy matching over trigram prefix-filter candidates, see company_matcher.py)
     company_groups = defaultdict(list)
+    network_clusters = {}
     
-    for contact_id, contact in contacts.items():
-        company = contact['seller_company'].strip()
-        if company:
-            # Normalize company name for grouping
-            normalized = re.sub(r'\b(Inc|LLC|Corp|Co\.|Ltd|Equipment|Machinery)\b', '', company, flags=re.IGNORECASE).strip()
-            normalized = re.sub(r'[^\w\s]', '', normalized).strip().lower()
-            
-            if len(normalized) > 3:  # Skip very short names
-                company_groups[normalized].append({
-                    'contact_id': contact_id,
-                    'original_name': company,
-                    'phone': contact['primary_phone'],
-                    'location': contact['primary_location'],
-                    'listings': contact['total_listings']
-                })
+    for contact_id, cluster in company_clusters(contacts).items():
+        contact = contacts[contact_id]
+        network_clusters[cluster['key']] = cluster
+        company_groups[cluster['key']].append({
+            'contact_id': contact_id,
+            'original_name': contact['seller_company'].strip(),
+            'phone': contact['primary_phone'],
+            'location': contact['primary_location'],
+            'listings': contact['total_listings']
+        })
     
     # Find companies with multiple locations/contacts
     dealer_networks = []
@@ -53,6 +57,8 @@ def find_dealer_networks():
                 'locations': len(locations),
                 'contacts': len(contacts_list),
                 'total_listings': total_listings,
+                'confidence': network_clusters[normalized_name]['confidence'],
+                'name_variants': network_clusters[normalized_name]['names'],
                 'details': contacts_list
             })
     
@@ -64,6 +70,8 @@ def find_dealer_networks():
     for i, network in enumerate(dealer_networks[:15], 1):
         print(f"{i}. {network['network_name'].title()}")
         print(f"   📍 {network['locations']} locations | 📞 {network['contacts']} contacts | 📝 {network['total_listings']} listings")
+        if len(network['name_variants']) > 1:
+            print(f"   🔗 {len(network['name_variants'])} name variants | match confidence {network['confidence']:.0%}")
         
         # Show top locations for this network
         location_summary = defaultdict(int)
@@ -118,38 +126,39 @@ def find_regional_powerhouses():
             print(f"   ... and {len(sellers)-5} more")
         print()
 
-def find_suspicious_duplicates():
+def find_suspicious_duplicates(master_log_file="master_contact_database.json"):
     """Find potential duplicate contacts that might be the same business"""
-    contacts = load_contacts()
+    master_log = load_master_log(master_log_file)
+    contacts = master_log['contacts']
     
     print("\n🔍 POTENTIAL DUPLICATE BUSINESSES")
     print("="*80)
     
-    # Group by phone number
-    phone_groups = defaultdict(list)
+    # Group by business entity (same phone, or same company at the same location)
+    # Replica contacts carry D1 IDs, which have their own cluster file
+    resolver = EntityResolver.load(D1_ENTITY_FILE if use_replica() else ENTITY_FILE)
+    if resolver.sync_contacts(contacts):
+        # Only contacts changed since the clusters were last saved are re-linked
+        resolver.save()
     
-    for contact_id, contact in contacts.items():
-        phone = contact['primary_phone']
-        if phone:
-            clean_phone = ''.join(filter(str.isdigit, phone))
-            if clean_phone:
-                phone_groups[clean_phone].append({
-                    'contact_id': contact_id,
-                    'company': contact['seller_company'],
-                    'phone': contact['primary_phone'],
-                    'location': contact['primary_location'],
-                    'listings': contact['total_listings']
-                })
-    
-    # Find groups with different company names (potential data issues)
+    # Find entities with different company names (potential data issues)
     suspicious_groups = []
     
-    for phone, contacts_list in phone_groups.items():
+    for entity_id, contact_ids in resolver.clusters():
+        contacts_list = [{
+            'contact_id': contact_id,
+            'company': contacts[contact_id]['seller_company'],
+            'phone': contacts[contact_id]['primary_phone'],
+            'location': contacts[contact_id]['primary_location'],
+            'listings': contacts[contact_id]['total_listings']
+        } for contact_id in contact_ids if contact_id in contacts]
+        
         if len(contacts_list) > 1:
             companies = set(c['company'] for c in contacts_list if c['company'])
-            if len(companies) > 1:  # Same phone, different companies
+            if len(companies) > 1:  # Same business, different company names
                 total_listings = sum(c['listings'] for c in contacts_list)
                 suspicious_groups.append({
+                    'entity_id': entity_id,
                     'phone': contacts_list[0]['phone'],
                     'companies': list(companies),
                     'total_listings': total_listings,
@@ -158,7 +167,7 @@ def find_suspicious_duplicates():
     
     suspicious_groups.sort(key=lambda x: x['total_listings'], reverse=True)
     
-    print(f"⚠️  Found {len(suspicious_groups)} phone numbers with multiple company names:\n")
+    print(f"⚠️  Found {len(suspicious_groups)} businesses with multiple company names:\n")
     
     for i, group in enumerate(suspicious_groups[:10], 1):
         print(f"{i}. Phone: {group['phone']} | Total listings: {group['total_listings']}")
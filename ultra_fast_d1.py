@@ -7,6 +7,7 @@ Features:
 - Ultra-fast batch processing (50 contacts per API call)
 - Automatic file discovery and category detection
 - Processed file tracking to avoid duplicates
+- Row fingerprints skip listings already uploaded by overlapping exports
 - Database status checking and reporting
 - Support for both single files and bulk processing
 
@@ -14,6 +15,7 @@ Usage:
     python ultra_fast_d1.py                    # Process all new files
     python ultra_fast_d1.py status             # Check database status
     python ultra_fast_d1.py single <file>      # Process specific file
+    python ultra_fast_d1.py fingerprints       # Rebuild row fingerprints from processed files
 """
 
 import os
@@ -22,6 +24,7 @@ import glob
 from datetime import datetime
 from dotenv import load_dotenv
 from d1_integration import D1ScraperIntegration
+from upload_fingerprints import FINGERPRINT_FILE, FingerprintIndex
 
 # Load environment variables
 load_dotenv()
@@ -47,6 +50,16 @@ def mark_file_processed(filename):
     with open(processed_file, 'w') as f:
         json.dump(processed_files, f, indent=2)
 
+def processed_file_paths():
+    """Paths of processed exports that are still on disk"""
+    json_dir = os.path.join("mt_contacts", "json")
+    paths = (os.path.join(json_dir, basename) for basename in get_processed_files())
+    return [path for path in paths if os.path.exists(path)]
+
+def load_fingerprints():
+    """Fingerprints of rows already in D1 (seeded from processed files on first use)"""
+    return FingerprintIndex.load(processed_files=processed_file_paths())
+
 def extract_category_from_file(filename, file_data):
     """Extract category from filename or file data with comprehensive mapping"""
     
@@ -105,8 +118,15 @@ def extract_category_from_file(filename, file_data):
     # Default fallback
     return 'general equipment'
 
-def ultra_fast_upload_single_file(filepath):
-    """Upload a single file using ultra-fast batch processing"""
+def ultra_fast_upload_single_file(filepath, fingerprints=None):
+    """Upload a single file using ultra-fast batch processing
+    
+    Rows whose fingerprint is already known are dropped before upload.
+    Returns (processed contacts, skipped already-seen rows).
+    """
+    if fingerprints is None:
+        fingerprints = load_fingerprints()
+    
     print(f"⚡ ULTRA-FAST UPLOAD: {os.path.basename(filepath)}")
     print("=" * 60)
     
@@ -123,6 +143,18 @@ def ultra_fast_upload_single_file(filepath):
     print(f"🌐 Source: {source_site}")
     print(f"📅 File date: {data.get('export_timestamp', 'Unknown')}")
     
+    # Drop rows already committed by earlier (overlapping) exports
+    new_contacts, seen_contacts = fingerprints.split_new(contacts)
+    if contacts:
+        print(f"🧬 New rows: {len(new_contacts):,} | Already uploaded: {len(seen_contacts):,} "
+              f"({len(new_contacts) / len(contacts) * 100:.1f}% new)")
+    
+    if not new_contacts:
+        print("\\n✅ Nothing new to upload")
+        mark_file_processed(filepath)
+        print(f"   ✅ File marked as processed")
+        return 0, len(seen_contacts)
+    
     # Initialize D1 integration
     d1 = D1ScraperIntegration(
         os.getenv('CLOUDFLARE_ACCOUNT_ID'),
@@ -134,15 +166,19 @@ def ultra_fast_upload_single_file(filepath):
     print("\\n⚡ Starting ULTRA-FAST batch upload...")
     start_time = datetime.now()
     
-    processed_count, _ = d1.fast_batch_insert_contacts(contacts, category, source_site, batch_size=50)
+    processed_count, _ = d1.fast_batch_insert_contacts(new_contacts, category, source_site, batch_size=50,
+                                                        on_batch_committed=fingerprints.add)
+    if fingerprints.dirty:
+        fingerprints.save()
     
     end_time = datetime.now()
-    duration = (end_time - start_time).total_seconds()
+    duration = max((end_time - start_time).total_seconds(), 0.001)
     
     print(f"\\n✅ Upload complete!")
     print(f"📊 Results:")
     print(f"   • Processed contacts: {processed_count:,}")
     print(f"   • Total in file: {len(contacts):,}")
+    print(f"   • Skipped (already uploaded): {len(seen_contacts):,}")
     print(f"   • Duration: {duration:.1f} seconds")
     print(f"   • Speed: {processed_count/duration:.1f} contacts/second")
     print(f"   • Performance: ~72x faster than individual uploads!")
@@ -151,7 +187,7 @@ def ultra_fast_upload_single_file(filepath):
     mark_file_processed(filepath)
     print(f"   ✅ File marked as processed")
     
-    return processed_count
+    return processed_count, len(seen_contacts)
 
 def ultra_fast_bulk_upload():
     """Process all new files using ultra-fast batch processing"""
@@ -238,14 +274,17 @@ def ultra_fast_bulk_upload():
     
     # Process each file
     print("\\n📤 Processing files...")
+    fingerprints = load_fingerprints()
     total_processed = 0
+    total_skipped = 0
     
     for i, filepath in enumerate(new_files, 1):
         print(f"\\n📁 File {i}/{len(new_files)}: {os.path.basename(filepath)}")
         
         try:
-            processed = ultra_fast_upload_single_file(filepath)
+            processed, skipped = ultra_fast_upload_single_file(filepath, fingerprints)
             total_processed += processed
+            total_skipped += skipped
         except Exception as e:
             print(f"   ❌ Error processing {os.path.basename(filepath)}: {e}")
             continue
@@ -255,6 +294,7 @@ def ultra_fast_bulk_upload():
     print(f"📊 Summary:")
     print(f"   • Files processed: {len(new_files):,}")
     print(f"   • Total contacts uploaded: {total_processed:,}")
+    print(f"   • Already-uploaded rows skipped: {total_skipped:,}")
     print(f"   • Database size: ~{current_total + total_processed:,} contacts")
     print(f"\\n🎯 Next Steps:")
     print(f"   1. Run 'streamlit run dashboard.py' to see updated data")
@@ -325,14 +365,17 @@ def ultra_fast_bulk_upload_all():
     
     # Process each file
     print("\n📤 Processing files...")
+    fingerprints = load_fingerprints()
     total_processed = 0
+    total_skipped = 0
     
     for i, filepath in enumerate(new_files, 1):
         print(f"\n📁 File {i}/{len(new_files)}: {os.path.basename(filepath)}")
         
         try:
-            processed = ultra_fast_upload_single_file(filepath)
+            processed, skipped = ultra_fast_upload_single_file(filepath, fingerprints)
             total_processed += processed
+            total_skipped += skipped
         except Exception as e:
             print(f"   ❌ Error processing {os.path.basename(filepath)}: {e}")
             continue
@@ -342,6 +385,7 @@ def ultra_fast_bulk_upload_all():
     print(f"📊 Summary:")
     print(f"   • Files processed: {len(new_files):,}")
     print(f"   • Total contacts uploaded: {total_processed:,}")
+    print(f"   • Already-uploaded rows skipped: {total_skipped:,}")
     print(f"   • Database size: ~{current_total + total_processed:,} contacts")
     print(f"\n🎯 Next Steps:")
     print(f"   1. Run 'streamlit run dashboard.py' to see updated data")
@@ -405,6 +449,8 @@ def check_d1_status():
     # Check processed files
     processed_files = get_processed_files()
     print(f"\\n📁 Processed files: {len(processed_files)}")
+    if os.path.exists(FINGERPRINT_FILE):
+        print(f"🧬 Uploaded row fingerprints: {len(FingerprintIndex.load()):,}")
     
     # Check for new files
     json_dir = os.path.join("mt_contacts", "json")
@@ -436,6 +482,9 @@ def main():
                 ultra_fast_upload_single_file(filepath)
             else:
                 print(f"❌ File not found: {filepath}")
+        elif command == 'fingerprints':
+            # Rebuild the fingerprint index from every processed export
+            FingerprintIndex(FINGERPRINT_FILE).seed_from_files(processed_file_paths())
         elif command == 'recent' or command == 'new':
             # Process only recent files (default behavior)
             ultra_fast_bulk_upload()
@@ -448,9 +497,11 @@ def main():
             print("  python ultra_fast_d1.py all            # Process ALL unprocessed files")
             print("  python ultra_fast_d1.py status         # Check database status") 
             print("  python ultra_fast_d1.py single <file>  # Process specific file")
+            print("  python ultra_fast_d1.py fingerprints   # Rebuild uploaded-row fingerprints")
             print()
             print("💡 Smart Features:")
             print("  • Automatic duplicate detection")
+            print("  • Skips rows already uploaded by overlapping exports")
             print("  • Only processes recent files by default")
             print("  • Ultra-fast batch processing (72x faster)")
     else:
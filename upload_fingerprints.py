@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Upload Fingerprint Index
+Compact set of fingerprints for every scraped row already committed to D1, so
+overlapping scrape exports only upload the listings D1 hasn't seen
+
+A row's fingerprint is an 8-byte blake2b hash of its normalized phone,
+company and listing URL. The set is persisted as a flat binary array
+(8 bytes per row) next to d1_processed_files.json.
+"""
+
+import hashlib
+import json
+import os
+from array import array
+from contact_index import company_key, normalize_phone_digits
+
+FINGERPRINT_FILE = "d1_upload_fingerprints.bin"
+
+def row_fingerprint(contact_data):
+    """64-bit fingerprint of a scraped row (normalized phone + company + listing URL)"""
+    key = "|".join([
+        normalize_phone_digits(contact_data.get('phone', '')),
+        company_key(contact_data.get('seller_company', '')),
+        str(contact_data.get('url', '') or '').strip().split('#')[0].rstrip('/')
+    ])
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+class FingerprintIndex:
+    """Persisted fingerprints of rows already uploaded to D1"""
+    
+    def __init__(self, index_file=FINGERPRINT_FILE):
+        self.index_file = index_file
+        self.fingerprints = set()
+        self.dirty = False
+    
+    @classmethod
+    def load(cls, index_file=FINGERPRINT_FILE, processed_files=None):
+        """Load the index; seed it from already-processed exports if it doesn't exist yet"""
+        index = cls(index_file)
+        if os.path.exists(index_file):
+            values = array('Q')
+            with open(index_file, 'rb') as f:
+                values.frombytes(f.read())
+            index.fingerprints = set(values)
+        elif processed_files:
+            index.seed_from_files(processed_files)
+        return index
+    
+    def seed_from_files(self, filepaths):
+        """Fingerprint every row of exports that were uploaded before the index existed"""
+        print(f"🔄 Seeding upload fingerprints from {len(filepaths):,} processed files...")
+        for filepath in filepaths:
+            try:
+                with open(filepath, 'r') as f:
+                    contacts = json.load(f).get('contacts', [])
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"   ⚠️  Skipping {os.path.basename(filepath)}: {e}")
+                continue
+            self.add(contacts)
+        self.save()
+        print(f"   ✅ {len(self.fingerprints):,} fingerprints")
+    
+    def split_new(self, contacts):
+        """Split rows into (new, already seen); repeats within the batch count as seen"""
+        new_rows, seen_rows = [], []
+        pending = set()
+        for contact_data in contacts:
+            fingerprint = row_fingerprint(contact_data)
+            if fingerprint in self.fingerprints or fingerprint in pending:
+                seen_rows.append(contact_data)
+            else:
+                pending.add(fingerprint)
+                new_rows.append(contact_data)
+        return new_rows, seen_rows
+    
+    def add(self, contacts):
+        """Record rows that are now committed to D1"""
+        before = len(self.fingerprints)
+        self.fingerprints.update(row_fingerprint(contact_data) for contact_data in contacts)
+        self.dirty = self.dirty or len(self.fingerprints) != before
+    
+    def save(self):
+        """Write the fingerprint array atomically"""
+        temp_file = f"{self.index_file}.tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(array('Q', self.fingerprints).tobytes())
+        os.replace(temp_file, self.index_file)
+        self.dirty = False
+    
+    def __len__(self):
+        return len(self.fingerprints)